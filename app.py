@@ -1,14 +1,29 @@
 import os
 import json
+import functools
+import logging
+import tempfile
+import time
 import re
-import xml.etree.ElementTree as ET
-from flask import Flask, request, jsonify, render_template
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from flask import Flask, Response, request, jsonify, render_template, send_file
 from flask_cors import CORS
-from google.auth.transport.requests import Request
-from google.oauth2 import service_account
-import requests
-from difflib import SequenceMatcher
 from dotenv import load_dotenv
+from token_manager import TokenManager
+from http_session import FeedSession, ContactsAPIError, backoff_delay
+import atom_writer
+import batch_feed
+from batch_feed import THROTTLE_STATUSES
+from contact_store import ContactStore
+from contact_index import ContactIndex
+from duplicate_index import DuplicateIndex, contact_from_data
+from jobs import JobManager
+from csv_import import CSVImport, existing_emails
+import observability
+from observability import (PAGE_FETCH_SECONDS, PARSE_SECONDS, FEED_PAGES_NOT_MODIFIED, WRITE_SECONDS,
+                           REQUEST_SECONDS, DUPLICATES_REQUEST_SECONDS)
 
 load_dotenv()
 
@@ -17,102 +32,219 @@ CORS(app)
 
 # Configuration
 SCOPES = ['https://www.google.com/m8/feeds']
+# Shared Contacts feed base URL; point it at a stand-in server to test without a Workspace domain
+FEED_URL = os.getenv('FEED_URL', 'https://www.google.com/m8/feeds').rstrip('/')
 SERVICE_ACCOUNT_FILE = os.getenv('SERVICE_ACCOUNT_FILE', 'credentials.json')
 DOMAIN = os.getenv('WORKSPACE_DOMAIN', 'example.com')
+# Seconds before expiry at which a cached access token is refreshed
+TOKEN_REFRESH_MARGIN = int(os.getenv('TOKEN_REFRESH_MARGIN', 300))
+# Keep-alive connection pool and retry policy for feed requests
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', 10))
+HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', 4))
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 30))
+# Parse feed pages incrementally as they download; 'false' restores the parse/reparse path
+STREAMING_PARSER = os.getenv('STREAMING_PARSER', 'true').lower() == 'true'
+FEED_CHUNK_SIZE = 64 * 1024
+# Maximum feed pages fetched in parallel during a full crawl (1 = one page at a time)
+FEED_CONCURRENCY = int(os.getenv('FEED_CONCURRENCY', 4))
+# Ask the feed for only the elements parse_contact_xml() reads (GData partial response)
+LEAN_FEED = os.getenv('LEAN_FEED', 'false').lower() == 'true'
+LEAN_FIELDS = ("openSearch:totalResults,entry(id,content,link[@rel='edit'],gd:name,gd:email,"
+               "gd:phoneNumber,gd:deleted)")
+# Remember each full-crawl page's ETag and send If-None-Match, so unchanged pages come back as 304.
+# The cache holds a parsed copy of each page, so it is off by default and capped at FEED_ETAG_PAGES pages
+FEED_ETAGS = os.getenv('FEED_ETAGS', 'false').lower() == 'true'
+FEED_ETAG_PAGES = int(os.getenv('FEED_ETAG_PAGES', 100))
+# Serve contacts from the local snapshot while it is younger than this many seconds
+CONTACT_CACHE_MAX_AGE = float(os.getenv('CONTACT_CACHE_MAX_AGE', 60))
+# Optional SQLite file that keeps the snapshot across restarts
+CONTACT_CACHE_DB = os.getenv('CONTACT_CACHE_DB') or None
+# 'blocked' scores only pairs sharing a blocking key; 'pairwise' compares every pair
+DEDUPE_METHOD = os.getenv('DEDUPE_METHOD', 'blocked')
+# Processes used to score duplicate pairs (1 = score in the request thread) and pairs per shard
+DEDUPE_WORKERS = int(os.getenv('DEDUPE_WORKERS', 1))
+DEDUPE_CHUNK_SIZE = int(os.getenv('DEDUPE_CHUNK_SIZE', 50000))
+# Contacts per /api/contacts/search page by default, and the largest page a client may ask for
+SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', 50))
+SEARCH_MAX_PAGE_SIZE = int(os.getenv('SEARCH_MAX_PAGE_SIZE', 500))
+# Operations per batch feed request; the Shared Contacts API accepts at most 100
+BATCH_SIZE = max(1, min(int(os.getenv('BATCH_SIZE', 100)), 100))
+# Batch requests in flight for bulk deletes, and attempts per item on 429/503
+WRITE_CONCURRENCY = int(os.getenv('WRITE_CONCURRENCY', 4))
+WRITE_MAX_ATTEMPTS = int(os.getenv('WRITE_MAX_ATTEMPTS', 5))
+# Pairs scoring at least this are kept up to date as contacts change, so duplicate
+# listings at or above it need no scan; new contacts are checked against this threshold
+DUPLICATE_INDEX_THRESHOLD = float(os.getenv('DUPLICATE_INDEX_THRESHOLD', 0.5))
+DUPLICATE_CHECK_THRESHOLD = float(os.getenv('DUPLICATE_CHECK_THRESHOLD', 0.8))
+# Answer POST /api/contacts with 409 when the new contact looks like a duplicate
+REJECT_DUPLICATES = os.getenv('REJECT_DUPLICATES', 'false').lower() == 'true'
+# Background duplicate scans run at most this many at once; finished jobs kept for polling
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', 2))
+JOB_HISTORY = int(os.getenv('JOB_HISTORY', 50))
+# SQLite file holding job state, shared by the gunicorn workers so any of them can answer a poll
+JOB_DB = os.getenv('JOB_DB') or os.path.join(tempfile.gettempdir(), 'contact-jobs.db')
+# Uploaded CSV files, their checkpoints and error reports; batch requests in flight per import
+IMPORT_DIR = os.getenv('IMPORT_DIR') or os.path.join(tempfile.gettempdir(), 'contact-imports')
+IMPORT_CONCURRENCY = int(os.getenv('IMPORT_CONCURRENCY', 4))
+# Log level, and 'json' for one structured object per line or 'text' for plain lines
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+# Fetch the first access token and contact snapshot in the background when a worker starts
+PREWARM = os.getenv('PREWARM', 'false').lower() == 'true'
+
+observability.configure_logging(LOG_LEVEL, LOG_FORMAT)
+logger = logging.getLogger(__name__)
+
+def timed_write(verb):
+    """Record each call in contacts_write_seconds; batches with some failed entries count as 'partial'"""
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            result = method(*args, **kwargs)
+            if isinstance(result, list):
+                succeeded = sum(1 for item in result if item.get('success'))
+                outcome = 'success' if succeeded == len(result) else 'partial' if succeeded else 'error'
+            else:
+                outcome = 'success' if result.get('success') else 'error'
+            WRITE_SECONDS.observe(time.perf_counter() - started, verb=verb, outcome=outcome)
+            return result
+        return wrapper
+    return decorator
 
 class GoogleWorkspaceContactsManager:
-    def __init__(self, service_account_file, domain):
+    def __init__(self, service_account_file, domain, http_session=None, feed_url=FEED_URL, write_limiter=None,
+                 lean=LEAN_FEED, etags=FEED_ETAGS, etag_pages=FEED_ETAG_PAGES):
         self.domain = domain
+        self.feed_url = feed_url
+        self.lean = lean
+        # (url, params) -> (ETag, parsed page) for pages of full crawls, least recently used first,
+        # or None when disabled; at most etag_pages entries
+        self.page_cache = OrderedDict() if etags else None
+        self.page_cache_size = max(etag_pages, 1)
+        self._page_cache_lock = threading.Lock()
         self.credentials = None
-        self.load_credentials(service_account_file)
+        self.token_manager = None
+        # Why the last get_auth_headers() call failed, for error responses and /api/health
+        self.credentials_error = None
+        self.auth_error = None
+        self.change_listeners = []
+        # The service account file and the HTTP session are only loaded on first use,
+        # so importing the app (and booting a worker) pays for neither
+        self._service_account_file = service_account_file
+        self._http = http_session
+        self._init_lock = threading.Lock()
+        if write_limiter is None:
+            # Shared by every batch request of the process (WRITE_RATE_LIMIT per second)
+            write_limiter = batch_feed.default_write_limiter(max(WRITE_CONCURRENCY, 1))
+        self.write_limiter = write_limiter
+    
+    @property
+    def http(self):
+        if self._http is None:
+            with self._init_lock:
+                if self._http is None:
+                    self._http = FeedSession(
+                        pool_size=HTTP_POOL_SIZE, max_retries=HTTP_MAX_RETRIES, timeout=HTTP_TIMEOUT
+                    )
+        return self._http
+    
+    def ensure_credentials(self):
+        """Load the service account file if that hasn't happened yet; return the load error, if any"""
+        if self._service_account_file:
+            with self._init_lock:
+                # Cleared only once loaded, so other threads wait here rather than see no credentials
+                if self._service_account_file:
+                    self.load_credentials(self._service_account_file)
+                    self._service_account_file = None
+        return self.credentials_error
     
     def load_credentials(self, service_account_file):
-        """Load service account credentials"""
+        """Load service account credentials; on failure keep the reason in credentials_error"""
+        from google.oauth2 import service_account
         try:
-            self.credentials = service_account.Credentials.from_service_account_file(
+            credentials = service_account.Credentials.from_service_account_file(
                 service_account_file, scopes=SCOPES
             )
             # For domain-wide delegation, we need to specify the admin user
             admin_email = os.getenv('ADMIN_EMAIL')
             if admin_email:
-                self.credentials = self.credentials.with_subject(admin_email)
+                credentials = credentials.with_subject(admin_email)
+            self.set_credentials(credentials)
         except Exception as e:
-            print(f"Error loading credentials: {e}")
+            self.credentials_error = f"Error loading credentials from {service_account_file}: {e}"
+            logger.error('Error loading credentials: %s', e, extra={
+                'event': 'credentials_error', 'service_account_file': service_account_file
+            })
+    
+    def set_credentials(self, credentials):
+        """Use the given credentials, resetting the token cache"""
+        self._service_account_file = None
+        self.credentials = credentials
+        self.credentials_error = None
+        self.token_manager = TokenManager(credentials, refresh_margin=TOKEN_REFRESH_MARGIN)
     
     def get_auth_headers(self):
-        """Get authorization headers for API requests"""
-        if not self.credentials:
+        """Get authorization headers for API requests; None on failure, with the reason in auth_error"""
+        self.ensure_credentials()
+        if not self.token_manager:
+            self.auth_error = self.credentials_error or 'no credentials configured'
             return None
         
-        self.credentials.refresh(Request())
+        try:
+            token = self.token_manager.get_token()
+        except Exception as e:
+            self.auth_error = f"Error refreshing access token: {e}"
+            logger.error('Error refreshing access token: %s', e, extra={'event': 'token_refresh_error'})
+            return None
+        
+        self.auth_error = None
         return {
-            'Authorization': f'Bearer {self.credentials.token}',
+            'Authorization': f'Bearer {token}',
             'GData-Version': '3.0',
             'Content-Type': 'application/atom+xml'
         }
     
+    def auth_failure(self):
+        """Error message for a request that get_auth_headers() couldn't authorize"""
+        return f"Authentication failed: {self.auth_error}" if self.auth_error else "Authentication failed"
+    
+    def add_change_listener(self, listener):
+        """Call listener(event, contact, edit_url) after every successful write
+
+        event is 'created', 'updated' or 'deleted'; edit_url is the URL the
+        write was sent to (None for creates).
+        """
+        self.change_listeners.append(listener)
+    
+    def notify_change(self, event, contact=None, edit_url=None):
+        for listener in self.change_listeners:
+            try:
+                listener(event, contact, edit_url)
+            except Exception:
+                logger.exception('Error in change listener', extra={'event': 'change_listener_error', 'change': event})
+    
+    def send_request(self, method, url, headers, **kwargs):
+        """Send a feed request, retrying once with a fresh token if the cached one is rejected"""
+        response = self.http.request(method, url, headers=headers, **kwargs)
+        if response.status_code == 401 and self.token_manager:
+            self.token_manager.invalidate()
+            fresh_headers = self.get_auth_headers()
+            if fresh_headers:
+                # Read the (short) 401 body and close, so the connection goes back to the pool
+                # rather than staying checked out: with stream=True nothing else reads it
+                response.content
+                response.close()
+                response = self.http.request(method, url, headers=dict(headers, **fresh_headers), **kwargs)
+        return response
+    
     def create_contact_xml(self, contact_data):
         """Create XML for a new contact"""
-        xml_template = """<?xml version='1.0' encoding='UTF-8'?>
-<atom:entry xmlns:atom='http://www.w3.org/2005/Atom'
-    xmlns:gd='http://schemas.google.com/g/2005'>
-  <atom:category scheme='http://schemas.google.com/g/2005#kind'
-    term='http://schemas.google.com/contact/2008#contact' />
-  <gd:name>
-     <gd:givenName>{first_name}</gd:givenName>
-     <gd:familyName>{last_name}</gd:familyName>
-     <gd:fullName>{full_name}</gd:fullName>
-  </gd:name>
-  <atom:content type='text'>{notes}</atom:content>
-  <gd:email rel='http://schemas.google.com/g/2005#work'
-    primary='true'
-    address='{email}' displayName='{display_name}' />
-  {additional_emails}
-  {phone_numbers}
-  {address}
-</atom:entry>"""
-        
-        # Build additional emails
-        additional_emails = ""
-        if contact_data.get('additional_emails'):
-            for email in contact_data['additional_emails']:
-                additional_emails += f"""<gd:email rel='http://schemas.google.com/g/2005#home'
-    address='{email}' />"""
-        
-        # Build phone numbers
-        phone_numbers = ""
-        if contact_data.get('phone'):
-            phone_numbers += f"""<gd:phoneNumber rel='http://schemas.google.com/g/2005#work'
-    primary='true'>{contact_data['phone']}</gd:phoneNumber>"""
-        
-        # Build address
-        address = ""
-        if contact_data.get('address'):
-            addr = contact_data['address']
-            address = f"""<gd:structuredPostalAddress
-      rel='http://schemas.google.com/g/2005#work'
-      primary='true'>
-    <gd:city>{addr.get('city', '')}</gd:city>
-    <gd:street>{addr.get('street', '')}</gd:street>
-    <gd:region>{addr.get('region', '')}</gd:region>
-    <gd:postcode>{addr.get('postcode', '')}</gd:postcode>
-    <gd:country>{addr.get('country', '')}</gd:country>
-  </gd:structuredPostalAddress>"""
-        
-        return xml_template.format(
-            first_name=contact_data.get('first_name', ''),
-            last_name=contact_data.get('last_name', ''),
-            full_name=f"{contact_data.get('first_name', '')} {contact_data.get('last_name', '')}".strip(),
-            notes=contact_data.get('notes', ''),
-            email=contact_data.get('email', ''),
-            display_name=contact_data.get('display_name', contact_data.get('email', '')),
-            additional_emails=additional_emails,
-            phone_numbers=phone_numbers,
-            address=address
-        )
+        return atom_writer.entry_xml(contact_data)
     
     def parse_contact_xml(self, xml_string):
         """Parse contact XML to extract contact data"""
+        import xml.etree.ElementTree as ET
         try:
             root = ET.fromstring(xml_string)
             
@@ -164,165 +296,448 @@ class GoogleWorkspaceContactsManager:
             content_elem = root.find('atom:content', namespaces)
             contact['notes'] = content_elem.text if content_elem is not None else ''
             
+            # Only present in showdeleted=true feeds
+            if root.find('gd:deleted', namespaces) is not None:
+                contact['deleted'] = True
+            
             return contact
         except Exception as e:
-            print(f"Error parsing contact XML: {e}")
+            logger.warning('Error parsing contact XML: %s', e, extra={'event': 'contact_parse_error'})
             return None
     
-    def get_contacts(self):
-        """Retrieve all shared contacts"""
+    def get_contacts(self, streaming=None, concurrency=None, updated_min=None, show_deleted=False):
+        """Retrieve all shared contacts, or only those changed since updated_min"""
+        contacts = []
+        try:
+            for page_contacts in self.iter_pages(streaming, concurrency, updated_min, show_deleted):
+                contacts.extend(page_contacts)
+        except ContactsAPIError as e:
+            return {"error": str(e)}
+        except Exception as e:
+            return {"error": f"Error retrieving contacts: {str(e)}"}
+
+        return {"contacts": contacts}
+    
+    def iter_pages(self, streaming=None, concurrency=None, updated_min=None, show_deleted=False):
+        """Yield each feed page's contacts in feed order; raises ContactsAPIError on failure
+
+        With concurrency > 1 the first page's openSearch:totalResults is used to
+        fetch the remaining pages in parallel on a bounded worker pool.
+        """
         # Google Shared Contacts feed defaults to 25 results; request a much larger page so we don't cut off
         max_results_per_page = 1000  # API allows up to 10000 but 1000 keeps payloads reasonable
+        if streaming is None:
+            streaming = STREAMING_PARSER
+        if concurrency is None:
+            concurrency = FEED_CONCURRENCY
 
-        base_url = f"https://www.google.com/m8/feeds/contacts/{self.domain}/full"
-        start_index = 1
-        contacts = []
+        extra_params = {}
+        if updated_min:
+            extra_params['updated-min'] = updated_min
+        if show_deleted:
+            extra_params['showdeleted'] = 'true'
 
-        while True:
-            params = {
-                'max-results': max_results_per_page,
-                'start-index': start_index
-            }
-            url = base_url
-            headers = self.get_auth_headers()
+        def fetch(start_index):
+            return self._fetch_page(start_index, max_results_per_page, streaming, extra_params)
 
-            if not headers:
-                return {"error": "Authentication failed"}
+        page_contacts, entry_count, total_results = fetch(1)
+        yield page_contacts
+        start_index = 1 + max_results_per_page
 
+        start_indexes = range(start_index, (total_results or 0) + 1, max_results_per_page)
+        if concurrency > 1 and entry_count == max_results_per_page and start_indexes:
+            pool = ThreadPoolExecutor(max_workers=min(concurrency, len(start_indexes)))
             try:
-                response = requests.get(url, headers=headers, params=params)
-                if response.status_code == 200:
-                    # Parse XML response
-                    root = ET.fromstring(response.text)
-                    namespaces = {
-                        'atom': 'http://www.w3.org/2005/Atom',
-                        'gd': 'http://schemas.google.com/g/2005'
-                    }
-
-                    entries = root.findall('atom:entry', namespaces)
-                    for entry in entries:
-                        contact = self.parse_contact_xml(ET.tostring(entry, encoding='unicode'))
-                        if contact:
-                            contacts.append(contact)
-
-                    # If fewer entries returned than requested, we've reached the end
-                    if len(entries) < max_results_per_page:
-                        break
+                # map() yields in submission order, so pages stay in feed order
+                for page_contacts, entry_count, _ in pool.map(fetch, start_indexes):
+                    yield page_contacts
+            finally:
+                pool.shutdown(wait=False, cancel_futures=True)
+            start_index += len(start_indexes) * max_results_per_page
 
-                    # Prepare next page
-                    start_index += max_results_per_page
-                else:
-                    return {"error": f"Failed to retrieve contacts: {response.status_code} - {response.text}"}
-            except Exception as e:
-                return {"error": f"Error retrieving contacts: {str(e)}"}
+        # Serial walk; after a concurrent crawl this only runs if the
+        # directory grew past the totalResults reported by the first page
+        while entry_count == max_results_per_page:
+            page_contacts, entry_count, _ = fetch(start_index)
+            yield page_contacts
+            start_index += max_results_per_page
 
-        return {"contacts": contacts}
+        if not updated_min:
+            # The crawl reached the end of the feed: pages past it no longer exist
+            self._prune_page_cache(start_index)
+
+    def _prune_page_cache(self, end_index):
+        """Drop cached pages starting at or after end_index"""
+        if self.page_cache is None:
+            return
+        with self._page_cache_lock:
+            for key in [key for key in self.page_cache if dict(key[1])['start-index'] >= end_index]:
+                del self.page_cache[key]
+    
+    def _fetch_page(self, start_index, max_results, streaming, extra_params=None):
+        """Fetch one feed page; return (contacts, entries on the page, openSearch:totalResults)"""
+        url = f"{self.feed_url}/contacts/{self.domain}/full"
+        params = {
+            'max-results': max_results,
+            'start-index': start_index,
+            **(extra_params or {})
+        }
+        if self.lean:
+            params['fields'] = LEAN_FIELDS
+        headers = self.get_auth_headers()
+
+        if not headers:
+            raise ContactsAPIError(self.auth_failure())
+
+        # Incremental syncs ask for a different updated-min each time, so only full crawls are cached
+        cache_key = None
+        cached = None
+        if self.page_cache is not None and 'updated-min' not in params:
+            cache_key = (url, tuple(sorted(params.items())))
+            with self._page_cache_lock:
+                cached = self.page_cache.get(cache_key)
+                if cached:
+                    self.page_cache.move_to_end(cache_key)
+            if cached:
+                headers = dict(headers, **{'If-None-Match': cached[0]})
+
+        started = time.perf_counter()
+        response = self.send_request('GET', url, headers, params=params, stream=streaming)
+        with response:
+            if response.status_code == 304 and cached:
+                FEED_PAGES_NOT_MODIFIED.inc()
+                contacts, entry_count, total_results = cached[1]
+                page = list(contacts), entry_count, total_results
+            elif response.status_code != 200:
+                raise ContactsAPIError(f"Failed to retrieve contacts: {response.status_code} - {response.text}",
+                                      response.status_code)
+            elif streaming:
+                from feed_parser import parse_feed
+                contacts, parser = parse_feed(response.iter_content(chunk_size=FEED_CHUNK_SIZE))
+                PARSE_SECONDS.observe(parser.parse_seconds, parser='streaming')
+                page = contacts, parser.entry_count, parser.total_results
+            else:
+                page = self._parse_page_tree(response.text)
+            etag = response.headers.get('ETag')
+        if cache_key and response.status_code == 200 and etag:
+            with self._page_cache_lock:
+                self.page_cache[cache_key] = (etag, page)
+                self.page_cache.move_to_end(cache_key)
+                while len(self.page_cache) > self.page_cache_size:
+                    self.page_cache.popitem(last=False)
+        elapsed = time.perf_counter() - started
+        PAGE_FETCH_SECONDS.observe(elapsed, parser='streaming' if streaming else 'tree')
+        logger.debug('Fetched feed page', extra={
+            'event': 'page_fetched', 'start_index': start_index, 'entries': page[1], 'seconds': round(elapsed, 4),
+            'status': response.status_code
+        })
+        return page
+    
+    def _parse_page_tree(self, xml_text):
+        """Original page reader: parse the whole page, then reparse each entry"""
+        import xml.etree.ElementTree as ET
+        started = time.perf_counter()
+        root = ET.fromstring(xml_text)
+        namespaces = {
+            'atom': 'http://www.w3.org/2005/Atom',
+            'gd': 'http://schemas.google.com/g/2005',
+            'openSearch': 'http://a9.com/-/spec/opensearch/1.1/'
+        }
+
+        contacts = []
+        entries = root.findall('atom:entry', namespaces)
+        for entry in entries:
+            contact = self.parse_contact_xml(ET.tostring(entry, encoding='unicode'))
+            if contact:
+                contacts.append(contact)
+
+        total_results = root.findtext('openSearch:totalResults', None, namespaces)
+        PARSE_SECONDS.observe(time.perf_counter() - started, parser='tree')
+        return contacts, len(entries), int(total_results) if total_results else None
     
+    @timed_write('create')
     def create_contact(self, contact_data):
         """Create a new shared contact"""
-        url = f"https://www.google.com/m8/feeds/contacts/{self.domain}/full"
+        url = f"{self.feed_url}/contacts/{self.domain}/full"
         headers = self.get_auth_headers()
         
         if not headers:
-            return {"error": "Authentication failed"}
+            return {"error": self.auth_failure()}
         
         xml_data = self.create_contact_xml(contact_data)
         
         try:
-            response = requests.post(url, data=xml_data, headers=headers)
+            response = self.send_request('POST', url, headers, data=xml_data)
             if response.status_code == 201:
                 contact = self.parse_contact_xml(response.text)
+                self.notify_change('created', contact)
                 return {"success": True, "contact": contact}
             else:
                 return {"error": f"Failed to create contact: {response.status_code} - {response.text}"}
         except Exception as e:
             return {"error": f"Error creating contact: {str(e)}"}
     
+    @timed_write('update')
     def update_contact(self, edit_url, contact_data):
         """Update an existing contact"""
         headers = self.get_auth_headers()
         
         if not headers:
-            return {"error": "Authentication failed"}
+            return {"error": self.auth_failure()}
         
         xml_data = self.create_contact_xml(contact_data)
         
         try:
-            response = requests.put(edit_url, data=xml_data, headers=headers)
+            response = self.send_request('PUT', edit_url, headers, data=xml_data)
             if response.status_code == 200:
                 contact = self.parse_contact_xml(response.text)
+                self.notify_change('updated', contact, edit_url)
                 return {"success": True, "contact": contact}
             else:
                 return {"error": f"Failed to update contact: {response.status_code} - {response.text}"}
         except Exception as e:
             return {"error": f"Error updating contact: {str(e)}"}
     
+    @timed_write('delete')
     def delete_contact(self, edit_url):
         """Delete a contact"""
         headers = self.get_auth_headers()
         
         if not headers:
-            return {"error": "Authentication failed"}
+            return {"error": self.auth_failure()}
         
         try:
-            response = requests.delete(edit_url, headers=headers)
+            response = self.send_request('DELETE', edit_url, headers)
             if response.status_code == 200:
+                self.notify_change('deleted', edit_url=edit_url)
                 return {"success": True}
             else:
                 return {"error": f"Failed to delete contact: {response.status_code} - {response.text}"}
         except Exception as e:
             return {"error": f"Error deleting contact: {str(e)}"}
     
-    def find_duplicates(self, contacts, threshold=0.8):
-        """Find duplicate contacts based on similarity"""
-        duplicates = []
-        
-        for i, contact1 in enumerate(contacts):
-            for j, contact2 in enumerate(contacts[i+1:], i+1):
-                similarity = self.calculate_similarity(contact1, contact2)
-                if similarity >= threshold:
-                    duplicates.append({
-                        'contact1': contact1,
-                        'contact2': contact2,
-                        'similarity': similarity
-                    })
-        
-        return duplicates
+    def batch(self, operations):
+        """Apply create/update/delete operations through the batch feed, BATCH_SIZE per request
+
+        Operations look like {"op": "create", "contact_data": {...}},
+        {"op": "update", "edit_url": ..., "contact_data": {...}} or
+        {"op": "delete", "edit_url": ...}. Returns one result per operation, in
+        order, shaped like the create_contact/update_contact/delete_contact results.
+        """
+        results = []
+        for start in range(0, len(operations), BATCH_SIZE):
+            results.extend(self._send_batch(operations[start:start + BATCH_SIZE]))
+        return results
     
-    def calculate_similarity(self, contact1, contact2):
-        """Calculate similarity between two contacts"""
-        # Compare names
-        name1 = f"{contact1.get('first_name', '')} {contact1.get('last_name', '')}".strip().lower()
-        name2 = f"{contact2.get('first_name', '')} {contact2.get('last_name', '')}".strip().lower()
-        name_similarity = SequenceMatcher(None, name1, name2).ratio()
+    @timed_write('batch')
+    def _send_batch(self, operations, max_retries=None):
+        results, entries = batch_feed.prepare(operations)
+        if not entries:
+            return results
         
-        # Compare primary emails
-        email1 = ""
-        email2 = ""
+        headers = self.get_auth_headers()
+        if not headers:
+            return batch_feed.fail(results, self.auth_failure())
+        if self.write_limiter:
+            self.write_limiter.acquire()
         
-        if contact1.get('emails'):
-            for email in contact1['emails']:
-                if email.get('primary'):
-                    email1 = email.get('address', '').lower()
-                    break
-            if not email1 and contact1['emails']:
-                email1 = contact1['emails'][0].get('address', '').lower()
+        url = f"{self.feed_url}/contacts/{self.domain}/full/batch"
+        xml_data = atom_writer.batch_feed_xml(entries)
         
-        if contact2.get('emails'):
-            for email in contact2['emails']:
-                if email.get('primary'):
-                    email2 = email.get('address', '').lower()
-                    break
-            if not email2 and contact2['emails']:
-                email2 = contact2['emails'][0].get('address', '').lower()
+        try:
+            response = self.send_request('POST', url, headers, data=xml_data.encode('utf-8'), max_retries=max_retries)
+            if response.status_code != 200:
+                batch_feed.pace(self.write_limiter, response.status_code)
+                return batch_feed.fail_response(results, response.status_code, response.text,
+                                                response.headers.get('Retry-After'))
+            from feed_parser import parse_batch_feed
+            statuses = parse_batch_feed(response.content)
+        except Exception as e:
+            return batch_feed.fail(results, f"Error running batch: {str(e)}")
         
-        email_similarity = 1.0 if email1 and email1 == email2 else 0.0
+        batch_feed.pace(self.write_limiter, response.status_code, statuses)
+        return batch_feed.apply_statuses(operations, results, statuses, self.notify_change)
+    
+    def delete_many(self, edit_urls, concurrency=None, max_attempts=None):
+        """Delete contacts through concurrent batch requests; yields (index, edit_url, result) as each settles
+
+        At most `concurrency` batch requests are in flight, all paced by the
+        shared write limiter. Items answered with 429/503 are retried with
+        backoff in later batches, up to `max_attempts`; 412 conflicts are
+        retried once against a re-fetched edit URL. Closing the generator
+        stops dispatching new batches.
+        """
+        if concurrency is None:
+            concurrency = WRITE_CONCURRENCY
+        concurrency = max(concurrency, 1)
+        if max_attempts is None:
+            max_attempts = WRITE_MAX_ATTEMPTS
+        # (index, edit_url, attempt, ready_at)
+        queue = [(index, edit_url, 0, 0.0) for index, edit_url in enumerate(edit_urls)]
+        in_flight = {}
+        pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='delete')
+        try:
+            while queue or in_flight:
+                now = time.monotonic()
+                while len(in_flight) < concurrency:
+                    chunk = [item for item in queue if item[3] <= now][:BATCH_SIZE]
+                    if not chunk:
+                        break
+                    taken = {item[0] for item in chunk}
+                    queue = [item for item in queue if item[0] not in taken]
+                    future = pool.submit(self._delete_chunk, [item[1] for item in chunk])
+                    in_flight[future] = chunk
+                
+                timeout = max(min(item[3] for item in queue) - now, 0) if queue else None
+                if not in_flight:
+                    time.sleep(timeout)
+                    continue
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    chunk = in_flight.pop(future)
+                    retries = []
+                    for (index, edit_url, attempt, _), result in zip(chunk, future.result()):
+                        if result.get('status') in THROTTLE_STATUSES and attempt + 1 < max_attempts:
+                            retries.append((index, edit_url, attempt, result.get('retry_after')))
+                        else:
+                            yield index, edit_url, result
+                    if retries:
+                        # One backoff for the whole throttled chunk, so it is retried as one
+                        # batch rather than scattered across many small ones
+                        retry_after = max((r[3] for r in retries if r[3] is not None), default=None)
+                        delay = backoff_delay(max(r[2] for r in retries), self.http.backoff_base,
+                                              self.http.backoff_max, retry_after)
+                        ready_at = time.monotonic() + delay
+                        queue.extend((index, edit_url, attempt + 1, ready_at)
+                                     for index, edit_url, attempt, _ in retries)
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+    
+    def _delete_chunk(self, edit_urls):
+        # Throttled batches come back to delete_many instead of being retried in place
+        results = self._send_batch([{"op": "delete", "edit_url": edit_url} for edit_url in edit_urls], max_retries=0)
+        for index, result in enumerate(results):
+            if result.get('status') == 412:
+                results[index] = self._delete_refetched(edit_urls[index])
+        return results
+    
+    def _delete_refetched(self, edit_url):
+        """Retry a delete that hit 412 against the contact's current edit URL"""
+        headers = self.get_auth_headers()
+        if not headers:
+            return {"error": self.auth_failure()}
+        
+        try:
+            response = self.send_request('GET', edit_url, headers)
+            if response.status_code != 200:
+                return {"error": f"Failed to re-fetch contact: {response.status_code} - {response.text}",
+                        "status": response.status_code}
+            current_url = self.parse_contact_xml(response.text).get('edit_url') or edit_url
+        except Exception as e:
+            return {"error": f"Error re-fetching contact: {str(e)}"}
         
-        # Weighted average (email is more important for duplicates)
-        return (name_similarity * 0.4 + email_similarity * 0.6)
+        result = self.delete_contact(current_url)
+        if result.get('success') and current_url != edit_url:
+            self.notify_change('deleted', edit_url=edit_url)
+        return result
+    
+    def find_duplicates(self, contacts, threshold=0.8, method=None):
+        """Find duplicate contacts based on similarity"""
+        import dedupe
+        duplicates, report = dedupe.scan(contacts, threshold, method or DEDUPE_METHOD,
+                                         DEDUPE_WORKERS, DEDUPE_CHUNK_SIZE)
+        record_scan(report, threshold)
+        return duplicates
+    
+    def calculate_similarity(self, contact1, contact2):
+        """Calculate similarity between two contacts"""
+        import dedupe
+        return dedupe.calculate_similarity(contact1, contact2)
 
-# Initialize the contacts manager
+# Initialize the contacts manager; credentials and the HTTP session load on first use (see prewarm())
 contacts_manager = GoogleWorkspaceContactsManager(SERVICE_ACCOUNT_FILE, DOMAIN)
+contact_store = ContactStore(contacts_manager, max_age=CONTACT_CACHE_MAX_AGE, db_path=CONTACT_CACHE_DB)
+contact_index = ContactIndex()
+contact_store.add_listener(contact_index.apply)
+duplicate_index = DuplicateIndex(min_threshold=DUPLICATE_INDEX_THRESHOLD)
+contact_store.add_listener(duplicate_index.apply)
+job_manager = JobManager(max_workers=JOB_WORKERS, history=JOB_HISTORY, db_path=JOB_DB)
+
+def prewarm():
+    """Fetch the first access token and sync the snapshot on a background thread
+
+    Called per worker (see gunicorn.conf.py) so the first request doesn't pay
+    for loading credentials, the token round trip and the initial crawl.
+    Failures are logged; requests then retry them as usual.
+    """
+    def run():
+        started = time.perf_counter()
+        if contacts_manager.get_auth_headers() is None:
+            logger.error('Pre-warm failed: %s', contacts_manager.auth_failure(), extra={'event': 'prewarm_failed'})
+            return
+        error = contact_store.ensure_fresh()
+        if error:
+            logger.error('Pre-warm sync failed: %s', error['error'], extra={'event': 'prewarm_failed'})
+            return
+        logger.info('Pre-warm finished', extra={
+            'event': 'prewarm', 'contacts': contact_store.stats()['contacts'],
+            'seconds': round(time.perf_counter() - started, 3)
+        })
+
+    thread = threading.Thread(target=run, name='prewarm', daemon=True)
+    thread.start()
+    return thread
+
+def record_scan(report, threshold, **fields):
+    """Publish a dedupe.scan() report as metrics and a structured log line"""
+    observability.observe_scan(report)
+    pairs_per_second = report['pairs_compared'] / report['scoring_seconds'] if report['scoring_seconds'] else None
+    logger.info('Duplicate scan finished', extra=dict(
+        fields, event='duplicate_scan', threshold=threshold,
+        pairs_per_second=round(pairs_per_second) if pairs_per_second else None, **report
+    ))
+
+def start_duplicate_scan(threshold):
+    """Start a background duplicate scan, reusing one for the same snapshot version and threshold"""
+    cache_key = None
+    if contact_store.is_fresh():
+        cache_key = ('duplicates', contact_store.version, threshold)
+    return job_manager.submit('duplicates', lambda job: run_duplicate_scan(job, threshold),
+                              params={"threshold": threshold}, cache_key=cache_key)
+
+def run_duplicate_scan(job, threshold):
+    """Job body: sync the snapshot, then score it, publishing matches per shard"""
+    def on_page(pages, contacts):
+        job.update(pages_fetched=pages, contacts_fetched=contacts)
+
+    error = contact_store.ensure_fresh(on_page=on_page)
+    if error:
+        raise ContactsAPIError(error['error'])
+
+    contacts, version = contact_store.snapshot()
+    indexed = duplicate_index.duplicates(threshold)
+    if indexed is not None:
+        job.update(contacts=len(contacts), matches=len(indexed))
+        return {"duplicates": indexed, "report": {"method": "index", "matches": len(indexed)}, "version": version}
+
+    cache_key = ('duplicates', version, threshold)
+    cached = job_manager.find(cache_key)
+    if cached and cached is not job and cached.status == 'done':
+        job.update(cached=True)
+        return cached.result
+    job_manager.remember(job, cache_key)
+    job.update(contacts=len(contacts), pairs_scored=0, matches=0)
+
+    def progress(pairs_scored, duplicates):
+        job.add_partial(duplicates)
+        job.update(pairs_scored=pairs_scored, matches=job.progress['matches'] + len(duplicates))
+
+    import dedupe
+    duplicates, report = dedupe.scan(contacts, threshold, DEDUPE_METHOD, DEDUPE_WORKERS,
+                                     DEDUPE_CHUNK_SIZE, progress=progress)
+    record_scan(report, threshold, job=job.id)
+    job.update(pairs_total=report['pairs_compared'])
+    return {"duplicates": duplicates, "report": report, "version": version}
 
 # Routes
 @app.route('/')
@@ -331,15 +746,74 @@ def index():
 
 @app.route('/api/contacts', methods=['GET'])
 def get_contacts():
-    result = contacts_manager.get_contacts()
+    force = request.args.get('refresh', 'false').lower() == 'true'
+    if request.args.get('stream') == 'ndjson':
+        return Response(stream_contacts(force), mimetype='application/x-ndjson')
+    result = contact_store.get_contacts(force=force)
+    return jsonify(result)
+
+def stream_contacts(force=False):
+    """Yield one JSON contact per line, a page at a time; a failure ends the stream with an {"error": ...} line"""
+    try:
+        for page in contact_store.iter_contacts(force=force):
+            if page:
+                yield ''.join(json.dumps(contact) + '\n' for contact in page)
+    except Exception as e:
+        yield json.dumps(ContactStore.error_result(e)) + '\n'
+
+@app.route('/api/contacts/search', methods=['GET'])
+def search_contacts():
+    force = request.args.get('refresh', 'false').lower() == 'true'
+    error = contact_store.ensure_fresh(force=force)
+    if error:
+        return jsonify(error)
+    
+    try:
+        limit = max(1, min(int(request.args.get('limit', SEARCH_PAGE_SIZE)), SEARCH_MAX_PAGE_SIZE))
+        result = contact_index.search(request.args.get('q', ''), domain=request.args.get('domain'),
+                                      limit=limit, cursor=request.args.get('cursor'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     return jsonify(result)
 
 @app.route('/api/contacts', methods=['POST'])
 def create_contact():
     contact_data = request.json
+    threshold = float(request.args.get('duplicate_threshold', DUPLICATE_CHECK_THRESHOLD))
+    reject = request.args.get('reject_duplicates', str(REJECT_DUPLICATES)).lower() == 'true'
+    
+    # The index is only populated once the snapshot has been loaded; a cold
+    # worker syncs first so the check (and reject_duplicates) isn't skipped
+    likely_duplicates = None
+    if not duplicate_index.loaded:
+        error = contact_store.ensure_fresh()
+        if error and reject:
+            return jsonify(error)
+    if duplicate_index.loaded:
+        likely_duplicates = duplicate_index.check(contact_from_data(contact_data), threshold)
+        if likely_duplicates and reject:
+            return jsonify({"error": "Contact looks like a duplicate of an existing contact",
+                            "duplicates": likely_duplicates}), 409
+    
     result = contacts_manager.create_contact(contact_data)
+    if likely_duplicates is not None and 'error' not in result:
+        result["duplicates"] = likely_duplicates
     return jsonify(result)
 
+@app.route('/api/contacts/batch', methods=['POST'])
+def batch_contacts():
+    data = request.json or {}
+    operations = data.get('operations')
+    
+    if not isinstance(operations, list):
+        return jsonify({"error": "Missing operations"}), 400
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            return jsonify({"error": f"Operation {index} is not an object"}), 400
+    
+    results = contacts_manager.batch(operations)
+    return jsonify({"results": results})
+
 @app.route('/api/contacts/update', methods=['PUT'])
 def update_contact():
     data = request.json
@@ -363,34 +837,188 @@ def delete_contact():
     result = contacts_manager.delete_contact(edit_url)
     return jsonify(result)
 
+def start_import(csv_import):
+    """Run (or resume) a CSV import in the background; one job per import at a time"""
+    return job_manager.submit('import', lambda job: run_import(job, csv_import),
+                              params={"import_id": csv_import.import_id},
+                              cache_key=('import', csv_import.import_id))
+
+def run_import(job, csv_import):
+    """Job body: take the import's lease, dedupe against a fresh snapshot, then stream the file through batch writes"""
+    def progress(state):
+        job.update(checkpoint_row=state['row'], bytes_read=state['bytes_read'], bytes_total=state['bytes_total'],
+                   **state['counts'])
+
+    with csv_import.lease(job.id):
+        error = contact_store.ensure_fresh()
+        if error:
+            raise ContactsAPIError(error['error'])
+        contacts, _ = contact_store.snapshot()
+        state = csv_import.run(contacts_manager, existing_emails(contacts), BATCH_SIZE, IMPORT_CONCURRENCY,
+                               progress)
+    # Skipped duplicates are expected, not errors; they are still listed in the report
+    return {"import_id": csv_import.import_id, "counts": state['counts'],
+            "errors": state['counts']['invalid'] + state['counts']['failed']}
+
+def import_status(csv_import):
+    """Checkpoint and job of an import, whichever worker runs or ran it"""
+    job = job_manager.find(('import', csv_import.import_id), include_failed=True)
+    owner = csv_import.owner()
+    if owner and (job is None or job.id != owner):
+        job = job_manager.get(owner) or job
+    return {
+        "import_id": csv_import.import_id,
+        "checkpoint": csv_import.load_checkpoint(),
+        "job": job.to_dict() if job else None
+    }
+
+def find_import(import_id):
+    try:
+        csv_import = CSVImport(IMPORT_DIR, import_id)
+    except ValueError:
+        return None
+    return csv_import if csv_import.exists() else None
+
+@app.route('/api/import', methods=['POST'])
+def import_csv():
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({"error": "Missing file"}), 400
+    
+    try:
+        csv_import = CSVImport.create(IMPORT_DIR, upload)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    job = start_import(csv_import)
+    return jsonify({"import_id": csv_import.import_id, "job": job.to_dict()}), 202
+
+@app.route('/api/import/<import_id>/resume', methods=['POST'])
+def resume_import(import_id):
+    csv_import = find_import(import_id)
+    if csv_import is None:
+        return jsonify({"error": "Import not found"}), 404
+    if csv_import.running():
+        # Possibly in another worker; a second run would write the same rows again
+        return jsonify(dict(import_status(csv_import), error="Import is already running")), 409
+    job = start_import(csv_import)
+    return jsonify({"import_id": import_id, "job": job.to_dict()}), 200 if job.done else 202
+
+@app.route('/api/import/<import_id>/errors', methods=['GET'])
+def import_errors(import_id):
+    csv_import = find_import(import_id)
+    if csv_import is None or not os.path.exists(csv_import.report_path):
+        return jsonify({"error": "Import not found"}), 404
+    return send_file(csv_import.report_path, mimetype='text/csv', as_attachment=True,
+                     download_name=f"import-{import_id}-errors.csv")
+
+@app.route('/api/import/<import_id>', methods=['GET'])
+def get_import(import_id):
+    csv_import = find_import(import_id)
+    if csv_import is None:
+        return jsonify({"error": "Import not found"}), 404
+    return jsonify(import_status(csv_import))
+
 @app.route('/api/duplicates', methods=['GET'])
 def find_duplicates():
     threshold = float(request.args.get('threshold', 0.8))
-    contacts_result = contacts_manager.get_contacts()
+    started = time.perf_counter()
+    contacts_result = contact_store.get_contacts()
+    synced = time.perf_counter()
     
     if 'error' in contacts_result:
         return jsonify(contacts_result)
     
-    contacts = contacts_result.get('contacts', [])
-    duplicates = contacts_manager.find_duplicates(contacts, threshold)
+    duplicates = duplicate_index.duplicates(threshold)
+    source = 'index'
+    if duplicates is None:
+        contacts = contacts_result.get('contacts', [])
+        duplicates = contacts_manager.find_duplicates(contacts, threshold)
+        source = 'scan'
+    found = time.perf_counter()
     
-    return jsonify({"duplicates": duplicates})
+    response = jsonify({"duplicates": duplicates})
+    finished = time.perf_counter()
+    # Where the time of a slow listing goes: snapshot sync, matching, JSON encoding
+    stages = {'sync': synced - started, 'find': found - synced, 'render': finished - found}
+    for stage, seconds in stages.items():
+        DUPLICATES_REQUEST_SECONDS.observe(seconds, stage=stage)
+    logger.info('Listed duplicates', extra={
+        'event': 'duplicates_request', 'threshold': threshold, 'source': source,
+        'contacts': len(contacts_result.get('contacts', [])), 'matches': len(duplicates),
+        **{f"{stage}_seconds": round(seconds, 4) for stage, seconds in stages.items()}
+    })
+    return response
+
+@app.route('/api/duplicates/jobs', methods=['POST'])
+def start_duplicates_job():
+    data = request.get_json(silent=True) or {}
+    threshold = float(data.get('threshold', 0.8))
+    job = start_duplicate_scan(threshold)
+    return jsonify({"job": job.to_dict()}), 200 if job.done else 202
+
+@app.route('/api/duplicates/jobs/<job_id>', methods=['GET'])
+def get_duplicates_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    since = int(request.args.get('since', 0))
+    return jsonify({"job": job.to_dict(since)})
 
 @app.route('/api/duplicates/remove', methods=['POST'])
 def remove_duplicates():
     data = request.json
     duplicate_ids = data.get('duplicate_ids', [])
     
-    results = []
-    for edit_url in duplicate_ids:
-        result = contacts_manager.delete_contact(edit_url)
-        results.append({"edit_url": edit_url, "result": result})
+    deletions = contacts_manager.delete_many(duplicate_ids)
+    if request.args.get('stream') == 'ndjson':
+        # One line per contact as it settles; deletes already made stick if the client goes away
+        lines = (json.dumps({"edit_url": edit_url, "result": result}) + '\n' for _, edit_url, result in deletions)
+        return Response(lines, mimetype='application/x-ndjson')
+    
+    results = [None] * len(duplicate_ids)
+    for index, edit_url, result in deletions:
+        results[index] = {"edit_url": edit_url, "result": result}
     
     return jsonify({"results": results})
 
+@app.before_request
+def start_request_timer():
+    request.started = time.perf_counter()
+
+@app.after_request
+def record_request(response):
+    started = getattr(request, 'started', None)
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=request.endpoint or 'unmatched',
+                                method=request.method, status=response.status_code)
+    return response
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(observability.REGISTRY.render(), content_type=observability.CONTENT_TYPE)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
+    # Loads the service account file if nothing has yet, so a bad one shows up here
+    error = contacts_manager.ensure_credentials()
+    if error:
+        return jsonify({"status": "unhealthy", "domain": DOMAIN, "error": error}), 503
     return jsonify({"status": "healthy", "domain": DOMAIN})
 
+@app.route('/api/stats', methods=['GET'])
+def stats():
+    token_manager = contacts_manager.token_manager
+    return jsonify({
+        "token": token_manager.stats() if token_manager else None,
+        # Reading .http would build the session; report nothing until a request has
+        "http": contacts_manager._http.stats() if contacts_manager._http else None,
+        "write_limiter": contacts_manager.write_limiter.stats() if contacts_manager.write_limiter else None,
+        "store": contact_store.stats(),
+        "index": contact_index.stats(),
+        "duplicate_index": duplicate_index.stats(),
+        "jobs": job_manager.stats()
+    })
+
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
@@ -0,0 +1,438 @@
+"""asyncio client for the Shared Contacts feed.
+
+Offers the same operations as GoogleWorkspaceContactsManager (list,
+create, update, delete, batch) with the same result shapes, on one pooled
+aiohttp session. Page fetches and batch requests fan out under a
+semaphore, so a crawl or bulk job holds no thread while it waits on
+Google. Retries follow FeedSession's policy. Tokens come from the same
+TokenManager, whose refreshes run in a worker thread. Feed pages use the
+streaming FeedParser and entries are written by atom_writer.
+
+A client belongs to the event loop it was opened on. Use one per loop:
+
+    async with AsyncContactsClient(domain, credentials) as client:
+        result = await client.get_contacts()
+
+or from the command line:
+
+    python -m async_client list --ndjson
+    python -m async_client batch operations.json
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+
+import aiohttp
+
+import atom_writer
+import batch_feed
+from feed_parser import FeedParser, contact_from_element, parse_batch_feed
+from http_session import ContactsAPIError, IDEMPOTENT_METHODS, RETRY_STATUSES, backoff_delay, parse_retry_after
+from observability import (PAGE_FETCH_SECONDS, PARSE_SECONDS, UPSTREAM_RESPONSES, UPSTREAM_RETRIES,
+                           WRITE_SECONDS)
+from token_manager import TokenManager
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ['https://www.google.com/m8/feeds']
+FEED_URL = 'https://www.google.com/m8/feeds'
+PAGE_SIZE = 1000
+FEED_CHUNK_SIZE = 64 * 1024
+WRITE_VERBS = {'create': 'creating', 'update': 'updating', 'delete': 'deleting'}
+
+
+def parse_entry(body):
+    """Contact dict for a single-entry response, as parse_contact_xml() returns it; None if unparseable"""
+    try:
+        return contact_from_element(ET.fromstring(body))
+    except ET.ParseError as e:
+        logger.warning('Error parsing contact XML: %s', e, extra={'event': 'contact_parse_error'})
+        return None
+
+
+class AccessTokenCredentials:
+    """Credentials for an access token obtained elsewhere, e.g. `gcloud auth print-access-token`"""
+
+    def __init__(self, token):
+        self.token = token
+        self.expiry = None
+
+    def refresh(self, request):
+        pass
+
+
+class AsyncContactsClient:
+    """Async counterpart of GoogleWorkspaceContactsManager; results are shaped the same way.
+
+    At most `concurrency` page fetches or batch requests are in flight
+    per client, over a connection pool of `pool_size`. Batch requests are
+    also paced by `write_limiter`, a TokenBucket (one at WRITE_RATE_LIMIT
+    by default; pass False for none).
+    """
+
+    def __init__(self, domain, credentials, feed_url=FEED_URL, concurrency=4, pool_size=10,
+                 max_retries=4, backoff_base=0.5, backoff_max=30.0, timeout=30, batch_size=100,
+                 refresh_margin=300, write_limiter=None):
+        self.domain = domain
+        self.feed_url = feed_url.rstrip('/')
+        self.token_manager = TokenManager(credentials, refresh_margin=refresh_margin)
+        self.concurrency = max(concurrency, 1)
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.batch_size = min(batch_size, 100)
+        if write_limiter is None:
+            write_limiter = batch_feed.default_write_limiter(self.concurrency)
+        self.write_limiter = write_limiter or None
+        self.change_listeners = []
+        self.requests = 0
+        self.retries = 0
+        self._session = None
+        self._semaphore = None
+
+    async def open(self):
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.pool_size),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+            # The feed is token-authenticated; no cookies, as with FeedSession
+            cookie_jar=aiohttp.DummyCookieJar(),
+            # Google only compresses GData responses when the user agent mentions gzip
+            headers={'Accept-Encoding': 'gzip', 'User-Agent': f"aiohttp/{aiohttp.__version__} (gzip)"}
+        )
+        return self
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def add_change_listener(self, listener):
+        """Call listener(event, contact, edit_url) after every successful write, as the manager does"""
+        self.change_listeners.append(listener)
+
+    def notify_change(self, event, contact=None, edit_url=None):
+        for listener in self.change_listeners:
+            try:
+                listener(event, contact, edit_url)
+            except Exception:
+                logger.exception('Error in change listener', extra={'event': 'change_listener_error', 'change': event})
+
+    async def auth_headers(self):
+        token = await asyncio.to_thread(self.token_manager.get_token)
+        return {
+            'Authorization': f'Bearer {token}',
+            'GData-Version': '3.0',
+            'Content-Type': 'application/atom+xml'
+        }
+
+    async def send_request(self, method, url, max_retries=None, **kwargs):
+        """Send a feed request, retrying like FeedSession and once more with a fresh token after a 401
+
+        Returns the response with its body unread; the caller releases it.
+        """
+        method = method.upper()
+        if max_retries is None:
+            max_retries = self.max_retries
+        headers = await self.auth_headers()
+        refreshed = False
+        attempt = 0
+        while True:
+            self.requests += 1
+            try:
+                response = await self._session.request(method, url, headers=headers, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                UPSTREAM_RESPONSES.inc(method=method, status='error')
+                if attempt >= max_retries or method not in IDEMPOTENT_METHODS:
+                    raise
+                reason = type(e).__name__
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+            else:
+                status = response.status
+                UPSTREAM_RESPONSES.inc(method=method, status=status)
+                if status == 401 and not refreshed:
+                    response.release()
+                    refreshed = True
+                    self.token_manager.invalidate()
+                    headers = await self.auth_headers()
+                    continue
+                if (status not in RETRY_STATUSES or attempt >= max_retries
+                        or (status != 429 and method not in IDEMPOTENT_METHODS)):
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after)
+                reason = status
+                response.release()
+
+            attempt += 1
+            self.retries += 1
+            UPSTREAM_RETRIES.inc(method=method, reason=reason)
+            logger.info('Retrying feed request', extra={
+                'event': 'upstream_retry', 'method': method, 'reason': reason,
+                'attempt': attempt, 'delay_seconds': round(delay, 3)
+            })
+            await asyncio.sleep(delay)
+
+    async def _fetch_page(self, start_index, params):
+        """Fetch one feed page; return (contacts, entries on the page, openSearch:totalResults)"""
+        url = f"{self.feed_url}/contacts/{self.domain}/full"
+        params = dict(params, **{'max-results': PAGE_SIZE, 'start-index': start_index})
+        async with self._semaphore:
+            started = time.perf_counter()
+            response = await self.send_request('GET', url, params=params)
+            try:
+                if response.status != 200:
+                    text = await response.text()
+                    raise ContactsAPIError(f"Failed to retrieve contacts: {response.status} - {text}", response.status)
+                parser = FeedParser()
+                contacts = []
+                async for chunk in response.content.iter_chunked(FEED_CHUNK_SIZE):
+                    contacts.extend(parser.feed(chunk))
+                contacts.extend(parser.close())
+            finally:
+                response.release()
+        PARSE_SECONDS.observe(parser.parse_seconds, parser='async')
+        PAGE_FETCH_SECONDS.observe(time.perf_counter() - started, parser='async')
+        return contacts, parser.entry_count, parser.total_results
+
+    async def iter_pages(self, updated_min=None, show_deleted=False):
+        """Yield each feed page's contacts in feed order; raises ContactsAPIError on failure
+
+        After the first page, the pages up to openSearch:totalResults are
+        fetched concurrently and yielded in order. Only `concurrency` pages
+        are fetched ahead of the one being yielded, so a slow consumer
+        doesn't end up holding the whole directory.
+        """
+        params = {}
+        if updated_min:
+            params['updated-min'] = updated_min
+        if show_deleted:
+            params['showdeleted'] = 'true'
+
+        page_contacts, entry_count, total_results = await self._fetch_page(1, params)
+        yield page_contacts
+        start_index = 1 + PAGE_SIZE
+
+        start_indexes = range(start_index, (total_results or 0) + 1, PAGE_SIZE)
+        if entry_count == PAGE_SIZE and start_indexes:
+            pending = iter(start_indexes)
+            tasks = deque(asyncio.ensure_future(self._fetch_page(index, params))
+                          for index in itertools.islice(pending, self.concurrency))
+            try:
+                while tasks:
+                    page_contacts, entry_count, _ = await tasks.popleft()
+                    for index in itertools.islice(pending, 1):
+                        tasks.append(asyncio.ensure_future(self._fetch_page(index, params)))
+                    yield page_contacts
+            finally:
+                for task in tasks:
+                    task.cancel()
+            start_index += len(start_indexes) * PAGE_SIZE
+
+        # The directory grew past the first page's totalResults
+        while entry_count == PAGE_SIZE:
+            page_contacts, entry_count, _ = await self._fetch_page(start_index, params)
+            yield page_contacts
+            start_index += PAGE_SIZE
+
+    async def get_contacts(self, updated_min=None, show_deleted=False):
+        """Retrieve all shared contacts, or only those changed since updated_min"""
+        contacts = []
+        try:
+            async for page_contacts in self.iter_pages(updated_min, show_deleted):
+                contacts.extend(page_contacts)
+        except ContactsAPIError as e:
+            return {"error": str(e)}
+        except Exception as e:
+            return {"error": f"Error retrieving contacts: {str(e)}"}
+        return {"contacts": contacts}
+
+    async def _write(self, verb, method, url, xml_data, expected_status, event, edit_url=None):
+        started = time.perf_counter()
+        try:
+            response = await self.send_request(method, url, data=xml_data.encode('utf-8') if xml_data else None)
+            try:
+                body = await response.read()
+            finally:
+                response.release()
+            if response.status == expected_status:
+                if event == 'deleted':
+                    self.notify_change(event, edit_url=edit_url)
+                    result = {"success": True}
+                else:
+                    contact = parse_entry(body)
+                    self.notify_change(event, contact, edit_url)
+                    result = {"success": True, "contact": contact}
+            else:
+                text = body.decode('utf-8', 'replace')
+                result = {"error": f"Failed to {verb} contact: {response.status} - {text}"}
+        except Exception as e:
+            result = {"error": f"Error {WRITE_VERBS[verb]} contact: {str(e)}"}
+        WRITE_SECONDS.observe(time.perf_counter() - started, verb=verb,
+                              outcome='success' if result.get('success') else 'error')
+        return result
+
+    async def create_contact(self, contact_data):
+        """Create a new shared contact"""
+        url = f"{self.feed_url}/contacts/{self.domain}/full"
+        return await self._write('create', 'POST', url, atom_writer.entry_xml(contact_data), 201, 'created')
+
+    async def update_contact(self, edit_url, contact_data):
+        """Update an existing contact"""
+        return await self._write('update', 'PUT', edit_url, atom_writer.entry_xml(contact_data), 200, 'updated',
+                                 edit_url)
+
+    async def delete_contact(self, edit_url):
+        """Delete a contact"""
+        return await self._write('delete', 'DELETE', edit_url, None, 200, 'deleted', edit_url)
+
+    async def batch(self, operations):
+        """Apply create/update/delete operations through the batch feed
+
+        Takes the same operations as GoogleWorkspaceContactsManager.batch()
+        and returns one result per operation, in order. Chunks of
+        batch_size are sent concurrently, bounded by the client's semaphore.
+        """
+        chunks = [operations[start:start + self.batch_size] for start in range(0, len(operations), self.batch_size)]
+        chunk_results = await asyncio.gather(*(self._send_batch(chunk) for chunk in chunks))
+        return [result for results in chunk_results for result in results]
+
+    async def _send_batch(self, operations):
+        results, entries = batch_feed.prepare(operations)
+        if not entries:
+            return results
+
+        url = f"{self.feed_url}/contacts/{self.domain}/full/batch"
+        xml_data = atom_writer.batch_feed_xml(entries)
+        started = time.perf_counter()
+        async with self._semaphore:
+            if self.write_limiter:
+                await self.write_limiter.acquire_async()
+            try:
+                response = await self.send_request('POST', url, data=xml_data.encode('utf-8'))
+                try:
+                    body = await response.read()
+                finally:
+                    response.release()
+                if response.status != 200:
+                    batch_feed.pace(self.write_limiter, response.status)
+                    results = batch_feed.fail_response(results, response.status, body.decode('utf-8', 'replace'),
+                                                       response.headers.get('Retry-After'))
+                else:
+                    statuses = parse_batch_feed(body)
+                    batch_feed.pace(self.write_limiter, response.status, statuses)
+                    results = batch_feed.apply_statuses(operations, results, statuses, self.notify_change)
+            except Exception as e:
+                results = batch_feed.fail(results, f"Error running batch: {str(e)}")
+
+        succeeded = sum(1 for result in results if result.get('success'))
+        WRITE_SECONDS.observe(time.perf_counter() - started, verb='batch',
+                              outcome='success' if succeeded == len(results) else 'partial' if succeeded else 'error')
+        return results
+
+    def stats(self):
+        return {'requests': self.requests, 'retries': self.retries, 'token': self.token_manager.stats(),
+                'write_limiter': self.write_limiter.stats() if self.write_limiter else None}
+
+
+def load_credentials(args):
+    if args.access_token:
+        return AccessTokenCredentials(args.access_token)
+    from google.oauth2 import service_account
+    credentials = service_account.Credentials.from_service_account_file(args.credentials, scopes=SCOPES)
+    admin_email = os.getenv('ADMIN_EMAIL')
+    if admin_email:
+        credentials = credentials.with_subject(admin_email)
+    return credentials
+
+
+def read_operations(path):
+    """Operations from a JSON array or NDJSON file ('-' for stdin)"""
+    if path == '-':
+        text = sys.stdin.read()
+    else:
+        with open(path) as f:
+            text = f.read()
+    text = text.strip()
+    if text.startswith('['):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+async def run(args):
+    async with AsyncContactsClient(args.domain, load_credentials(args), feed_url=args.feed_url,
+                                   concurrency=args.concurrency, pool_size=max(args.concurrency, 10)) as client:
+        if args.command == 'list':
+            count = 0
+            try:
+                async for page in client.iter_pages():
+                    count += len(page)
+                    if args.ndjson:
+                        sys.stdout.write(''.join(json.dumps(contact) + '\n' for contact in page))
+            except ContactsAPIError as e:
+                print(json.dumps({"error": str(e)}))
+                return 1
+            if not args.ndjson:
+                print(json.dumps({"contacts": count}))
+            return 0
+        if args.command == 'create':
+            result = await client.create_contact(json.loads(args.contact))
+        elif args.command == 'update':
+            result = await client.update_contact(args.edit_url, json.loads(args.contact))
+        elif args.command == 'delete':
+            result = await client.delete_contact(args.edit_url)
+        else:
+            results = await client.batch(read_operations(args.operations))
+            for result in results:
+                print(json.dumps(result))
+            return 0 if all(result.get('success') for result in results) else 1
+        print(json.dumps(result))
+        return 0 if result.get('success') else 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Shared Contacts feed client (asyncio)')
+    parser.add_argument('--domain', default=os.getenv('WORKSPACE_DOMAIN', 'example.com'))
+    parser.add_argument('--feed-url', default=os.getenv('FEED_URL', FEED_URL))
+    parser.add_argument('--credentials', default=os.getenv('SERVICE_ACCOUNT_FILE', 'credentials.json'),
+                        help='service account key file (ADMIN_EMAIL is used for delegation)')
+    parser.add_argument('--access-token', default=os.getenv('ACCESS_TOKEN'),
+                        help='use this OAuth access token instead of a service account')
+    parser.add_argument('--concurrency', type=int, default=int(os.getenv('FEED_CONCURRENCY', 4)),
+                        help='page fetches or batch requests in flight')
+    commands = parser.add_subparsers(dest='command', required=True)
+    list_command = commands.add_parser('list', help='crawl the feed and print the contact count')
+    list_command.add_argument('--ndjson', action='store_true', help='print every contact, one JSON object per line')
+    create_command = commands.add_parser('create', help='create a contact from a contact_data JSON object')
+    create_command.add_argument('contact')
+    update_command = commands.add_parser('update', help='replace a contact with a contact_data JSON object')
+    update_command.add_argument('edit_url')
+    update_command.add_argument('contact')
+    delete_command = commands.add_parser('delete', help='delete a contact')
+    delete_command.add_argument('edit_url')
+    batch_command = commands.add_parser('batch', help='run batch operations from a JSON or NDJSON file')
+    batch_command.add_argument('operations', help="file of {\"op\", \"edit_url\", \"contact_data\"} objects, or '-'")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=os.getenv('LOG_LEVEL', 'WARNING'))
+    sys.exit(asyncio.run(run(args)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""Atom entry and batch feed serialization for shared contact writes.
+
+Entries are assembled from fragments prepared once at import time, and a
+whole batch feed is written into a single list and joined once, so a bulk
+write costs one string allocation per value rather than a template copy
+per contact. Values are escaped for the context they land in, and the
+characters XML 1.0 cannot carry at all are dropped.
+"""
+
+import re
+
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+GD_NS = 'http://schemas.google.com/g/2005'
+BATCH_NS = 'http://schemas.google.com/gdata/batch'
+WORK_REL = 'http://schemas.google.com/g/2005#work'
+HOME_REL = 'http://schemas.google.com/g/2005#home'
+
+XML_DECLARATION = "<?xml version='1.0' encoding='UTF-8'?>\n"
+ENTRY_NAMESPACES = f" xmlns:atom='{ATOM_NS}' xmlns:gd='{GD_NS}'"
+FEED_OPEN = f"<atom:feed xmlns:atom='{ATOM_NS}' xmlns:gd='{GD_NS}' xmlns:batch='{BATCH_NS}'>\n"
+FEED_CLOSE = "</atom:feed>"
+
+# Precompiled entry skeleton: the constant text between the values
+CATEGORY = ("<atom:category scheme='http://schemas.google.com/g/2005#kind' "
+            "term='http://schemas.google.com/contact/2008#contact'/>")
+NAME_OPEN = "<gd:name><gd:givenName>"
+GIVEN_TO_FAMILY = "</gd:givenName><gd:familyName>"
+FAMILY_TO_FULL = "</gd:familyName><gd:fullName>"
+FULL_TO_CONTENT = "</gd:fullName></gd:name><atom:content type='text'>"
+CONTENT_TO_EMAIL = f"</atom:content><gd:email rel='{WORK_REL}' primary='true' address='"
+EMAIL_TO_DISPLAY_NAME = "' displayName='"
+EMAIL_CLOSE = "'/>"
+HOME_EMAIL_OPEN = f"<gd:email rel='{HOME_REL}' address='"
+PHONE_OPEN = f"<gd:phoneNumber rel='{WORK_REL}' primary='true'>"
+PHONE_CLOSE = "</gd:phoneNumber>"
+ADDRESS_OPEN = f"<gd:structuredPostalAddress rel='{WORK_REL}' primary='true'>"
+ADDRESS_CLOSE = "</gd:structuredPostalAddress>"
+ADDRESS_FIELDS = ('city', 'street', 'region', 'postcode', 'country')
+ENTRY_CLOSE = "</atom:entry>"
+
+# Characters that need escaping in text or attribute values, plus the ones
+# XML 1.0 forbids outright (C0 controls other than tab/LF/CR, lone
+# surrogates, U+FFFE/U+FFFF), which are dropped
+_TEXT_SPECIAL = re.compile(r'[&<>\r\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+_ATTR_SPECIAL = re.compile(r"""[&<>'"\t\n\r\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]""")
+_REPLACEMENTS = {
+    '&': '&amp;', '<': '&lt;', '>': '&gt;', "'": '&apos;', '"': '&quot;',
+    # Escaped so the parser doesn't normalise them away on the round trip
+    '\t': '&#9;', '\n': '&#10;', '\r': '&#13;'
+}
+
+
+def _replace(match):
+    return _REPLACEMENTS.get(match.group(), '')
+
+
+def escape_text(value):
+    """Escape a value for element content"""
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        value = str(value)
+    if _TEXT_SPECIAL.search(value) is None:
+        return value
+    return _TEXT_SPECIAL.sub(_replace, value)
+
+
+def escape_attr(value):
+    """Escape a value for a quoted attribute (either quote style)"""
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        value = str(value)
+    if _ATTR_SPECIAL.search(value) is None:
+        return value
+    return _ATTR_SPECIAL.sub(_replace, value)
+
+
+def write_entry(parts, contact_data, batch_id=None, operation=None, edit_url=None, namespaces=True):
+    """Append one <atom:entry> for contact_data to `parts`
+
+    With batch_id/operation the entry carries its batch:id and
+    batch:operation, and edit_url becomes its atom:id as the batch feed
+    expects. contact_data may be None for a delete. Entries inside a batch
+    feed leave out the namespace declarations the feed already makes.
+    """
+    append = parts.append
+    append("<atom:entry" + ENTRY_NAMESPACES + ">" if namespaces else "<atom:entry>")
+    if operation:
+        append(f"<batch:id>{escape_text(batch_id)}</batch:id><batch:operation type='{operation}'/>")
+    if edit_url:
+        append("<atom:id>")
+        append(escape_text(edit_url))
+        append("</atom:id>")
+    if contact_data is None:
+        append(ENTRY_CLOSE)
+        return parts
+
+    get = contact_data.get
+    first_name = escape_text(get('first_name', ''))
+    last_name = escape_text(get('last_name', ''))
+    email = get('email', '')
+    append(CATEGORY)
+    append(NAME_OPEN)
+    append(first_name)
+    append(GIVEN_TO_FAMILY)
+    append(last_name)
+    append(FAMILY_TO_FULL)
+    append(f"{first_name} {last_name}".strip())
+    append(FULL_TO_CONTENT)
+    append(escape_text(get('notes', '')))
+    append(CONTENT_TO_EMAIL)
+    append(escape_attr(email))
+    append(EMAIL_TO_DISPLAY_NAME)
+    append(escape_attr(get('display_name', email)))
+    append(EMAIL_CLOSE)
+
+    for additional_email in get('additional_emails') or ():
+        append(HOME_EMAIL_OPEN)
+        append(escape_attr(additional_email))
+        append(EMAIL_CLOSE)
+
+    phone = get('phone')
+    if phone:
+        append(PHONE_OPEN)
+        append(escape_text(phone))
+        append(PHONE_CLOSE)
+
+    address = get('address')
+    if address:
+        append(ADDRESS_OPEN)
+        for field in ADDRESS_FIELDS:
+            append(f"<gd:{field}>{escape_text(address.get(field, ''))}</gd:{field}>")
+        append(ADDRESS_CLOSE)
+
+    append(ENTRY_CLOSE)
+    return parts
+
+
+def entry_xml(contact_data):
+    """A standalone entry document for a single create or update"""
+    return ''.join(write_entry([XML_DECLARATION], contact_data))
+
+
+def batch_feed_xml(entries):
+    """A batch feed document, built in one pass
+
+    entries yields (batch_id, operation, contact_data, edit_url) tuples,
+    with operation one of insert/update/delete.
+    """
+    parts = [XML_DECLARATION, FEED_OPEN]
+    for batch_id, operation, contact_data, edit_url in entries:
+        write_entry(parts, contact_data, batch_id, operation, edit_url, namespaces=False)
+        parts.append('\n')
+    parts.append(FEED_CLOSE)
+    return ''.join(parts)
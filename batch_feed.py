@@ -0,0 +1,100 @@
+"""Batch feed bookkeeping shared by GoogleWorkspaceContactsManager and AsyncContactsClient.
+
+Both clients validate operations, send the valid ones as one batch feed
+(atom_writer.batch_feed_xml) and map the parsed batch:status of each entry
+(feed_parser.parse_batch_feed) back to per-operation results. Only the
+request itself differs, so everything around it lives here.
+"""
+
+import os
+
+from http_session import parse_retry_after
+from rate_limiter import TokenBucket
+
+# Operation names accepted by batch() and the batch:operation type each maps to
+BATCH_OPERATIONS = {'create': 'insert', 'update': 'update', 'delete': 'delete'}
+# Statuses meaning "slow down and try again", whole-request or per batch entry
+THROTTLE_STATUSES = frozenset([429, 503])
+
+
+def default_write_limiter(burst):
+    """TokenBucket at WRITE_RATE_LIMIT batch requests per second, or None when that is 0 (unlimited)
+
+    The setting is read on each call rather than at import, so it is the
+    same for both clients and picks up a .env loaded after importing this.
+    The limiter halves its rate whenever Google answers 429/503 and creeps
+    back afterwards.
+    """
+    rate = float(os.getenv('WRITE_RATE_LIMIT', 10))
+    return TokenBucket(rate, burst=burst) if rate > 0 else None
+
+
+def prepare(operations):
+    """Validate operations; return (results, entries)
+
+    results has an error for every invalid operation and None elsewhere;
+    entries are the (batch_id, operation type, contact_data, edit_url)
+    tuples atom_writer.batch_feed_xml() takes, batch_id being the
+    operation's index.
+    """
+    results = [None] * len(operations)
+    entries = []
+    for index, operation in enumerate(operations):
+        if not isinstance(operation, dict):
+            results[index] = {"error": "Operation must be an object"}
+            continue
+        op = operation.get('op')
+        if op not in BATCH_OPERATIONS:
+            results[index] = {"error": f"Unknown batch operation: {op}"}
+        elif op != 'create' and not operation.get('edit_url'):
+            results[index] = {"error": "Missing edit_url"}
+        elif op != 'delete' and not operation.get('contact_data'):
+            results[index] = {"error": "Missing contact_data"}
+        else:
+            entries.append((index, BATCH_OPERATIONS[op], operation.get('contact_data'), operation.get('edit_url')))
+    return results, entries
+
+
+def fail(results, message, **details):
+    """Fill every operation without a result yet with the same error"""
+    return [result or dict({"error": message}, **details) for result in results]
+
+
+def fail_response(results, status, text, retry_after_header=None):
+    """fail() for a batch request answered with a non-200 status"""
+    details = {"status": status}
+    retry_after = parse_retry_after(retry_after_header)
+    if retry_after is not None:
+        details["retry_after"] = retry_after
+    return fail(results, f"Failed to run batch: {status} - {text}", **details)
+
+
+def apply_statuses(operations, results, statuses, notify_change):
+    """Turn parse_batch_feed() statuses into results, notifying listeners of each write that went through"""
+    for index, operation in enumerate(operations):
+        if results[index] is not None:
+            continue
+        op = operation['op']
+        if str(index) not in statuses:
+            results[index] = {"error": f"Failed to {op} contact: not processed by the batch"}
+            continue
+        code, reason, contact = statuses[str(index)]
+        if code not in (200, 201):
+            results[index] = {"error": f"Failed to {op} contact: {code} - {reason}", "status": code}
+        elif op == 'delete':
+            notify_change('deleted', edit_url=operation['edit_url'])
+            results[index] = {"success": True}
+        else:
+            notify_change('created' if op == 'create' else 'updated', contact, operation.get('edit_url'))
+            results[index] = {"success": True, "contact": contact}
+    return results
+
+
+def pace(write_limiter, status, statuses=None):
+    """Report a batch outcome to the write limiter: throttle on 429/503, whole or per entry, else recover"""
+    if not write_limiter:
+        return
+    if status in THROTTLE_STATUSES or any(code in THROTTLE_STATUSES for code, _, _ in (statuses or {}).values()):
+        write_limiter.throttle()
+    elif status == 200:
+        write_limiter.recover()
@@ -0,0 +1,211 @@
+"""Round-trip and throughput check for the Atom entry serializer.
+
+Every written entry is parsed back with parse_contact_xml() (and every
+batch feed with the feed parser's entry reader) and must reproduce the
+input, including values full of markup, quotes, line breaks and
+characters XML cannot carry. Throughput is compared with the string
+template create_contact_xml() used to build.
+
+    python -m benchmarks.bench_atom_writer --contacts 20000
+"""
+
+import argparse
+import re
+import time
+import xml.etree.ElementTree as ET
+
+import atom_writer
+from app import GoogleWorkspaceContactsManager
+from benchmarks.synthetic import make_records
+from feed_parser import BATCH_ID, ENTRY, ID, contact_from_element
+
+HOSTILE_VALUES = [
+    "O'Brien & Sons",
+    '<script>alert("x")</script>',
+    'Line one\nLine two\r\nLine three',
+    'Tab\tseparated',
+    ']]> &amp; already escaped &lt;',
+    'Bell\x07 and NUL\x00 and \x1b escape',
+    'Lone surrogate \ud83d here, noncharacter \ufffe',
+    'ünïcödé, 漢字, 😀',
+    '  padded  ',
+]
+# What the parser should give back for a hostile value: XML can't carry these
+INVALID_CHARS = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f\ud800-\udfff\ufffe\uffff]')
+WORK_REL = atom_writer.WORK_REL
+HOME_REL = atom_writer.HOME_REL
+
+
+def contact_data_from_record(record):
+    return {
+        'first_name': record['given'],
+        'last_name': record['family'],
+        'email': record['email'],
+        'phone': record['phone'],
+        'notes': record['notes'],
+        'display_name': f"{record['given']} {record['family']}",
+    }
+
+
+def hostile_contacts():
+    contacts = []
+    for i, value in enumerate(HOSTILE_VALUES):
+        contacts.append({
+            'first_name': value,
+            'last_name': HOSTILE_VALUES[-1 - i],
+            'email': f"o'brien+{i}@example.com",
+            'additional_emails': [f'"quoted"&{i}@example.org', value],
+            'phone': value,
+            'notes': value,
+            'display_name': value,
+            'address': {'city': value, 'street': '1 <Main> St', 'country': 'Côte d’Ivoire'},
+        })
+    return contacts
+
+
+def expected_contact(contact_data):
+    """What parse_contact_xml() should return for an entry written from contact_data"""
+    def clean(value):
+        return INVALID_CHARS.sub('', value or '')
+
+    first_name = clean(contact_data.get('first_name'))
+    last_name = clean(contact_data.get('last_name'))
+    emails = [{'address': clean(contact_data.get('email')), 'primary': True, 'rel': WORK_REL}]
+    emails.extend({'address': clean(email), 'primary': False, 'rel': HOME_REL}
+                  for email in contact_data.get('additional_emails') or [])
+    phone = clean(contact_data.get('phone'))
+    return {
+        'first_name': first_name,
+        'last_name': last_name,
+        'full_name': f"{first_name} {last_name}".strip(),
+        'emails': emails,
+        'phones': [{'number': phone, 'primary': True, 'rel': WORK_REL}] if phone else [],
+        'notes': clean(contact_data.get('notes')),
+    }
+
+
+def comparable(contact):
+    """The written fields of a parsed contact, with empty elements read as ''"""
+    return {
+        'first_name': contact.get('first_name') or '',
+        'last_name': contact.get('last_name') or '',
+        'full_name': contact.get('full_name') or '',
+        'emails': contact['emails'],
+        'phones': contact['phones'],
+        'notes': contact.get('notes') or '',
+    }
+
+
+def check_round_trip(manager, contacts):
+    for contact_data in contacts:
+        parsed = manager.parse_contact_xml(atom_writer.entry_xml(contact_data))
+        assert parsed is not None, f"entry did not parse: {contact_data!r}"
+        assert comparable(parsed) == expected_contact(contact_data), f"round trip changed {contact_data!r}"
+
+    operations = [('insert', data, None) for data in contacts]
+    operations += [('update', data, f"https://example.com/full/{i}?a=1&b='2'") for i, data in enumerate(contacts)]
+    operations += [('delete', None, f"https://example.com/full/{i}") for i in range(len(contacts))]
+    feed = atom_writer.batch_feed_xml((i, op, data, url) for i, (op, data, url) in enumerate(operations))
+    entries = ET.fromstring(feed.encode('utf-8')).findall(ENTRY)
+    assert len(entries) == len(operations)
+    for batch_id, ((op, data, url), entry) in enumerate(zip(operations, entries)):
+        assert entry.findtext(BATCH_ID) == str(batch_id)
+        if url:
+            assert entry.findtext(ID) == url
+        if data is not None:
+            assert comparable(contact_from_element(entry)) == expected_contact(data)
+
+
+def template_entry(contact_data):
+    """The str.format / += template create_contact_xml() used before atom_writer"""
+    xml_template = """<?xml version='1.0' encoding='UTF-8'?>
+<atom:entry xmlns:atom='http://www.w3.org/2005/Atom'
+    xmlns:gd='http://schemas.google.com/g/2005'>
+  <atom:category scheme='http://schemas.google.com/g/2005#kind'
+    term='http://schemas.google.com/contact/2008#contact' />
+  <gd:name>
+     <gd:givenName>{first_name}</gd:givenName>
+     <gd:familyName>{last_name}</gd:familyName>
+     <gd:fullName>{full_name}</gd:fullName>
+  </gd:name>
+  <atom:content type='text'>{notes}</atom:content>
+  <gd:email rel='http://schemas.google.com/g/2005#work'
+    primary='true'
+    address='{email}' displayName='{display_name}' />
+  {additional_emails}
+  {phone_numbers}
+  {address}
+</atom:entry>"""
+    additional_emails = ""
+    for email in contact_data.get('additional_emails') or []:
+        additional_emails += f"""<gd:email rel='http://schemas.google.com/g/2005#home'
+    address='{email}' />"""
+    phone_numbers = ""
+    if contact_data.get('phone'):
+        phone_numbers += f"""<gd:phoneNumber rel='http://schemas.google.com/g/2005#work'
+    primary='true'>{contact_data['phone']}</gd:phoneNumber>"""
+    return xml_template.format(
+        first_name=contact_data.get('first_name', ''),
+        last_name=contact_data.get('last_name', ''),
+        full_name=f"{contact_data.get('first_name', '')} {contact_data.get('last_name', '')}".strip(),
+        notes=contact_data.get('notes', ''),
+        email=contact_data.get('email', ''),
+        display_name=contact_data.get('display_name', contact_data.get('email', '')),
+        additional_emails=additional_emails,
+        phone_numbers=phone_numbers,
+        address=""
+    )
+
+
+def template_batch(entries):
+    """Batch feed the old way: a full entry document per contact, sliced and spliced"""
+    parts = []
+    for batch_id, operation, contact_data, edit_url in entries:
+        entry = template_entry(contact_data)
+        entry = entry[entry.index('<atom:entry'):]
+        batch = f"<batch:id>{batch_id}</batch:id><batch:operation type='{operation}'/>"
+        head_end = entry.index('>') + 1
+        parts.append(entry[:head_end] + batch + entry[head_end:])
+    return ("<?xml version='1.0' encoding='UTF-8'?>\n<atom:feed xmlns:atom='http://www.w3.org/2005/Atom' "
+            "xmlns:gd='http://schemas.google.com/g/2005' xmlns:batch='http://schemas.google.com/gdata/batch'>\n"
+            + '\n'.join(parts) + "\n</atom:feed>")
+
+
+def measure(label, contacts, write):
+    started = time.perf_counter()
+    written = write(contacts)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<20} {len(contacts)} contacts  {elapsed:7.3f}s  {len(contacts) / elapsed:9.0f} contacts/s  "
+          f"{written / 1024 / 1024:6.1f} MiB")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--contacts', type=int, default=20000)
+    parser.add_argument('--batch-size', type=int, default=100)
+    args = parser.parse_args()
+
+    manager = GoogleWorkspaceContactsManager(None, 'example.com')
+    contacts = [contact_data_from_record(r) for r in make_records(args.contacts)]
+    check_round_trip(manager, hostile_contacts() + contacts[:1000])
+    print(f"round trip ok ({len(HOSTILE_VALUES)} hostile contacts, {min(len(contacts), 1000)} synthetic)")
+
+    def entries(batch):
+        return ((i, 'insert', data, None) for i, data in enumerate(batch))
+
+    def batches(contacts):
+        return [contacts[i:i + args.batch_size] for i in range(0, len(contacts), args.batch_size)]
+
+    template = measure('template entries', contacts, lambda cs: sum(len(template_entry(c)) for c in cs))
+    writer = measure('atom_writer entries', contacts, lambda cs: sum(len(atom_writer.entry_xml(c)) for c in cs))
+    print(f"speedup              {template / writer:.2f}x")
+    template = measure('template batches', contacts,
+                       lambda cs: sum(len(template_batch(entries(b))) for b in batches(cs)))
+    writer = measure('atom_writer batches', contacts,
+                     lambda cs: sum(len(atom_writer.batch_feed_xml(entries(b))) for b in batches(cs)))
+    print(f"speedup              {template / writer:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
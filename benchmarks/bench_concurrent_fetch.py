@@ -0,0 +1,44 @@
+"""Crawl a fake feed with injected latency at several page-fetch concurrency levels.
+
+    python -m benchmarks.bench_concurrent_fetch --contacts 40000 --latency 0.2
+"""
+
+import argparse
+import time
+
+from app import GoogleWorkspaceContactsManager
+from benchmarks.fake_feed import FakeFeedServer, StaticCredentials
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--contacts', type=int, default=40000)
+    parser.add_argument('--latency', type=float, default=0.2, help='per-request server latency in seconds')
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    with FakeFeedServer(contacts=args.contacts, latency=args.latency) as server:
+        manager = GoogleWorkspaceContactsManager(None, server.domain, feed_url=server.base_url)
+        manager.set_credentials(StaticCredentials())
+
+        # Untimed warm-up so every run sees the fake server's page cache populated
+        manager.get_contacts(concurrency=max(args.concurrency))
+
+        baseline = None
+        for concurrency in args.concurrency:
+            server.reset_counters()
+            started = time.perf_counter()
+            result = manager.get_contacts(concurrency=concurrency)
+            elapsed = time.perf_counter() - started
+            if 'error' in result:
+                raise SystemExit(result['error'])
+
+            ids = [contact['id'] for contact in result['contacts']]
+            if baseline is None:
+                baseline = ids
+            assert ids == baseline, f"concurrency {concurrency} changed the contact order"
+            print(f"concurrency {concurrency:<3} {len(ids)} contacts  {server.requests} pages  {elapsed:7.3f}s")
+
+
+if __name__ == '__main__':
+    main()
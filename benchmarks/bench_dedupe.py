@@ -0,0 +1,52 @@
+"""Compare blocked duplicate detection with the brute-force pairwise scan.
+
+    python -m benchmarks.bench_dedupe --recall-size 1000 --sizes 10000 50000
+
+Recall is checked against the pairwise scan at --recall-size for each of
+--thresholds; the larger --sizes run the blocked scan only, at
+--scale-threshold, and report pairs compared against wall time.
+"""
+
+import argparse
+
+import dedupe
+from benchmarks.synthetic import make_contacts
+
+
+def pair_ids(duplicates):
+    return {(d['contact1']['id'], d['contact2']['id']) for d in duplicates}
+
+
+def print_report(label, report):
+    print(f"{label:<28} {report['pairs_compared']:>13,} pairs  "
+          f"{report['matches']:>7,} matches  {report['seconds']:9.3f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recall-size', type=int, default=1000)
+    parser.add_argument('--sizes', type=int, nargs='*', default=[10000, 50000])
+    parser.add_argument('--thresholds', type=float, nargs='+', default=[0.8, 0.6, 0.35])
+    parser.add_argument('--scale-threshold', type=float, default=0.8)
+    args = parser.parse_args()
+
+    contacts = make_contacts(args.recall_size)
+    for threshold in args.thresholds:
+        expected, brute = dedupe.scan(contacts, threshold, method='pairwise')
+        found, blocked = dedupe.scan(contacts, threshold, method='blocked')
+        missed = pair_ids(expected) - pair_ids(found)
+        recall = 1 - len(missed) / len(expected) if expected else 1.0
+        print(f"n={args.recall_size} threshold={threshold}")
+        print_report('  pairwise', brute)
+        print_report('  blocked', blocked)
+        print(f"  recall {recall:.4f} ({len(missed)} missed), speedup {brute['seconds'] / blocked['seconds']:.1f}x")
+
+    for size in args.sizes:
+        contacts = make_contacts(size)
+        _, report = dedupe.scan(contacts, args.scale_threshold, method='blocked')
+        print_report(f"n={size} threshold={args.scale_threshold}", report)
+        print(f"{'':<28} pairwise would compare {report['all_pairs']:,} pairs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Scaling of sharded duplicate scoring from 1 to N worker processes.
+
+    python -m benchmarks.bench_dedupe_parallel --sizes 20000 50000 100000 --workers 1 2 4 8
+
+The default threshold of 0.35 brings in name-based candidates, which gives
+the scorer enough work to be worth spreading over several cores.
+"""
+
+import argparse
+import os
+
+import dedupe
+from benchmarks.synthetic import make_contacts
+
+
+def main():
+    cpus = os.cpu_count() or 1
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[20000, 50000, 100000])
+    parser.add_argument('--workers', type=int, nargs='+',
+                        default=sorted({1, 2, 4, cpus} & set(range(1, cpus + 1))))
+    parser.add_argument('--threshold', type=float, default=0.35)
+    parser.add_argument('--method', choices=['blocked', 'pairwise'], default='blocked')
+    parser.add_argument('--chunk-size', type=int, default=50000)
+    args = parser.parse_args()
+
+    print(f"{cpus} CPUs available")
+    for size in args.sizes:
+        contacts = make_contacts(size)
+        baseline = None
+        for workers in args.workers:
+            duplicates, report = dedupe.scan(contacts, args.threshold, args.method, workers, args.chunk_size)
+            ids = [(d['contact1']['id'], d['contact2']['id']) for d in duplicates]
+            if baseline is None:
+                baseline = (ids, report['scoring_seconds'])
+            assert ids == baseline[0], f"{workers} workers changed the result"
+            print(f"n={size:<7} workers={report['workers']:<3} {report['pairs_compared']:>12,} pairs  "
+                  f"{report['matches']:>8,} matches  candidates {report['candidate_seconds']:7.2f}s  "
+                  f"scoring {report['scoring_seconds']:7.2f}s  "
+                  f"({baseline[1] / report['scoring_seconds']:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""Compare one-shot requests calls with the pooled FeedSession against the fake feed.
+
+    python -m benchmarks.bench_http_session --requests 200
+"""
+
+import argparse
+import time
+
+import requests
+
+from benchmarks.fake_feed import FakeFeedServer
+from http_session import FeedSession
+
+
+def run(label, server, send, count, url):
+    server.reset_counters()
+    started = time.perf_counter()
+    for _ in range(count):
+        response = send(url, params={'max-results': 25, 'start-index': 1})
+        response.raise_for_status()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<16} {count} requests  {elapsed:7.3f}s  "
+          f"{elapsed / count * 1000:6.2f} ms/req  {server.connections} TCP connections")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.0, help='per-request server latency in seconds')
+    args = parser.parse_args()
+
+    with FakeFeedServer(contacts=100, latency=args.latency) as server:
+        url = f"{server.base_url}/contacts/{server.domain}/full"
+        session = FeedSession(pool_size=4)
+
+        run('requests.get', server, requests.get, args.requests, url)
+        run('FeedSession.get', server, session.get, args.requests, url)
+
+        # Retry path: two injected 503s must be absorbed by the session
+        server.reset_counters()
+        server.inject_errors(503, count=2, retry_after=0)
+        response = session.get(url)
+        print(f"retry check      status {response.status_code} after {server.requests} attempts "
+              f"(session stats: {session.stats()})")
+
+
+if __name__ == '__main__':
+    main()
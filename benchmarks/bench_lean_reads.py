@@ -0,0 +1,89 @@
+"""Bytes on the wire and parse time of full vs. lean (fields=...) feed reads,
+and of a repeat crawl answered with 304s from the page ETag cache.
+
+Each mode crawls the fake feed twice with one manager: the first crawl
+downloads every page, the second sends If-None-Match for each and should
+transfer almost nothing (FEED_ETAGS is off by default, so it is enabled
+here with room for every page). Lean and full crawls must return the same
+contacts. Parse time is measured separately on the raw page bodies.
+
+    python -m benchmarks.bench_lean_reads --contacts 100000
+"""
+
+import argparse
+import logging
+import time
+
+from app import LEAN_FIELDS, GoogleWorkspaceContactsManager
+from benchmarks.fake_feed import FakeFeedServer, StaticCredentials
+from feed_parser import parse_feed
+from http_session import FeedSession
+
+PAGE_SIZE = 1000
+CHUNK_SIZE = 64 * 1024
+
+
+def crawl(manager, server):
+    server.reset_counters()
+    started = time.perf_counter()
+    result = manager.get_contacts()
+    elapsed = time.perf_counter() - started
+    if 'error' in result:
+        raise SystemExit(f"get_contacts failed: {result['error']}")
+    return result['contacts'], {
+        'seconds': elapsed, 'requests': server.requests, 'not_modified': server.not_modified,
+        'bytes': server.bytes_sent
+    }
+
+
+def raw_pages(server, count, lean):
+    """Uncompressed page bodies as the feed serves them"""
+    session = FeedSession()
+    pages = []
+    for start_index in range(1, count + 1, PAGE_SIZE):
+        params = {'start-index': start_index, 'max-results': PAGE_SIZE}
+        if lean:
+            params['fields'] = LEAN_FIELDS
+        response = session.get(f"{server.base_url}/contacts/{server.domain}/full", params=params,
+                               headers={'Accept-Encoding': 'identity'})
+        pages.append(response.content)
+    return pages
+
+
+def parse_seconds(pages):
+    started = time.perf_counter()
+    for body in pages:
+        parse_feed(body[i:i + CHUNK_SIZE] for i in range(0, len(body), CHUNK_SIZE))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--contacts', type=int, default=100000)
+    parser.add_argument('--latency', type=float, default=0.0, help='per-request server latency in seconds')
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    with FakeFeedServer(contacts=args.contacts, latency=args.latency) as server:
+        results = {}
+        for label, lean in (('full', False), ('lean', True)):
+            manager = GoogleWorkspaceContactsManager(None, server.domain, feed_url=server.base_url, lean=lean,
+                                                     etags=True, etag_pages=args.contacts // PAGE_SIZE + 1)
+            manager.set_credentials(StaticCredentials())
+            contacts, cold = crawl(manager, server)
+            repeat, warm = crawl(manager, server)
+            assert repeat == contacts
+            assert warm['not_modified'] == warm['requests'], 'repeat crawl should be all 304s'
+            assert len(manager.page_cache) == warm['requests']
+            pages = raw_pages(server, args.contacts, lean)
+            results[label] = contacts
+            print(f"{label:<5} cold {cold['seconds']:7.3f}s {cold['bytes'] / 2 ** 20:8.2f} MiB gzip "
+                  f"{sum(map(len, pages)) / 2 ** 20:8.2f} MiB raw  parse {parse_seconds(pages):6.3f}s | "
+                  f"repeat {warm['seconds']:7.3f}s {warm['bytes'] / 1024:8.1f} KiB "
+                  f"({warm['not_modified']}/{warm['requests']} pages 304)")
+        assert results['lean'] == results['full'], 'lean crawl returned different contacts'
+        print(f"lean and full crawls agree on {len(results['full'])} contacts")
+
+
+if __name__ == '__main__':
+    main()
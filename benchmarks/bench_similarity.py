@@ -0,0 +1,56 @@
+"""Per-pair scoring cost: contact dicts vs. precomputed ContactFeatures.
+
+    python -m benchmarks.bench_similarity --pairs 200000
+"""
+
+import argparse
+import random
+import time
+
+import dedupe
+from benchmarks.synthetic import make_contacts
+
+
+def timed(label, pairs, score):
+    started = time.perf_counter()
+    for a, b in pairs:
+        score(a, b)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<32} {elapsed / len(pairs) * 1e6:7.2f} us/pair")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--contacts', type=int, default=5000)
+    parser.add_argument('--pairs', type=int, default=200000)
+    parser.add_argument('--threshold', type=float, default=0.8)
+    args = parser.parse_args()
+
+    contacts = make_contacts(args.contacts)
+    rng = random.Random(7)
+    # Grouped by the second index, the order scan() feeds pairs to PairScorer
+    index_pairs = sorted(
+        (tuple(sorted(rng.sample(range(args.contacts), 2))) for _ in range(args.pairs)),
+        key=lambda pair: (pair[1], pair[0])
+    )
+
+    contact_pairs = [(contacts[i], contacts[j]) for i, j in index_pairs]
+    base = timed('calculate_similarity(dicts)', contact_pairs, dedupe.calculate_similarity)
+
+    started = time.perf_counter()
+    features = [dedupe.ContactFeatures(contact) for contact in contacts]
+    print(f"{'build features (once per scan)':<32} {(time.perf_counter() - started) * 1000:7.2f} ms total")
+
+    feature_pairs = [(features[i], features[j]) for i, j in index_pairs]
+    full = timed('score_features(features)', feature_pairs, dedupe.score_features)
+    timed('PairScorer(threshold=0)', feature_pairs, dedupe.PairScorer(0).score)
+    scorer = dedupe.PairScorer(args.threshold)
+    pruned = timed(f"PairScorer(threshold={args.threshold})", feature_pairs, scorer.score)
+
+    print(f"speedup: features {base / full:.1f}x, with threshold pruning {base / pruned:.1f}x "
+          f"({scorer.ratios_computed} of {len(feature_pairs)} pairs needed a full ratio())")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Size, load time and memory of the contact snapshot format against JSON.
+
+Contacts are written with snapshot.write_snapshot() and as a JSON array,
+then loaded back. The snapshot must reproduce every contact exactly,
+including contacts with no gd:name, empty names (None), missing edit
+links and deleted tombstones. Memory is the tracemalloc peak of holding
+the loaded contacts, so the ContactRecord form can be compared with the
+dicts get_contacts() returns.
+
+    python -m benchmarks.bench_snapshot --contacts 100000
+"""
+
+import argparse
+import gc
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+import dedupe
+import snapshot
+from benchmarks.synthetic import make_contacts
+
+
+def awkward_contacts(contacts):
+    """Vary the shape the way real feed entries do"""
+    contacts = [dict(contact) for contact in contacts]
+    for i, contact in enumerate(contacts):
+        if i % 97 == 0:
+            for key in ('first_name', 'last_name', 'full_name'):
+                contact.pop(key, None)
+        elif i % 89 == 0:
+            contact['first_name'] = contact['full_name'] = None
+        if i % 83 == 0:
+            contact.pop('edit_url', None)
+        if i % 79 == 0:
+            contact['deleted'] = True
+            contact['emails'] = []
+        if i % 71 == 0:
+            contact['notes'] = None
+    return contacts
+
+
+def measure_load(load):
+    """(contacts, seconds, peak bytes); timed on its own run, as tracemalloc slows allocation down"""
+    gc.collect()
+    started = time.perf_counter()
+    load()
+    elapsed = time.perf_counter() - started
+    gc.collect()
+    tracemalloc.start()
+    contacts = load()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return contacts, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--contacts', type=int, default=100000)
+    parser.add_argument('--threshold', type=float, default=0.8)
+    args = parser.parse_args()
+
+    contacts = awkward_contacts(make_contacts(args.contacts))
+    with tempfile.TemporaryDirectory() as directory:
+        snap_path = os.path.join(directory, 'contacts.snap')
+        json_path = os.path.join(directory, 'contacts.json')
+
+        started = time.perf_counter()
+        snapshot.write_snapshot(snap_path, contacts)
+        snap_write = time.perf_counter() - started
+        started = time.perf_counter()
+        with open(json_path, 'w') as f:
+            json.dump(contacts, f)
+        json_write = time.perf_counter() - started
+
+        def load_json():
+            with open(json_path) as f:
+                return json.load(f)
+
+        def load_snapshot():
+            with snapshot.Snapshot(snap_path) as snap:
+                return snap.records()
+
+        loaded_json, json_load, json_peak = measure_load(load_json)
+        records, snap_load, snap_peak = measure_load(load_snapshot)
+
+        assert loaded_json == contacts
+        assert len(records) == len(contacts)
+        for record, contact in zip(records, contacts):
+            assert record.to_dict() == contact, f"round trip changed {contact!r}"
+            assert list(record.keys()) == list(contact)
+        print(f"round trip ok ({len(contacts)} contacts)")
+
+        with snapshot.Snapshot(snap_path) as snap:
+            started = time.perf_counter()
+            ids = snap.column('id')
+            one_column = time.perf_counter() - started
+            assert list(ids) == [contact['id'] for contact in contacts]
+            loaded = snap.stats()['columns_loaded']
+
+        print(f"{'format':<10} {'file MiB':>9} {'write s':>8} {'load s':>8} {'peak MiB':>9}")
+        for label, path, write, load, peak in (('json', json_path, json_write, json_load, json_peak),
+                                               ('snapshot', snap_path, snap_write, snap_load, snap_peak)):
+            print(f"{label:<10} {os.path.getsize(path) / 2 ** 20:9.1f} {write:8.3f} {load:8.3f} {peak / 2 ** 20:9.1f}")
+        print(f"one column ('id') loaded in {one_column:.3f}s, columns inflated: {loaded}")
+
+    sample = contacts[:min(len(contacts), 5000)]
+    expected, _ = dedupe.scan(sample, args.threshold)
+    found, _ = dedupe.scan(records[:len(sample)], args.threshold)
+    assert [(d['contact1']['id'], d['contact2']['id'], d['similarity']) for d in found] == \
+        [(d['contact1']['id'], d['contact2']['id'], d['similarity']) for d in expected]
+    print(f"dedupe on records matches dicts ({len(found)} pairs in {len(sample)} contacts)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""Worker boot latency: importing app.py, and the first requests after it.
+
+Each measurement runs in a fresh interpreter, as a gunicorn worker would.
+`import` times `import app` alone. `first request` then serves
+GET /api/contacts against the fake feed, which loads credentials, fetches a
+token and crawls the snapshot; with --prewarm that work is started by
+app.prewarm() straight after import, and the request is sent once it
+finishes. A service account file that doesn't exist must make
+/api/health answer 503 with the reason rather than only log it.
+
+    python -m benchmarks.bench_startup --runs 7 --contacts 10000
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+IMPORT_SCRIPT = """
+import json, time
+started = time.perf_counter()
+import app
+print(json.dumps({'import': time.perf_counter() - started}))
+"""
+
+REQUEST_SCRIPT = """
+import json, os, sys, time
+from benchmarks.fake_feed import FakeFeedServer, StaticCredentials
+server = FakeFeedServer(contacts=int(sys.argv[1])).start()
+os.environ['FEED_URL'] = server.base_url
+os.environ['WORKSPACE_DOMAIN'] = server.domain
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+# Stands in for the service account file; the fake feed accepts any token
+app.contacts_manager.set_credentials(StaticCredentials())
+result = {'import': imported - started}
+if sys.argv[2] == 'prewarm':
+    app.prewarm().join()
+    result['prewarm'] = time.perf_counter() - imported
+client = app.app.test_client()
+requested = time.perf_counter()
+response = client.get('/api/contacts')
+assert response.status_code == 200 and len(response.get_json()['contacts']) == int(sys.argv[1])
+result['first_request'] = time.perf_counter() - requested
+print(json.dumps(result))
+"""
+
+HEALTH_SCRIPT = """
+import json, app
+response = app.app.test_client().get('/api/health')
+print(json.dumps({'status': response.status_code, 'body': response.get_json()}))
+"""
+
+
+def run(script, *args, env=None):
+    output = subprocess.run([sys.executable, '-c', script, *args], capture_output=True, text=True, check=True,
+                            env=dict(os.environ, PYTHONPATH=os.getcwd(), LOG_LEVEL='CRITICAL', **(env or {})))
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def median(runs, key):
+    return statistics.median(run[key] for run in runs)
+
+
+def import_profile(top):
+    """Modules with the largest cumulative import time, from python -X importtime"""
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], capture_output=True,
+                            text=True, env=dict(os.environ, PYTHONPATH=os.getcwd(), LOG_LEVEL='CRITICAL'))
+    rows = []
+    for line in output.stderr.splitlines():
+        parts = line.split('|')
+        # Direct imports of app.py are indented by three spaces
+        if len(parts) == 3 and parts[2].startswith('   ') and not parts[2].startswith('    '):
+            rows.append((int(parts[1]), parts[2].strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=7)
+    parser.add_argument('--contacts', type=int, default=10000)
+    parser.add_argument('--top', type=int, default=8, help='slowest direct imports of app.py to list')
+    args = parser.parse_args()
+
+    missing = {'SERVICE_ACCOUNT_FILE': os.path.join(os.getcwd(), 'no-such-credentials.json')}
+    imports = [run(IMPORT_SCRIPT, env=missing) for _ in range(args.runs)]
+    print(f"import app            {median(imports, 'import') * 1000:8.1f} ms (median of {args.runs})")
+    for microseconds, module in import_profile(args.top):
+        print(f"  {module:<20} {microseconds / 1000:8.1f} ms")
+
+    for mode in ('cold', 'prewarm'):
+        runs = [run(REQUEST_SCRIPT, str(args.contacts), mode, env=missing) for _ in range(max(args.runs // 2, 1))]
+        line = f"{mode:<8} import {median(runs, 'import') * 1000:7.1f} ms"
+        if mode == 'prewarm':
+            line += f"  pre-warm {median(runs, 'prewarm') * 1000:7.1f} ms"
+        print(f"{line}  first GET /api/contacts ({args.contacts} contacts) {median(runs, 'first_request') * 1000:8.1f} ms")
+
+    health = run(HEALTH_SCRIPT, env=missing)
+    assert health['status'] == 503 and 'no-such-credentials.json' in health['body']['error'], health
+    print(f"bad credentials file: /api/health {health['status']} {health['body']['error']!r}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""End-to-end benchmark suite against the fake feed, with JSON results.
+
+For each directory size it times a full get_contacts() crawl,
+find_duplicates() over the crawled snapshot, and a bulk create of
+--bulk contacts through the batch feed followed by delete_many() of the
+same contacts. Results go to a JSON file; pass an earlier file with
+--compare to flag operations that got slower than --tolerance allows.
+
+    python -m benchmarks.bench_suite --sizes 1000 10000 100000 --output results.json
+    python -m benchmarks.bench_suite --compare results.json --latency 0.01 --error-rate 0.02
+"""
+
+import argparse
+import json
+import logging
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import dedupe
+from app import GoogleWorkspaceContactsManager
+from benchmarks.fake_feed import FakeFeedServer, StaticCredentials
+from rate_limiter import TokenBucket
+
+THRESHOLD = 0.8
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def bench_get_contacts(manager, server):
+    server.reset_counters()
+    result, seconds = timed(manager.get_contacts)
+    if 'error' in result:
+        raise SystemExit(f"get_contacts failed: {result['error']}")
+    contacts = result['contacts']
+    return contacts, {
+        'seconds': seconds,
+        'items': len(contacts),
+        'items_per_second': len(contacts) / seconds,
+        'requests': server.requests,
+        'injected_errors': server.errors_sent
+    }
+
+
+def bench_find_duplicates(contacts, method):
+    (duplicates, report), seconds = timed(lambda: dedupe.scan(contacts, THRESHOLD, method))
+    return {
+        'seconds': seconds,
+        'items': len(contacts),
+        'pairs_compared': report['pairs_compared'],
+        'pairs_per_second': report['pairs_compared'] / report['scoring_seconds'] if report['scoring_seconds'] else None,
+        'matches': len(duplicates),
+        'candidate_seconds': report['candidate_seconds'],
+        'scoring_seconds': report['scoring_seconds']
+    }
+
+
+def bench_bulk_create(manager, server, count):
+    operations = [
+        {'op': 'create', 'contact_data': {
+            'first_name': f"Bench{i}", 'last_name': 'Contact', 'email': f"bench.{i}@bench.example.com",
+            'phone': f"+1 555-01{i % 100:02d}", 'notes': 'Created by bench_suite'
+        }}
+        for i in range(count)
+    ]
+    server.reset_counters()
+    results, seconds = timed(lambda: manager.batch(operations))
+    edit_urls = [result['contact']['edit_url'] for result in results if result.get('success')]
+    return edit_urls, {
+        'seconds': seconds,
+        'items': count,
+        'items_per_second': count / seconds,
+        'failed': count - len(edit_urls),
+        'requests': server.requests,
+        'injected_errors': server.errors_sent
+    }
+
+
+def bench_bulk_delete(manager, server, edit_urls, concurrency):
+    server.reset_counters()
+    results, seconds = timed(lambda: [result for _, _, result in manager.delete_many(edit_urls, concurrency)])
+    return {
+        'seconds': seconds,
+        'items': len(edit_urls),
+        'items_per_second': len(edit_urls) / seconds if seconds else None,
+        'failed': sum(1 for result in results if not result.get('success')),
+        'requests': server.requests,
+        'injected_errors': server.errors_sent
+    }
+
+
+def run_size(size, args):
+    """Every operation at one directory size; returns {operation: result}, keeping the median run"""
+    runs = {}
+    with FakeFeedServer(contacts=size, latency=args.latency, error_rate=args.error_rate,
+                        error_statuses=args.error_statuses) as server:
+        manager = GoogleWorkspaceContactsManager(None, server.domain, feed_url=server.base_url)
+        manager.set_credentials(StaticCredentials())
+        # The app's default limiter would make the write timings measure WRITE_RATE_LIMIT
+        manager.write_limiter = TokenBucket(args.write_rate, burst=args.write_concurrency) if args.write_rate else None
+
+        for _ in range(args.repeat):
+            contacts, result = bench_get_contacts(manager, server)
+            runs.setdefault('get_contacts', []).append(result)
+            runs.setdefault('find_duplicates', []).append(bench_find_duplicates(contacts, args.method))
+            bulk = min(args.bulk, size) if args.bulk else size
+            edit_urls, result = bench_bulk_create(manager, server, bulk)
+            runs.setdefault('bulk_create', []).append(result)
+            runs.setdefault('bulk_delete', []).append(bench_bulk_delete(manager, server, edit_urls, args.write_concurrency))
+
+    return {operation: dict(median_run(results), runs=[round(r['seconds'], 4) for r in results])
+            for operation, results in runs.items()}
+
+
+def median_run(results):
+    # The lower median is a real run rather than an average of two
+    ordered = sorted(results, key=lambda result: result['seconds'])
+    return ordered[(len(ordered) - 1) // 2]
+
+
+def compare(current, baseline, tolerance, min_delta):
+    """Return (size, operation, baseline seconds, current seconds) for every regression"""
+    regressions = []
+    for size, operations in current.items():
+        for operation, result in operations.items():
+            previous = baseline.get(size, {}).get(operation)
+            if (previous and result['seconds'] > previous['seconds'] * (1 + tolerance)
+                    and result['seconds'] - previous['seconds'] > min_delta):
+                regressions.append((size, operation, previous['seconds'], result['seconds']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--bulk', type=int, default=5000,
+                        help='contacts created and then deleted per size (capped at the size; 0 = the size)')
+    parser.add_argument('--repeat', type=int, default=1, help='runs per size; the median run is reported')
+    parser.add_argument('--method', default='blocked', choices=['blocked', 'pairwise'])
+    parser.add_argument('--latency', type=float, default=0.0, help='per-request server latency in seconds')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='fraction of requests answered with an error')
+    parser.add_argument('--error-statuses', type=int, nargs='+', default=[503])
+    parser.add_argument('--write-rate', type=float, default=0.0,
+                        help='batch requests per second for the write limiter (0 = unlimited)')
+    parser.add_argument('--write-concurrency', type=int, default=4, help='batch requests in flight for bulk deletes')
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='earlier results file to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed slowdown against --compare before an operation counts as a regression')
+    parser.add_argument('--min-delta', type=float, default=0.05,
+                        help='seconds of slowdown ignored as noise, however large the ratio')
+    args = parser.parse_args()
+    # Keep per-request log lines out of the report
+    logging.getLogger().setLevel(logging.WARNING)
+
+    results = {}
+    for size in args.sizes:
+        results[str(size)] = run_size(size, args)
+        for operation, result in results[str(size)].items():
+            rate = result.get('items_per_second') or result.get('pairs_per_second') or 0
+            unit = 'pairs/s' if 'pairs_per_second' in result else 'items/s'
+            print(f"{size:>7} {operation:<16} {result['seconds']:8.3f}s  {rate:10.0f} {unit}")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'args': vars(args)
+        },
+        'results': results
+    }
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"wrote {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline['results'], args.tolerance, args.min_delta)
+        for size, operation, before, after in regressions:
+            print(f"REGRESSION {size} {operation}: {before:.3f}s -> {after:.3f}s")
+        if regressions:
+            raise SystemExit(1)
+        print(f"no regressions against {args.compare} (revision {baseline['meta'].get('revision')})")
+
+
+if __name__ == '__main__':
+    main()
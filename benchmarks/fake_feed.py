@@ -0,0 +1,294 @@
+"""Local stand-in for the Shared Contacts feed, used by the benchmarks"""
+
+import gzip
+import random
+import re
+import threading
+import time
+import zlib
+import xml.etree.ElementTree as ET
+from collections import deque
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from benchmarks.synthetic import entry_xml, feed_xml, make_records, ATOM_NS, GD_NS
+
+BATCH_NS = 'http://schemas.google.com/gdata/batch'
+
+class StaticCredentials:
+    """Stand-in for service account credentials; the fake feed accepts any token"""
+
+    def __init__(self, token='fake-token', lifetime=3600):
+        self.token = None
+        self.expiry = None
+        self._token = token
+        self._lifetime = lifetime
+
+    def refresh(self, request):
+        self.token = self._token
+        self.expiry = datetime.utcnow() + timedelta(seconds=self._lifetime)
+
+
+FEED_PATH = re.compile(r'^/m8/feeds/contacts/(?P<domain>[^/]+)/full(?:/(?P<cid>[^/?]+))?$')
+
+
+class _FeedHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, handler, feed):
+        self.feed = feed
+        super().__init__(address, handler)
+
+    def process_request(self, request, client_address):
+        # Called once per accepted TCP connection, not once per HTTP request
+        with self.feed.lock:
+            self.feed.connections += 1
+        super().process_request(request, client_address)
+
+
+class _FeedHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately; without this keep-alive
+    # requests stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b'', headers=None):
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        if body and 'gzip' in self.headers.get('Accept-Encoding', ''):
+            body = gzip.compress(body, 6)
+            headers = dict(headers or {}, **{'Content-Encoding': 'gzip'})
+        with self.server.feed.lock:
+            self.server.feed.bytes_sent += len(body)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/atom+xml; charset=UTF-8')
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length', 0))
+        return self.rfile.read(length) if length else b''
+
+    def _dispatch(self):
+        feed = self.server.feed
+        body = self._read_body()
+        with feed.lock:
+            feed.requests += 1
+            injected = feed.errors.popleft() if feed.errors else None
+            if injected is None and feed.error_rate and feed.rng.random() < feed.error_rate:
+                injected = (feed.rng.choice(feed.error_statuses), None)
+            if injected:
+                feed.errors_sent += 1
+        if feed.latency:
+            time.sleep(feed.latency)
+        if injected:
+            status, retry_after = injected
+            headers = {'Retry-After': str(retry_after)} if retry_after is not None else None
+            return self._send(status, f"Injected error {status}", headers)
+
+        url = urlparse(self.path)
+        match = FEED_PATH.match(url.path)
+        if not match:
+            return self._send(404, 'Not found')
+        return feed.handle(self, self.command, match.group('cid'), parse_qs(url.query), body)
+
+    do_GET = do_POST = do_PUT = do_DELETE = _dispatch
+
+
+class FakeFeedServer:
+    """Threaded HTTP server serving synthetic contacts as GData Atom feeds.
+
+    Paginates on start-index/max-results, supports create/update/delete on
+    entries and through the batch feed, and can add fixed latency, queue
+    error responses, or answer a random `error_rate` fraction of requests
+    with one of `error_statuses` (seeded, so runs are repeatable). Feed
+    pages carry an ETag and answer a matching If-None-Match with 304; any
+    `fields` parameter gets the lean rendering (only what the app parses).
+    """
+
+    def __init__(self, contacts=1000, domain='example.com', latency=0.0, seed=42,
+                 duplicate_rate=0.05, host='127.0.0.1', port=0, error_rate=0.0, error_statuses=(503,)):
+        self.domain = domain
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.records = {r['id']: r for r in make_records(contacts, seed, duplicate_rate)}
+        # Deleted records, served to showdeleted=true queries
+        self.tombstones = {}
+        # Rendered feed pages, dropped whenever a record changes
+        self._pages = {}
+        self.next_id = contacts
+        self.errors = deque()
+        self.errors_sent = 0
+        self.connections = 0
+        self.requests = 0
+        self.bytes_sent = 0
+        self.not_modified = 0
+        self._server = _FeedHTTPServer((host, port), _FeedHandler, self)
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/m8/feeds"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def inject_errors(self, status, count=1, retry_after=None):
+        """Answer the next `count` requests with `status`"""
+        with self.lock:
+            for _ in range(count):
+                self.errors.append((status, retry_after))
+
+    def reset_counters(self):
+        with self.lock:
+            self.connections = 0
+            self.requests = 0
+            self.errors_sent = 0
+            self.bytes_sent = 0
+            self.not_modified = 0
+
+    def handle(self, handler, method, cid, query, body):
+        if method == 'GET' and cid is None:
+            return self._list(handler, query)
+        if method == 'POST' and cid is None:
+            return self._create(handler, body)
+        if method == 'POST' and cid == 'batch':
+            return self._batch(handler, body)
+        with self.lock:
+            record = self.records.get(cid)
+        if record is None:
+            return handler._send(404, 'Contact not found')
+        if method == 'GET':
+            return handler._send(200, self._entry_document(record))
+        if method == 'PUT':
+            self._apply_entry(record, body)
+            self._changed(record)
+            return handler._send(200, self._entry_document(record))
+        if method == 'DELETE':
+            self._delete(record)
+            return handler._send(200)
+        return handler._send(405, 'Method not allowed')
+
+    def _changed(self, record=None):
+        with self.lock:
+            self._pages.clear()
+            if record is not None:
+                record['updated'] = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z'
+
+    def _list(self, handler, query):
+        start_index = int(query.get('start-index', ['1'])[0])
+        max_results = int(query.get('max-results', ['25'])[0])
+        updated_min = query.get('updated-min', [None])[0]
+        lean = 'fields' in query
+        key = (start_index, max_results, lean)
+        with self.lock:
+            page = None if updated_min else self._pages.get(key)
+            if page is None:
+                records = list(self.records.values())
+                if updated_min:
+                    if query.get('showdeleted', ['false'])[0] == 'true':
+                        records += list(self.tombstones.values())
+                    records = [r for r in records if r.get('updated', '') > updated_min]
+        if page is None:
+            rows = records[start_index - 1:start_index - 1 + max_results]
+            body = feed_xml(rows, start_index, len(records), self.base_url, self.domain, lean=lean).encode('utf-8')
+            page = body, f'W/"{zlib.crc32(body):08x}-{len(body)}"'
+            if not updated_min:
+                with self.lock:
+                    self._pages[key] = page
+        body, etag = page
+        if handler.headers.get('If-None-Match') == etag:
+            with self.lock:
+                self.not_modified += 1
+            return handler._send(304, headers={'ETag': etag})
+        handler._send(200, body, {'ETag': etag})
+
+    def _entry_document(self, record):
+        entry = entry_xml(record, self.base_url, self.domain)
+        return entry.replace('<entry ', f"<entry xmlns='{ATOM_NS}' xmlns:gd='{GD_NS}' ", 1)
+
+    def _apply_entry(self, record, body):
+        root = ET.fromstring(body) if isinstance(body, (bytes, str)) else body
+        ns = {'atom': ATOM_NS, 'gd': GD_NS}
+        record['given'] = root.findtext('gd:name/gd:givenName', '', ns)
+        record['family'] = root.findtext('gd:name/gd:familyName', '', ns)
+        record['notes'] = root.findtext('atom:content', '', ns)
+        email = root.find('gd:email', ns)
+        record['email'] = email.get('address', '') if email is not None else ''
+        record['phone'] = root.findtext('gd:phoneNumber', '', ns)
+
+    def _create(self, handler, body):
+        record = self._insert(body)
+        handler._send(201, self._entry_document(record))
+
+    def _insert(self, entry):
+        with self.lock:
+            cid = f"c{self.next_id:07x}"
+            self.next_id += 1
+        record = {'id': cid, 'org': ''}
+        self._apply_entry(record, entry)
+        with self.lock:
+            self.records[cid] = record
+        self._changed(record)
+        return record
+
+    def _delete(self, record):
+        with self.lock:
+            self.records.pop(record['id'], None)
+            self.tombstones[record['id']] = dict(record, deleted=True)
+        self._changed(self.tombstones[record['id']])
+
+    def _batch(self, handler, body):
+        """Apply each entry of a batch feed and answer with per-entry batch:status"""
+        ns = {'atom': ATOM_NS, 'batch': BATCH_NS}
+        entries = []
+        for entry in ET.fromstring(body).iterfind('atom:entry', ns):
+            batch_id = entry.findtext('batch:id', '', ns)
+            operation = entry.find('batch:operation', ns).get('type')
+            record = None
+            if operation == 'insert':
+                record, code, reason = self._insert(entry), 201, 'Created'
+            else:
+                cid = entry.findtext('atom:id', '', ns).rstrip('/').rsplit('/', 1)[-1]
+                with self.lock:
+                    record = self.records.get(cid)
+                if record is None:
+                    code, reason = 404, 'Contact not found'
+                elif operation == 'update':
+                    self._apply_entry(record, entry)
+                    self._changed(record)
+                    code, reason = 200, 'Success'
+                else:
+                    self._delete(record)
+                    record, code, reason = None, 200, 'Success'
+            status = (f"<batch:id>{batch_id}</batch:id><batch:operation type='{operation}'/>"
+                      f"<batch:status code='{code}' reason='{reason}'/>")
+            if record is not None:
+                entries.append(entry_xml(record, self.base_url, self.domain).replace('>', '>' + status, 1))
+            else:
+                entries.append(f"<entry>{status}</entry>")
+        handler._send(200, f"<?xml version='1.0' encoding='UTF-8'?><feed xmlns='{ATOM_NS}' xmlns:gd='{GD_NS}' "
+                           f"xmlns:batch='{BATCH_NS}'>{''.join(entries)}</feed>")
@@ -0,0 +1,153 @@
+"""Deterministic synthetic contacts and Atom feeds for benchmarks"""
+
+import random
+from xml.sax.saxutils import escape, quoteattr
+
+FIRST_NAMES = [
+    'James', 'Mary', 'John', 'Patricia', 'Robert', 'Jennifer', 'Michael', 'Linda',
+    'William', 'Elizabeth', 'David', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica',
+    'Thomas', 'Sarah', 'Charles', 'Karen', 'Christopher', 'Nancy', 'Daniel', 'Lisa',
+    'Matthew', 'Betty', 'Anthony', 'Margaret', 'Mark', 'Sandra', 'Donald', 'Ashley',
+    'Steven', 'Kimberly', 'Paul', 'Emily', 'Andrew', 'Donna', 'Joshua', 'Michelle',
+    'Priya', 'Wei', 'Olumide', 'Siobhan', 'Mateo', 'Yuki', 'Fatima', 'Lars',
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis',
+    'Rodriguez', 'Martinez', 'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson',
+    'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin', 'Lee', 'Perez', 'Thompson',
+    'White', 'Harris', 'Sanchez', 'Clark', 'Ramirez', 'Lewis', 'Robinson', 'Walker',
+    'Young', 'Allen', 'King', 'Wright', 'Scott', 'Torres', 'Nguyen', 'Hill', 'Flores',
+    'Okafor', 'Kowalski', "O'Brien", 'Nakamura', 'Haddad', 'Lindqvist', 'Chen', 'Patel',
+]
+EMAIL_DOMAINS = ['example.com', 'example.org', 'mail.example.net', 'partner.example.io']
+
+ATOM_NS = 'http://www.w3.org/2005/Atom'
+GD_NS = 'http://schemas.google.com/g/2005'
+WORK_REL = 'http://schemas.google.com/g/2005#work'
+HOME_REL = 'http://schemas.google.com/g/2005#home'
+
+
+def _typo(rng, text):
+    """Drop, swap or duplicate one character"""
+    if len(text) < 3:
+        return text
+    i = rng.randrange(1, len(text) - 1)
+    choice = rng.random()
+    if choice < 0.33:
+        return text[:i] + text[i + 1:]
+    if choice < 0.66:
+        return text[:i - 1] + text[i] + text[i - 1] + text[i + 1:]
+    return text[:i] + text[i] + text[i:]
+
+
+def make_records(count, seed=42, duplicate_rate=0.05):
+    """Build `count` flat contact records; about `duplicate_rate` of them are near-duplicates"""
+    rng = random.Random(seed)
+    records = []
+    for i in range(count):
+        if records and rng.random() < duplicate_rate:
+            original = records[rng.randrange(len(records))]
+            given, family = original['given'], original['family']
+            if rng.random() < 0.5:
+                given = _typo(rng, given)
+            else:
+                family = _typo(rng, family)
+            email = original['email'] if rng.random() < 0.8 else f"{given}.{family}@{rng.choice(EMAIL_DOMAINS)}".lower()
+        else:
+            given = rng.choice(FIRST_NAMES)
+            family = rng.choice(LAST_NAMES)
+            email = f"{given}.{family}.{i}@{rng.choice(EMAIL_DOMAINS)}".lower().replace("'", '')
+        records.append({
+            'id': f"c{i:07x}",
+            'given': given,
+            'family': family,
+            'email': email,
+            'phone': f"+1 555-{rng.randrange(1000):03d}-{rng.randrange(10000):04d}" if rng.random() < 0.7 else '',
+            'notes': f"Synthetic contact {i} & co." if rng.random() < 0.3 else '',
+            'org': f"{family} & Sons" if rng.random() < 0.4 else '',
+        })
+    return records
+
+
+def record_to_contact(record, base_url='https://www.google.com/m8/feeds', domain='example.com'):
+    """Return the dict parse_contact_xml() would produce for a record"""
+    return {
+        'first_name': record['given'],
+        'last_name': record['family'],
+        'full_name': f"{record['given']} {record['family']}",
+        'id': f"http://www.google.com/m8/feeds/contacts/{domain}/base/{record['id']}",
+        'edit_url': f"{base_url}/contacts/{domain}/full/{record['id']}",
+        'emails': [{'address': record['email'], 'primary': True, 'rel': WORK_REL}],
+        'phones': [{'number': record['phone'], 'primary': True, 'rel': WORK_REL}] if record['phone'] else [],
+        'notes': record['notes'],
+    }
+
+
+def make_contacts(count, seed=42, duplicate_rate=0.05):
+    """Contact dicts in the shape returned by get_contacts()"""
+    return [record_to_contact(r) for r in make_records(count, seed, duplicate_rate)]
+
+
+def entry_xml(record, base_url='https://www.google.com/m8/feeds', domain='example.com', lean=False):
+    """Render a record as a full-projection Atom entry (without namespace declarations)"""
+    cid = record['id']
+    full_name = f"{record['given']} {record['family']}"
+    edit_href = quoteattr(f"{base_url}/contacts/{domain}/full/{cid}")
+    parts = [f"<entry gd:etag={quoteattr(chr(34) + 'etag-' + cid + chr(34))}>",
+             f"<id>http://www.google.com/m8/feeds/contacts/{domain}/base/{cid}</id>"]
+    if not lean:
+        parts.append(f"<updated>{record.get('updated', '2024-01-01T00:00:00.000Z')}</updated>"
+                     "<app:edited xmlns:app='http://www.w3.org/2007/app'>2024-01-01T00:00:00.000Z</app:edited>"
+                     "<category scheme='http://schemas.google.com/g/2005#kind' "
+                     "term='http://schemas.google.com/contact/2008#contact'/>"
+                     f"<title>{escape(full_name)}</title>")
+    if record['notes']:
+        parts.append(f"<content type='text'>{escape(record['notes'])}</content>")
+    if not lean:
+        parts.append(f"<link rel='http://schemas.google.com/contacts/2008/rel#photo' type='image/*' "
+                     f"href='{base_url}/photos/media/{domain}/{cid}'/>"
+                     f"<link rel='self' type='application/atom+xml' href={edit_href}/>")
+    parts.append(f"<link rel='edit' type='application/atom+xml' href={edit_href}/>")
+    parts.append(f"<gd:name><gd:fullName>{escape(full_name)}</gd:fullName>"
+                 f"<gd:givenName>{escape(record['given'])}</gd:givenName>"
+                 f"<gd:familyName>{escape(record['family'])}</gd:familyName></gd:name>")
+    if record.get('deleted'):
+        parts.append("<gd:deleted/>")
+    parts.append(f"<gd:email rel='{WORK_REL}' primary='true' address={quoteattr(record['email'])}/>")
+    if record['phone']:
+        parts.append(f"<gd:phoneNumber rel='{WORK_REL}' primary='true'>{escape(record['phone'])}</gd:phoneNumber>")
+    if record['org'] and not lean:
+        parts.append(f"<gd:organization rel='{WORK_REL}'><gd:orgName>{escape(record['org'])}</gd:orgName>"
+                     "<gd:orgTitle>Staff</gd:orgTitle></gd:organization>")
+    parts.append("</entry>")
+    return ''.join(parts)
+
+
+def feed_xml(records, start_index=1, total=None, base_url='https://www.google.com/m8/feeds',
+             domain='example.com', updated='2024-01-01T00:00:00.000Z', lean=False):
+    """Render one feed page containing `records`"""
+    if total is None:
+        total = len(records)
+    head = (
+        "<?xml version='1.0' encoding='UTF-8'?>"
+        f"<feed xmlns='{ATOM_NS}' xmlns:openSearch='http://a9.com/-/spec/opensearch/1.1/' "
+        f"xmlns:gContact='http://schemas.google.com/contact/2008' xmlns:batch='http://schemas.google.com/gdata/batch' "
+        f"xmlns:gd='{GD_NS}' gd:etag='W/\"feed-{start_index}-{total}\"'>"
+        f"<id>{domain}</id><updated>{updated}</updated>"
+    )
+    if not lean:
+        head += (
+            "<category scheme='http://schemas.google.com/g/2005#kind' "
+            "term='http://schemas.google.com/contact/2008#contact'/>"
+            f"<title>{domain}'s Contacts</title>"
+            f"<link rel='self' type='application/atom+xml' href='{base_url}/contacts/{domain}/full'/>"
+            f"<author><name>{domain}</name><email>{domain}</email></author>"
+            "<generator version='1.0' uri='http://www.google.com/m8/feeds'>Contacts</generator>"
+        )
+    head += (
+        f"<openSearch:totalResults>{total}</openSearch:totalResults>"
+        f"<openSearch:startIndex>{start_index}</openSearch:startIndex>"
+        f"<openSearch:itemsPerPage>{len(records)}</openSearch:itemsPerPage>"
+    )
+    body = ''.join(entry_xml(r, base_url, domain, lean) for r in records)
+    return head + body + "</feed>"
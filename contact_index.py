@@ -0,0 +1,220 @@
+import base64
+import bisect
+import json
+import re
+import threading
+
+WORD = re.compile(r'\w+')
+EMAIL_PARTS = re.compile(r'[^a-z0-9]+')
+# A query term made only of these characters is treated as a phone number
+PHONE_TERM = re.compile(r'^[\d\s()+.\-]+$')
+MIN_PHONE_DIGITS = 3
+
+
+def contact_tokens(contact):
+    """Index tokens for a contact: name words, email addresses and their parts, email domains, phone digits"""
+    tokens = set()
+    for field in ('first_name', 'last_name', 'full_name'):
+        tokens.update(WORD.findall((contact.get(field) or '').lower()))
+    for email in contact.get('emails') or []:
+        address = (email.get('address') or '').lower()
+        if not address:
+            continue
+        tokens.add(address)
+        local, _, domain = address.partition('@')
+        tokens.update(part for part in EMAIL_PARTS.split(local) if part)
+        if domain:
+            tokens.add(domain)
+            tokens.update(part for part in domain.split('.') if part)
+    for phone in contact.get('phones') or []:
+        digits = re.sub(r'\D', '', phone.get('number') or '')
+        if len(digits) >= MIN_PHONE_DIGITS:
+            tokens.add(digits)
+    return tokens
+
+
+def contact_domains(contact):
+    return {
+        (email.get('address') or '').lower().partition('@')[2]
+        for email in contact.get('emails') or []
+        if '@' in (email.get('address') or '')
+    }
+
+
+def query_terms(query):
+    """Split a search string into prefix terms matched against contact_tokens()"""
+    terms = []
+    for term in (query or '').lower().split():
+        if PHONE_TERM.match(term) and sum(c.isdigit() for c in term) >= MIN_PHONE_DIGITS:
+            terms.append(re.sub(r'\D', '', term))
+        elif '@' in term or '.' in term:
+            # Email-like terms match whole addresses or domains by prefix
+            terms.append(term.lstrip('@'))
+        else:
+            terms.extend(WORD.findall(term))
+    return [term for term in terms if term]
+
+
+def encode_cursor(sort_key):
+    return base64.urlsafe_b64encode(json.dumps(sort_key).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        sort_key = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        raise ValueError('Invalid cursor')
+    # Sort keys are (name, id); anything else can't be compared against the index order
+    if not (isinstance(sort_key, list) and len(sort_key) == 2 and all(isinstance(part, str) for part in sort_key)):
+        raise ValueError('Invalid cursor')
+    return tuple(sort_key)
+
+
+class ContactIndex:
+    """In-memory prefix index over the contact snapshot, kept current by ContactStore's listener.
+
+    Every token maps to the ids of the contacts carrying it, and the tokens
+    are also kept in one sorted list, so a prefix is a bisect plus a slice.
+    Contacts are ordered by (name, id) for cursor pagination.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._contacts = {}
+        self._postings = {}
+        self._sorted_tokens = []
+        self._contact_tokens = {}
+        self._sort_keys = {}
+        self._order = []
+        self.searches = 0
+        self.updates = 0
+
+    def apply(self, event, items):
+        """ContactStore listener: 'reset' with every contact, 'upsert' with contacts, 'remove' with ids"""
+        with self._lock:
+            if event == 'reset':
+                self.rebuild(items)
+            elif event == 'upsert':
+                for contact in items:
+                    self.add(contact)
+            elif event == 'remove':
+                for contact_id in items:
+                    self.remove(contact_id)
+
+    def rebuild(self, contacts):
+        with self._lock:
+            self._contacts = {}
+            self._postings = {}
+            self._contact_tokens = {}
+            self._sort_keys = {}
+            for contact in contacts:
+                contact_id = contact['id']
+                self._contacts[contact_id] = contact
+                tokens = contact_tokens(contact)
+                self._contact_tokens[contact_id] = tokens
+                for token in tokens:
+                    self._postings.setdefault(token, set()).add(contact_id)
+                self._sort_keys[contact_id] = self._sort_key(contact)
+            self._sorted_tokens = sorted(self._postings)
+            self._order = sorted(self._sort_keys.values())
+
+    def add(self, contact):
+        with self._lock:
+            contact_id = contact['id']
+            if contact_id in self._contacts:
+                self.remove(contact_id)
+            self._contacts[contact_id] = contact
+            tokens = contact_tokens(contact)
+            self._contact_tokens[contact_id] = tokens
+            for token in tokens:
+                ids = self._postings.get(token)
+                if ids is None:
+                    ids = self._postings[token] = set()
+                    bisect.insort(self._sorted_tokens, token)
+                ids.add(contact_id)
+            sort_key = self._sort_keys[contact_id] = self._sort_key(contact)
+            bisect.insort(self._order, sort_key)
+            self.updates += 1
+
+    def remove(self, contact_id):
+        with self._lock:
+            if self._contacts.pop(contact_id, None) is None:
+                return
+            for token in self._contact_tokens.pop(contact_id):
+                ids = self._postings[token]
+                ids.discard(contact_id)
+                if not ids:
+                    del self._postings[token]
+                    del self._sorted_tokens[bisect.bisect_left(self._sorted_tokens, token)]
+            sort_key = self._sort_keys.pop(contact_id)
+            del self._order[bisect.bisect_left(self._order, sort_key)]
+            self.updates += 1
+
+    @staticmethod
+    def _sort_key(contact):
+        emails = contact.get('emails') or [{}]
+        name = contact.get('full_name') or emails[0].get('address') or ''
+        return (name.lower(), contact['id'])
+
+    def _prefix_matches(self, prefix):
+        start = bisect.bisect_left(self._sorted_tokens, prefix)
+        ids = set()
+        # Walk by index: slicing would copy the whole tail of the token list per term
+        tokens = self._sorted_tokens
+        for index in range(start, len(tokens)):
+            if not tokens[index].startswith(prefix):
+                break
+            ids |= self._postings[tokens[index]]
+        return ids
+
+    def search(self, query='', domain=None, limit=50, cursor=None):
+        """Return {"contacts", "next_cursor", "total"} for contacts matching every query term
+
+        Terms match token prefixes; `domain` keeps contacts with an email at
+        exactly that domain. Pass next_cursor back to get the following page.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        terms = query_terms(query)
+        with self._lock:
+            self.searches += 1
+            matches = None
+            for term in sorted(terms, key=len, reverse=True):
+                ids = self._prefix_matches(term)
+                matches = ids if matches is None else matches & ids
+                if not matches:
+                    break
+            if domain:
+                ids = self._postings.get(domain.lower().lstrip('@'), set())
+                ids = {i for i in ids if domain.lower().lstrip('@') in contact_domains(self._contacts[i])}
+                matches = ids if matches is None else matches & ids
+
+            start = bisect.bisect_right(self._order, after) if after else 0
+            if matches is None:
+                page = self._order[start:start + limit + 1]
+                total = len(self._order)
+            elif len(matches) * 16 < len(self._order):
+                ordered = sorted(self._sort_keys[i] for i in matches)
+                start = bisect.bisect_right(ordered, after) if after else 0
+                page = ordered[start:start + limit + 1]
+                total = len(matches)
+            else:
+                # Dense result: walk the global order instead of sorting the matches
+                page = []
+                for sort_key in self._order[start:]:
+                    if sort_key[1] in matches:
+                        page.append(sort_key)
+                        if len(page) > limit:
+                            break
+                total = len(matches)
+
+            contacts = [self._contacts[sort_key[1]] for sort_key in page[:limit]]
+            next_cursor = encode_cursor(page[limit - 1]) if len(page) > limit else None
+        return {"contacts": contacts, "next_cursor": next_cursor, "total": total}
+
+    def stats(self):
+        return {
+            'contacts': len(self._contacts),
+            'tokens': len(self._postings),
+            'searches': self.searches,
+            'updates': self.updates
+        }
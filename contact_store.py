@@ -0,0 +1,376 @@
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from datetime import datetime, timezone
+
+from observability import SYNC_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Incremental syncs ask for changes since the previous sync started minus this
+# overlap, so clock skew between us and Google can't drop an update
+SYNC_OVERLAP = 60
+# Google rejects updated-min older than 30 days with 410 Gone
+UPDATED_MIN_LIMIT = 29 * 24 * 3600
+# End markers iter_contacts() reads from its sync thread: every page was
+# passed through, or the snapshot is up to date and should be read instead
+_STREAMED = object()
+_SYNCED = object()
+
+
+class ContactStore:
+    """Local snapshot of the domain's shared contacts.
+
+    The first read crawls the whole feed; later reads are answered from the
+    snapshot while it is younger than `max_age` seconds, and stale snapshots
+    are brought up to date with an updated-min/showdeleted incremental sync
+    instead of a full crawl. Writes made through the manager are applied in
+    place via its change listener. With `db_path` the snapshot is also kept
+    in SQLite so a restarted worker can resume incrementally; it is read back
+    on first use rather than at construction, so creating the store (and
+    importing the app) stays cheap. Listeners added with add_listener() see
+    every change to the snapshot.
+    """
+
+    def __init__(self, manager, max_age=60, db_path=None, full_sync_interval=24 * 3600):
+        self.manager = manager
+        self.max_age = max_age
+        self.db_path = db_path
+        self.full_sync_interval = full_sync_interval
+
+        self._lock = threading.RLock()
+        self._sync_lock = threading.Lock()
+        self._contacts = {}
+        self._edit_urls = {}
+        self._listeners = []
+        self.version = 0
+        self.synced_at = None
+        self.full_synced_at = None
+        self.updated_min = None
+
+        self.hits = 0
+        self.full_syncs = 0
+        self.incremental_syncs = 0
+        self.changes_applied = 0
+        self.local_writes = 0
+        self.sync_errors = 0
+        self.last_sync_seconds = None
+
+        self._loaded = not db_path
+        manager.add_change_listener(self.apply_change)
+
+    def add_listener(self, listener):
+        """Register listener(event, items), called under the store lock with
+        ('reset', contacts), ('upsert', contacts) or ('remove', ids).
+        It is called with 'reset' right away to load the current snapshot, if
+        there is one yet; otherwise its first 'reset' comes from load() or the
+        first sync.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+            if self.synced_at is not None:
+                listener('reset', list(self._contacts.values()))
+
+    def _notify(self, upserts=(), removals=(), reset=False):
+        for listener in self._listeners:
+            if reset:
+                listener('reset', list(self._contacts.values()))
+                continue
+            if removals:
+                listener('remove', removals)
+            if upserts:
+                listener('upsert', upserts)
+
+    def get_contacts(self, max_age=None, force=False, on_page=None):
+        """Return {"contacts": [...]} from the snapshot, syncing first if it is stale"""
+        error = self.ensure_fresh(max_age, force, on_page)
+        if error:
+            return error
+        with self._lock:
+            return {"contacts": list(self._contacts.values())}
+
+    def iter_contacts(self, max_age=None, force=False, batch_size=1000):
+        """Yield the contacts in batches; raises on sync failure
+
+        When a full crawl is due its feed pages are passed through as they
+        arrive, so callers can start sending contacts before the crawl ends.
+        Otherwise the snapshot is brought up to date and yielded in slices.
+        The sync runs on its own thread and hands pages over through a queue,
+        so a slow or vanished consumer never holds the sync lock: the crawl
+        finishes (and other syncs proceed) however fast the pages are read.
+        """
+        self.load()
+        if force or not self.is_fresh(max_age):
+            pages = queue.Queue()
+            threading.Thread(target=self._sync_into, args=(pages, max_age, force),
+                             name='contact-sync', daemon=True).start()
+            while True:
+                item = pages.get()
+                if item is _STREAMED:
+                    return
+                if item is _SYNCED:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        else:
+            self.hits += 1
+
+        contacts, _ = self.snapshot()
+        for start in range(0, len(contacts), batch_size):
+            yield contacts[start:start + batch_size]
+
+    def _sync_into(self, pages, max_age, force):
+        """iter_contacts() worker: sync under the sync lock, putting each page of a
+        full crawl on `pages`, then _STREAMED, _SYNCED or the exception raised"""
+        try:
+            with self._sync_lock:
+                if force or not self.is_fresh(max_age):
+                    if self._full_sync_due(time.time()):
+                        for page in self.sync_pages(full=True):
+                            pages.put(page)
+                        pages.put(_STREAMED)
+                        return
+                    for _ in self.sync_pages():
+                        pass
+                else:
+                    self.hits += 1
+            pages.put(_SYNCED)
+        except Exception as e:
+            pages.put(e)
+
+    def snapshot(self):
+        """Return (contacts, version) as one consistent pair"""
+        with self._lock:
+            return list(self._contacts.values()), self.version
+
+    def ensure_fresh(self, max_age=None, force=False, on_page=None):
+        """Sync if the snapshot is older than max_age; return an error dict or None"""
+        self.load()
+        if not force and self.is_fresh(max_age):
+            self.hits += 1
+            return None
+
+        with self._sync_lock:
+            # Another request may have synced while we waited
+            if not force and self.is_fresh(max_age):
+                self.hits += 1
+                return None
+            return self.sync(on_page=on_page)
+
+    def is_fresh(self, max_age=None):
+        if max_age is None:
+            max_age = self.max_age
+        return self.synced_at is not None and time.time() - self.synced_at <= max_age
+
+    def _full_sync_due(self, now):
+        return (self.updated_min is None or self.full_synced_at is None
+                or now - self.full_synced_at > min(self.full_sync_interval, UPDATED_MIN_LIMIT))
+
+    def sync(self, full=False, on_page=None):
+        """Bring the snapshot up to date; return an error dict or None
+
+        on_page(pages, contacts) is called after each feed page is read.
+        """
+        try:
+            for _ in self.sync_pages(full, on_page):
+                pass
+        except Exception as e:
+            return self.error_result(e)
+        return None
+
+    def sync_pages(self, full=False, on_page=None):
+        """Generator form of sync(): yields each feed page as it is read and
+        applies them to the snapshot once the crawl completes; raises on failure
+        """
+        started = time.time()
+        full = full or self._full_sync_due(started)
+
+        if full:
+            pages = self.manager.iter_pages()
+        else:
+            pages = self.manager.iter_pages(updated_min=self.updated_min, show_deleted=True)
+        contacts = []
+        try:
+            for page_number, page in enumerate(pages, 1):
+                contacts.extend(page)
+                if on_page:
+                    on_page(page_number, len(contacts))
+                yield page
+        except Exception as e:
+            if not full and getattr(e, 'status', None) == 410:
+                yield from self.sync_pages(full=True, on_page=on_page)
+                return
+            self.sync_errors += 1
+            SYNC_SECONDS.observe(time.time() - started, kind='full' if full else 'incremental', outcome='error')
+            logger.warning('Contact sync failed: %s', e, extra={
+                'event': 'sync_failed', 'full': full, 'contacts_fetched': len(contacts)
+            })
+            raise
+
+        updated_min = datetime.fromtimestamp(started - SYNC_OVERLAP, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+        with self._lock:
+            if full:
+                self._replace(contacts)
+                self.full_syncs += 1
+                self.full_synced_at = started
+            else:
+                self._merge(contacts)
+                self.incremental_syncs += 1
+            self.updated_min = updated_min
+            self.synced_at = started
+            self.last_sync_seconds = round(time.time() - started, 3)
+            self._save_meta()
+        SYNC_SECONDS.observe(self.last_sync_seconds, kind='full' if full else 'incremental', outcome='success')
+        logger.info('Contact sync finished', extra={
+            'event': 'sync', 'full': full, 'changes': len(contacts), 'contacts': len(self._contacts),
+            'seconds': self.last_sync_seconds
+        })
+
+    @staticmethod
+    def error_result(error):
+        """Format a sync failure the way the API reports errors"""
+        if hasattr(error, 'status'):
+            return {"error": str(error)}
+        return {"error": f"Error retrieving contacts: {str(error)}"}
+
+    def _replace(self, contacts):
+        self._contacts = {}
+        self._edit_urls = {}
+        for contact in contacts:
+            contact.pop('deleted', None)
+            self._put(contact)
+        self.version += 1
+        self._notify(reset=True)
+        if self.db_path:
+            with closing(sqlite3.connect(self.db_path)) as conn, conn:
+                conn.execute("DELETE FROM contacts")
+                conn.executemany("INSERT INTO contacts (id, data) VALUES (?, ?)",
+                                 [(c['id'], json.dumps(c)) for c in self._contacts.values()])
+
+    def _merge(self, changes):
+        upserts = []
+        removals = []
+        for contact in changes:
+            if contact.pop('deleted', False):
+                if self._remove(contact['id']):
+                    removals.append(contact['id'])
+            else:
+                self._put(contact)
+                upserts.append(contact)
+        if upserts or removals:
+            self.version += 1
+            self.changes_applied += len(upserts) + len(removals)
+            self._persist(upserts, removals)
+            self._notify(upserts, removals)
+
+    def _put(self, contact):
+        previous = self._contacts.get(contact['id'])
+        if previous and previous.get('edit_url'):
+            self._edit_urls.pop(previous['edit_url'], None)
+        # Replacing an existing key keeps its position in feed order
+        self._contacts[contact['id']] = contact
+        if contact.get('edit_url'):
+            self._edit_urls[contact['edit_url']] = contact['id']
+
+    def _remove(self, contact_id):
+        contact = self._contacts.pop(contact_id, None)
+        if contact and contact.get('edit_url'):
+            self._edit_urls.pop(contact['edit_url'], None)
+        return contact is not None
+
+    def apply_change(self, event, contact=None, edit_url=None):
+        """Change listener: apply the app's own create/update/delete to the snapshot"""
+        with self._lock:
+            if self.synced_at is None:
+                return
+            removals = []
+            upserts = []
+            if event in ('updated', 'deleted') and edit_url in self._edit_urls:
+                contact_id = self._edit_urls[edit_url]
+                if event == 'deleted' or (contact and contact.get('id') != contact_id):
+                    self._remove(contact_id)
+                    removals.append(contact_id)
+            if event in ('created', 'updated') and contact and contact.get('id'):
+                self._put(contact)
+                upserts.append(contact)
+            if upserts or removals:
+                self.version += 1
+                self.local_writes += 1
+                self._persist(upserts, removals)
+                self._notify(upserts, removals)
+
+    def _persist(self, upserts, removals):
+        if not self.db_path:
+            return
+        with closing(sqlite3.connect(self.db_path)) as conn, conn:
+            conn.executemany("INSERT INTO contacts (id, data) VALUES (?, ?) "
+                             "ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+                             [(c['id'], json.dumps(c)) for c in upserts])
+            conn.executemany("DELETE FROM contacts WHERE id = ?", [(i,) for i in removals])
+            self._write_meta(conn)
+
+    def _save_meta(self):
+        if not self.db_path:
+            return
+        with closing(sqlite3.connect(self.db_path)) as conn, conn:
+            self._write_meta(conn)
+
+    def _write_meta(self, conn):
+        meta = {
+            'version': self.version,
+            'synced_at': self.synced_at,
+            'full_synced_at': self.full_synced_at,
+            'updated_min': self.updated_min
+        }
+        conn.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                         [(k, json.dumps(v)) for k, v in meta.items()])
+
+    def load(self):
+        """Read the snapshot persisted in db_path, the first time it is called"""
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._load()
+            self._loaded = True
+            if self.synced_at is not None:
+                self._notify(reset=True)
+
+    def _load(self):
+        with closing(sqlite3.connect(self.db_path)) as conn, conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS contacts (id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            meta = {k: json.loads(v) for k, v in conn.execute("SELECT key, value FROM meta")}
+            rows = conn.execute("SELECT data FROM contacts ORDER BY rowid").fetchall()
+
+        if meta.get('full_synced_at') is None:
+            return
+        for (data,) in rows:
+            self._put(json.loads(data))
+        self.version = meta.get('version') or 0
+        self.synced_at = meta.get('synced_at')
+        self.full_synced_at = meta.get('full_synced_at')
+        self.updated_min = meta.get('updated_min')
+
+    def stats(self):
+        """Return snapshot size and sync counters"""
+        return {
+            'contacts': len(self._contacts),
+            'version': self.version,
+            'age_seconds': round(time.time() - self.synced_at, 1) if self.synced_at else None,
+            'max_age': self.max_age,
+            'hits': self.hits,
+            'full_syncs': self.full_syncs,
+            'incremental_syncs': self.incremental_syncs,
+            'changes_applied': self.changes_applied,
+            'local_writes': self.local_writes,
+            'sync_errors': self.sync_errors,
+            'last_sync_seconds': self.last_sync_seconds,
+            'persistent': bool(self.db_path)
+        }
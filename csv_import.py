@@ -0,0 +1,256 @@
+import csv
+import fcntl
+import io
+import json
+import os
+import re
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+
+REQUIRED_COLUMNS = ('first_name', 'last_name', 'email')
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+REPORT_COLUMNS = ['row', 'status', 'email', 'message']
+
+
+class ImportInProgress(Exception):
+    """Another run, possibly in another worker process, holds the import's lease"""
+
+
+def normalize_row(row):
+    """Map one CSV record to contact_data; returns (contact_data, error)"""
+    values = {key: (value or '').strip() for key, value in row.items() if key}
+    first_name = values.get('first_name', '')
+    last_name = values.get('last_name', '')
+    email = values.get('email', '')
+
+    if not (first_name or last_name or email):
+        return None, 'Row has no name or email'
+    if email and not EMAIL_PATTERN.match(email):
+        return None, f"Invalid email address: {email}"
+
+    return {
+        'first_name': first_name,
+        'last_name': last_name,
+        'email': email,
+        'phone': values.get('phone', ''),
+        'notes': values.get('notes', ''),
+        'display_name': values.get('display_name') or f"{first_name} {last_name}".strip()
+    }, None
+
+
+def existing_emails(contacts):
+    """Lower-cased primary email of every contact that has one"""
+    import dedupe
+    emails = set()
+    for contact in contacts:
+        email = dedupe.primary_email(contact)
+        if email:
+            emails.add(email.lower())
+    return emails
+
+
+class CSVImport:
+    """An uploaded CSV file and its import state, kept on disk under `directory`.
+
+    The file is read row by row and written in batches, with at most
+    `concurrency` batches in flight, so memory does not grow with the file
+    (apart from the set of emails used for de-duplication). After each batch
+    completes, in file order, its report lines are appended to the error
+    report and the checkpoint is advanced, so an interrupted import resumes
+    after the last finished batch. Rows of a failed batch are listed in the
+    checkpoint's failed_rows and sent again by the next run, which leaves
+    the import unfinished until none remain. Runs hold a lease (an flock on the lock
+    file, which names the owning job) so only one process imports a file at
+    a time.
+    """
+
+    def __init__(self, directory, import_id):
+        if not re.fullmatch(r'[0-9a-f]{32}', import_id):
+            raise ValueError(f"Invalid import id: {import_id}")
+        self.import_id = import_id
+        self.csv_path = os.path.join(directory, f"{import_id}.csv")
+        self.checkpoint_path = os.path.join(directory, f"{import_id}.json")
+        self.report_path = os.path.join(directory, f"{import_id}.errors.csv")
+        self.lock_path = os.path.join(directory, f"{import_id}.lock")
+
+    @classmethod
+    def create(cls, directory, upload):
+        """Save an uploaded file (a werkzeug FileStorage) and check its header row"""
+        os.makedirs(directory, exist_ok=True)
+        csv_import = cls(directory, uuid.uuid4().hex)
+        upload.save(csv_import.csv_path)
+        try:
+            with open(csv_import.csv_path, newline='', encoding='utf-8-sig') as f:
+                header = [column.strip().lower() for column in next(csv.reader(f), [])]
+        except UnicodeDecodeError:
+            csv_import.discard()
+            raise ValueError('CSV file must be UTF-8 encoded')
+        missing = [column for column in REQUIRED_COLUMNS if column not in header]
+        if missing:
+            csv_import.discard()
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        csv_import.save_checkpoint({'row': 0, 'finished': False, 'failed_rows': [], 'counts': {
+            'rows': 0, 'created': 0, 'skipped': 0, 'invalid': 0, 'failed': 0
+        }})
+        return csv_import
+
+    def exists(self):
+        return os.path.exists(self.csv_path) and os.path.exists(self.checkpoint_path)
+
+    def discard(self):
+        for path in (self.csv_path, self.checkpoint_path, self.report_path, self.lock_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+    @contextmanager
+    def lease(self, owner):
+        """Hold the import's lock while the block runs, recording `owner`;
+        raises ImportInProgress if another run holds it. The lock goes with
+        the process, so a crashed worker never leaves it behind."""
+        with open(self.lock_path, 'a+') as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                raise ImportInProgress(f"Import {self.import_id} is already running")
+            f.seek(0)
+            f.truncate()
+            f.write(owner)
+            f.flush()
+            yield
+
+    def running(self):
+        """Whether some run holds the lease right now"""
+        if not os.path.exists(self.lock_path):
+            return False
+        with open(self.lock_path) as f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+        return False
+
+    def owner(self):
+        """Owner recorded by the latest lease (the job that ran or runs the import), or None"""
+        try:
+            with open(self.lock_path) as f:
+                return f.read() or None
+        except FileNotFoundError:
+            return None
+
+    def load_checkpoint(self):
+        with open(self.checkpoint_path) as f:
+            return json.load(f)
+
+    def save_checkpoint(self, state):
+        temp_path = self.checkpoint_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(temp_path, self.checkpoint_path)
+
+    def rows(self, after=0, include=()):
+        """Yield (row_number, record, bytes_read) for data rows numbered above `after` or in `include`"""
+        with open(self.csv_path, 'rb') as raw:
+            reader = csv.DictReader(io.TextIOWrapper(raw, encoding='utf-8-sig', newline=''))
+            reader.fieldnames = [column.strip().lower() for column in reader.fieldnames or []]
+            for row_number, record in enumerate(reader, 1):
+                if row_number > after or row_number in include:
+                    yield row_number, record, raw.tell()
+
+    def run(self, manager, known_emails=(), batch_size=100, concurrency=4, progress=None):
+        """Import the file from its checkpoint; returns the final checkpoint
+
+        Call under lease(). manager.batch() performs the writes. Rows whose
+        email is in known_emails or earlier in the file are skipped as
+        duplicates. Rows that failed on earlier runs are retried first.
+        progress(state) is called after each batch.
+        """
+        state = self.load_checkpoint()
+        if state['finished']:
+            return state
+        counts = state['counts']
+        failed_rows = set(state.get('failed_rows', []))
+        # Failed rows this run sends again; each one leaves failed_rows (and the
+        # failed count) when its new attempt finishes, and rejoins if it fails again
+        retrying = set(failed_rows)
+        seen = set(known_emails)
+        bytes_total = os.path.getsize(self.csv_path)
+        bytes_read = 0
+        # Segments in file order: (last_row, report_lines, batch_rows, future)
+        pending = deque()
+        report_lines = []
+        batch_rows = []
+
+        new_report = not os.path.exists(self.report_path)
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='import') as pool, \
+                open(self.report_path, 'a', newline='', encoding='utf-8') as report_file:
+            report = csv.writer(report_file)
+            if new_report:
+                report.writerow(REPORT_COLUMNS)
+
+            def finish_oldest():
+                last_row, lines, rows, future = pending.popleft()
+                for row_number in [line[0] for line in lines] + [row_number for row_number, _ in rows]:
+                    if row_number in retrying:
+                        retrying.discard(row_number)
+                        failed_rows.discard(row_number)
+                        counts['failed'] -= 1
+                for line in lines:
+                    counts[line[1]] += 1
+                for (row_number, contact_data), result in zip(rows, future.result() if future else []):
+                    if result.get('success'):
+                        counts['created'] += 1
+                    else:
+                        counts['failed'] += 1
+                        failed_rows.add(row_number)
+                        lines.append([row_number, 'failed', contact_data['email'],
+                                      f"{result.get('error', '')} (retried when the import is resumed)"])
+                lines.sort(key=lambda line: line[0])
+                report.writerows(lines)
+                report_file.flush()
+                # Retried rows lie behind the checkpoint, so it only ever moves forward
+                counts['rows'] += max(last_row - state['row'], 0)
+                state['row'] = max(state['row'], last_row)
+                state['failed_rows'] = sorted(failed_rows)
+                self.save_checkpoint(state)
+                if progress:
+                    progress(dict(state, bytes_read=bytes_read, bytes_total=bytes_total))
+
+            def close_segment(last_row):
+                nonlocal report_lines, batch_rows
+                if len(pending) >= concurrency:
+                    finish_oldest()
+                future = None
+                if batch_rows:
+                    operations = [{'op': 'create', 'contact_data': data} for _, data in batch_rows]
+                    future = pool.submit(manager.batch, operations)
+                pending.append((last_row, report_lines, batch_rows, future))
+                report_lines, batch_rows = [], []
+
+            row_number = state['row']
+            for row_number, record, bytes_read in self.rows(state['row'], frozenset(retrying)):
+                contact_data, error = normalize_row(record)
+                if error:
+                    report_lines.append([row_number, 'invalid', (record.get('email') or '').strip(), error])
+                else:
+                    email = contact_data['email'].lower()
+                    if email and email in seen:
+                        report_lines.append([row_number, 'skipped', contact_data['email'],
+                                             'Duplicate of an existing contact or an earlier row'])
+                    else:
+                        if email:
+                            seen.add(email)
+                        batch_rows.append((row_number, contact_data))
+                if len(batch_rows) >= batch_size or len(report_lines) >= batch_size:
+                    close_segment(row_number)
+
+            if report_lines or batch_rows:
+                close_segment(row_number)
+            while pending:
+                finish_oldest()
+
+        state['finished'] = not failed_rows
+        self.save_checkpoint(state)
+        return state
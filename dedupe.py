@@ -0,0 +1,310 @@
+import random
+import re
+import time
+import zlib
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+# calculate_similarity() weights; email is more important for duplicates
+NAME_WEIGHT = 0.4
+EMAIL_WEIGHT = 0.6
+
+# MinHash LSH over name character trigrams: 16 bands of 2 rows puts the
+# 50% collision point near a Jaccard similarity of 0.2
+MINHASH_BANDS = 16
+MINHASH_ROWS = 2
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = random.Random(20240101)
+_MINHASH_PARAMS = [
+    (_rng.randrange(1, _MERSENNE_PRIME), _rng.randrange(0, _MERSENNE_PRIME))
+    for _ in range(MINHASH_BANDS * MINHASH_ROWS)
+]
+
+_TOKEN_RE = re.compile(r'\w+')
+_NON_DIGITS_RE = re.compile(r'\D')
+_SOUNDEX_CODES = {c: str(d) for d, letters in enumerate(
+    ['aeiouyhw', 'bfpv', 'cgjkqsxz', 'dt', 'l', 'mn', 'r']) for c in letters}
+
+
+def primary_email(contact):
+    """Lowercased primary email, falling back to the first address"""
+    emails = contact.get('emails')
+    if not emails:
+        return ''
+    for email in emails:
+        if email.get('primary'):
+            address = email.get('address', '').lower()
+            if address:
+                return address
+            break
+    return emails[0].get('address', '').lower()
+
+
+def normalized_name(contact):
+    return f"{contact.get('first_name', '')} {contact.get('last_name', '')}".strip().lower()
+
+
+class ContactFeatures:
+    """Normalised fields of one contact, computed once per scan instead of once per pair"""
+
+    __slots__ = ('name', 'email', 'domain', 'phones', 'tokens')
+
+    def __init__(self, contact):
+        self.name = normalized_name(contact)
+        self.email = primary_email(contact)
+        self.domain = self.email.rpartition('@')[2]
+        self.phones = tuple(
+            digits for digits in (_NON_DIGITS_RE.sub('', phone.get('number') or '')
+                                  for phone in contact.get('phones') or [])
+            if digits
+        )
+        self.tokens = frozenset(_TOKEN_RE.findall(self.name))
+
+
+def score_features(features1, features2):
+    """Similarity of two ContactFeatures; same value as calculate_similarity()"""
+    name_similarity = SequenceMatcher(None, features1.name, features2.name).ratio()
+    email_similarity = 1.0 if features1.email and features1.email == features2.email else 0.0
+    return name_similarity * NAME_WEIGHT + email_similarity * EMAIL_WEIGHT
+
+
+def calculate_similarity(contact1, contact2):
+    """Calculate similarity between two contacts"""
+    return score_features(ContactFeatures(contact1), ContactFeatures(contact2))
+
+
+class PairScorer:
+    """Scores feature pairs against a threshold.
+
+    Cheap upper bounds (email weight, real_quick_ratio, quick_ratio) reject
+    pairs that cannot reach the threshold before the full ratio() runs, and
+    the matcher keeps its seq2 analysis while consecutive pairs share the
+    second contact. Results are identical to score_features().
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.ratios_computed = 0
+        self._matcher = SequenceMatcher(None)
+        self._seq2 = None
+
+    def score(self, features1, features2):
+        """Return the similarity, or None if it is below the threshold"""
+        threshold = self.threshold
+        email_part = (1.0 if features1.email and features1.email == features2.email else 0.0) * EMAIL_WEIGHT
+        if NAME_WEIGHT + email_part < threshold:
+            return None
+
+        matcher = self._matcher
+        if features2.name != self._seq2:
+            matcher.set_seq2(features2.name)
+            self._seq2 = features2.name
+        matcher.set_seq1(features1.name)
+        if matcher.real_quick_ratio() * NAME_WEIGHT + email_part < threshold:
+            return None
+        if matcher.quick_ratio() * NAME_WEIGHT + email_part < threshold:
+            return None
+
+        self.ratios_computed += 1
+        similarity = matcher.ratio() * NAME_WEIGHT + email_part
+        return similarity if similarity >= threshold else None
+
+
+def soundex(word):
+    """American Soundex code, e.g. 'Robert' -> 'R163'"""
+    word = ''.join(c for c in word.lower() if c.isalpha())
+    if not word:
+        return ''
+    code = word[0].upper()
+    previous = _SOUNDEX_CODES.get(word[0], '')
+    for c in word[1:]:
+        digit = _SOUNDEX_CODES.get(c, '')
+        if digit and digit != '0' and digit != previous:
+            code += digit
+            if len(code) == 4:
+                break
+        # h and w don't separate letters with the same code
+        if c not in 'hw':
+            previous = digit
+    return code.ljust(4, '0')
+
+
+def minhash_bands(text):
+    """LSH band signatures of the character trigrams of text"""
+    padded = f" {text} "
+    shingles = {zlib.crc32(padded[i:i + 3].encode('utf-8')) for i in range(max(len(padded) - 2, 1))}
+    signature = [min((a * s + b) % _MERSENNE_PRIME for s in shingles) for a, b in _MINHASH_PARAMS]
+    return [tuple(signature[i:i + MINHASH_ROWS]) for i in range(0, len(signature), MINHASH_ROWS)]
+
+
+def blocking_keys(features, name_keys=True):
+    """Keys under which a contact is bucketed; only contacts sharing a key are compared"""
+    keys = []
+    if features.email:
+        keys.append(('email', features.email))
+    if name_keys:
+        tokens = sorted(features.tokens)
+        keys.append(('tokens', ' '.join(tokens)))
+        if tokens:
+            keys.append(('soundex', ' '.join(sorted(soundex(t) for t in tokens))))
+            keys.extend(('minhash', band, value) for band, value in enumerate(minhash_bands(features.name)))
+    return keys
+
+
+def needs_name_keys(threshold):
+    """Whether a pair with different primary emails can still reach threshold"""
+    return threshold <= NAME_WEIGHT
+
+
+def candidate_pairs(features, threshold):
+    """(i, j) index pairs, i < j, that share at least one blocking key.
+
+    Above NAME_WEIGHT a pair can only reach the threshold if the primary
+    emails match, so the email key alone loses no matches; name keys are
+    added for lower thresholds. Pairs are ordered by j, then i, so that
+    PairScorer keeps seq2 cached across runs of the same j.
+    """
+    name_keys = needs_name_keys(threshold)
+    blocks = defaultdict(list)
+    for index, contact_features in enumerate(features):
+        for key in blocking_keys(contact_features, name_keys):
+            blocks[key].append(index)
+
+    n = len(features)
+    pairs = set()
+    for members in blocks.values():
+        if len(members) < 2:
+            continue
+        for a, i in enumerate(members):
+            for j in members[a + 1:]:
+                # Encoded as one int: cheaper to hash and sorts like (j, i)
+                pairs.add(j * n + i)
+    return [(p % n, p // n) for p in sorted(pairs)]
+
+
+# Set in each pool worker by _init_worker so features are shipped once per worker
+_worker_features = None
+_worker_threshold = None
+
+
+def _init_worker(features, threshold):
+    global _worker_features, _worker_threshold
+    _worker_features = features
+    _worker_threshold = threshold
+
+
+def _score_pairs(pairs, features=None, threshold=None):
+    """Score a shard of (i, j) pairs; return (matches, ratios computed)"""
+    if features is None:
+        features, threshold = _worker_features, _worker_threshold
+    scorer = PairScorer(threshold)
+    score = scorer.score
+    matches = []
+    for i, j in pairs:
+        similarity = score(features[i], features[j])
+        if similarity is not None:
+            matches.append((i, j, similarity))
+    return matches, scorer.ratios_computed
+
+
+def _score_rows(bounds, features=None, threshold=None):
+    """Score every pair i < j for j in range(*bounds), a row block of the comparison matrix"""
+    start, stop = bounds
+    return _score_pairs(((i, j) for j in range(start, stop) for i in range(j)), features, threshold)
+
+
+def _row_blocks(n, chunk_size):
+    """Split rows 0..n into (start, stop) blocks holding about chunk_size pairs each"""
+    blocks = []
+    start = pairs = 0
+    for j in range(n):
+        pairs += j
+        if pairs >= chunk_size:
+            blocks.append((start, j + 1))
+            start, pairs = j + 1, 0
+    if start < n:
+        blocks.append((start, n))
+    return blocks
+
+
+def scan(contacts, threshold=0.8, method='blocked', workers=1, chunk_size=50000, progress=None):
+    """Find duplicate pairs; return (duplicates, report)
+
+    method 'pairwise' compares every pair; 'blocked' scores only candidate
+    pairs from candidate_pairs(). With workers > 1, scoring is sharded
+    across a process pool: candidate pairs in chunks of chunk_size, or
+    row blocks of the comparison matrix for 'pairwise'. Results are
+    ordered by similarity (highest first), then by contact position, so
+    they are identical for any worker count.
+
+    progress(pairs_scored, new_duplicates) is called as each shard finishes.
+    """
+    started = time.perf_counter()
+    n = len(contacts)
+    features = [ContactFeatures(contact) for contact in contacts]
+    pairwise = method == 'pairwise' or threshold <= 0
+    if pairwise:
+        shards = _row_blocks(n, chunk_size)
+        score_shard = _score_rows
+        shard_sizes = [(stop * (stop - 1) - start * (start - 1)) // 2 for start, stop in shards]
+        candidates = n * (n - 1) // 2
+    else:
+        pairs = candidate_pairs(features, threshold)
+        shards = [pairs[k:k + chunk_size] for k in range(0, len(pairs), chunk_size)]
+        score_shard = _score_pairs
+        shard_sizes = [len(shard) for shard in shards]
+        candidates = len(pairs)
+    blocked_at = time.perf_counter()
+
+    def to_duplicates(matches):
+        return [
+            {'contact1': contacts[i], 'contact2': contacts[j], 'similarity': similarity}
+            for i, j, similarity in matches
+        ]
+
+    def collect(shard_results):
+        results = []
+        pairs_scored = 0
+        for shard_size, result in zip(shard_sizes, shard_results):
+            results.append(result)
+            pairs_scored += shard_size
+            if progress:
+                progress(pairs_scored, to_duplicates(result[0]))
+        return results
+
+    workers = max(1, min(workers, len(shards)))
+    if workers > 1:
+        # Imported here so that loading the scorer (e.g. at app start-up) doesn't pull in multiprocessing
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        # spawn, not fork: the web app calling this is multi-threaded
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 initializer=_init_worker, initargs=(features, threshold)) as pool:
+            results = collect(pool.map(score_shard, shards))
+    else:
+        results = collect(score_shard(shard, features, threshold) for shard in shards)
+
+    matches = [match for shard_matches, _ in results for match in shard_matches]
+    matches.sort(key=lambda match: (-match[2], match[0], match[1]))
+    duplicates = to_duplicates(matches)
+    finished = time.perf_counter()
+
+    report = {
+        'method': 'pairwise' if pairwise else 'blocked',
+        'workers': workers,
+        'contacts': n,
+        'pairs_compared': candidates,
+        'ratios_computed': sum(ratios for _, ratios in results),
+        'all_pairs': n * (n - 1) // 2,
+        'matches': len(duplicates),
+        'candidate_seconds': round(blocked_at - started, 4),
+        'scoring_seconds': round(finished - blocked_at, 4),
+        'seconds': round(finished - started, 4)
+    }
+    return duplicates, report
+
+
+def find_duplicates(contacts, threshold=0.8, method='blocked', workers=1, chunk_size=50000):
+    """Find duplicate contacts based on similarity"""
+    duplicates, _ = scan(contacts, threshold, method, workers, chunk_size)
+    return duplicates
@@ -0,0 +1,206 @@
+import threading
+import time
+from itertools import count
+
+# Phone numbers shorter than this are too ambiguous to bucket on
+MIN_PHONE_DIGITS = 7
+
+
+def contact_from_data(contact_data):
+    """Shape a create/update payload like a parsed contact so it can be featurised"""
+    first_name = contact_data.get('first_name', '')
+    last_name = contact_data.get('last_name', '')
+    contact = {
+        'first_name': first_name,
+        'last_name': last_name,
+        'full_name': f"{first_name} {last_name}".strip(),
+        'emails': [],
+        'phones': []
+    }
+    if contact_data.get('email'):
+        contact['emails'].append({'address': contact_data['email'], 'primary': True})
+    for email in contact_data.get('additional_emails') or []:
+        contact['emails'].append({'address': email, 'primary': False})
+    if contact_data.get('phone'):
+        contact['phones'].append({'number': contact_data['phone'], 'primary': True})
+    return contact
+
+
+class DuplicateIndex:
+    """Likely-duplicate pairs of the snapshot, maintained as contacts change.
+
+    Each contact is bucketed under its blocking keys (primary email and,
+    when `min_threshold` is low enough for names alone to match, name keys
+    and phone digits). A new or changed contact is scored only against the
+    contacts sharing one of its buckets, and every pair scoring at least
+    `min_threshold` is kept, so duplicates() at or above that threshold is
+    a lookup instead of a scan. Registered as a ContactStore listener.
+    """
+
+    def __init__(self, min_threshold=0.5):
+        self.min_threshold = min_threshold
+        self._name_keys = None
+        self._lock = threading.RLock()
+        self._contacts = {}
+        self._features = {}
+        self._keys = {}
+        self._blocks = {}
+        self._neighbours = {}
+        self._positions = {}
+        self._sequence = count()
+        self.loaded = False
+        self.checks = 0
+        self.last_check_seconds = None
+
+    # dedupe (and difflib) are imported on first use, not when the app
+    # constructs the index at start-up
+    @property
+    def name_keys(self):
+        if self._name_keys is None:
+            import dedupe
+            self._name_keys = dedupe.needs_name_keys(self.min_threshold)
+        return self._name_keys
+
+    def apply(self, event, items):
+        """ContactStore listener: 'reset' with every contact, 'upsert' with contacts, 'remove' with ids"""
+        with self._lock:
+            if event == 'reset':
+                self.rebuild(items)
+            elif event == 'upsert':
+                for contact in items:
+                    self.add(contact)
+            elif event == 'remove':
+                for contact_id in items:
+                    self.remove(contact_id)
+
+    def _blocking_keys(self, features):
+        import dedupe
+        keys = dedupe.blocking_keys(features, self.name_keys)
+        if self.name_keys:
+            keys.extend(('phone', digits) for digits in features.phones if len(digits) >= MIN_PHONE_DIGITS)
+        return keys
+
+    def _candidates(self, keys, exclude=None):
+        candidates = set()
+        for key in keys:
+            candidates |= self._blocks.get(key, set())
+        candidates.discard(exclude)
+        return candidates
+
+    def rebuild(self, contacts):
+        with self._lock:
+            self._contacts = {}
+            self._features = {}
+            self._keys = {}
+            self._blocks = {}
+            self._neighbours = {}
+            self._positions = {}
+            self._sequence = count()
+            for contact in contacts:
+                self.add(contact)
+            self.loaded = True
+
+    def add(self, contact):
+        import dedupe
+        with self._lock:
+            contact_id = contact['id']
+            position = self._positions.get(contact_id)
+            if contact_id in self._contacts:
+                self.remove(contact_id)
+            if position is None:
+                position = next(self._sequence)
+            # Updates keep their feed position, as they do in the snapshot
+            self._positions[contact_id] = position
+
+            features = dedupe.ContactFeatures(contact)
+            keys = self._blocking_keys(features)
+            neighbours = {}
+            scorer = dedupe.PairScorer(self.min_threshold)
+            for other_id in self._candidates(keys, exclude=contact_id):
+                # Earlier contact first, the same argument order scan() uses
+                if self._positions[other_id] < position:
+                    similarity = scorer.score(self._features[other_id], features)
+                else:
+                    similarity = scorer.score(features, self._features[other_id])
+                if similarity is not None:
+                    neighbours[other_id] = similarity
+                    self._neighbours[other_id][contact_id] = similarity
+
+            self._contacts[contact_id] = contact
+            self._features[contact_id] = features
+            self._keys[contact_id] = keys
+            self._neighbours[contact_id] = neighbours
+            for key in keys:
+                self._blocks.setdefault(key, set()).add(contact_id)
+
+    def remove(self, contact_id):
+        with self._lock:
+            if self._contacts.pop(contact_id, None) is None:
+                return
+            del self._features[contact_id]
+            del self._positions[contact_id]
+            for key in self._keys.pop(contact_id):
+                members = self._blocks[key]
+                members.discard(contact_id)
+                if not members:
+                    del self._blocks[key]
+            for other_id in self._neighbours.pop(contact_id):
+                self._neighbours[other_id].pop(contact_id, None)
+
+    def check(self, contact, threshold=None, exclude=None):
+        """Existing contacts likely to duplicate `contact`, as [{"contact", "similarity"}], best first"""
+        import dedupe
+        started = time.perf_counter()
+        if threshold is None:
+            threshold = self.min_threshold
+        features = dedupe.ContactFeatures(contact)
+        # Name keys only matter when names alone can reach the threshold
+        keys = dedupe.blocking_keys(features, dedupe.needs_name_keys(threshold))
+        scorer = dedupe.PairScorer(threshold)
+        with self._lock:
+            if not dedupe.needs_name_keys(threshold) or self.name_keys:
+                candidates = self._candidates(keys, exclude)
+            else:
+                # Name keys aren't bucketed at this index's threshold; fall back to every contact
+                candidates = set(self._contacts) - {exclude}
+            matches = []
+            for other_id in candidates:
+                similarity = scorer.score(self._features[other_id], features)
+                if similarity is not None:
+                    matches.append((similarity, self._positions[other_id], self._contacts[other_id]))
+            self.checks += 1
+        matches.sort(key=lambda match: (-match[0], match[1]))
+        self.last_check_seconds = time.perf_counter() - started
+        return [{'contact': contact, 'similarity': similarity} for similarity, _, contact in matches]
+
+    def duplicates(self, threshold):
+        """All pairs at or above threshold, shaped and ordered like dedupe.scan() results.
+
+        Returns None when threshold is below min_threshold, since those
+        pairs are not tracked, or before the first snapshot is loaded.
+        """
+        if threshold < self.min_threshold or not self.loaded:
+            return None
+        with self._lock:
+            pairs = []
+            for contact_id, neighbours in self._neighbours.items():
+                position = self._positions[contact_id]
+                for other_id, similarity in neighbours.items():
+                    other_position = self._positions[other_id]
+                    if position < other_position and similarity >= threshold:
+                        pairs.append((similarity, position, other_position, contact_id, other_id))
+            pairs.sort(key=lambda pair: (-pair[0], pair[1], pair[2]))
+            return [
+                {'contact1': self._contacts[id1], 'contact2': self._contacts[id2], 'similarity': similarity}
+                for similarity, _, _, id1, id2 in pairs
+            ]
+
+    def stats(self):
+        return {
+            'contacts': len(self._contacts),
+            'keys': len(self._blocks),
+            'pairs': sum(len(neighbours) for neighbours in self._neighbours.values()) // 2,
+            'min_threshold': self.min_threshold,
+            'checks': self.checks,
+            'last_check_ms': round(self.last_check_seconds * 1000, 3) if self.last_check_seconds is not None else None
+        }
@@ -0,0 +1,161 @@
+import time
+import xml.etree.ElementTree as ET
+
+ATOM = '{http://www.w3.org/2005/Atom}'
+GD = '{http://schemas.google.com/g/2005}'
+OPENSEARCH = '{http://a9.com/-/spec/opensearch/1.1/}'
+BATCH = '{http://schemas.google.com/gdata/batch}'
+
+ENTRY = ATOM + 'entry'
+ID = ATOM + 'id'
+LINK = ATOM + 'link'
+CONTENT = ATOM + 'content'
+UPDATED = ATOM + 'updated'
+NAME = GD + 'name'
+GIVEN_NAME = GD + 'givenName'
+FAMILY_NAME = GD + 'familyName'
+FULL_NAME = GD + 'fullName'
+EMAIL = GD + 'email'
+PHONE_NUMBER = GD + 'phoneNumber'
+DELETED = GD + 'deleted'
+TOTAL_RESULTS = OPENSEARCH + 'totalResults'
+BATCH_ID = BATCH + 'id'
+BATCH_STATUS = BATCH + 'status'
+
+
+def contact_from_element(entry):
+    """Build a contact dict straight from a parsed <entry> element.
+
+    Produces exactly what GoogleWorkspaceContactsManager.parse_contact_xml()
+    returns for the same entry, without the serialize/reparse round-trip.
+    """
+    contact = {}
+
+    name_elem = entry.find(NAME)
+    if name_elem is not None:
+        contact['first_name'] = getattr(name_elem.find(GIVEN_NAME), 'text', '')
+        contact['last_name'] = getattr(name_elem.find(FAMILY_NAME), 'text', '')
+        contact['full_name'] = getattr(name_elem.find(FULL_NAME), 'text', '')
+
+    id_elem = entry.find(ID)
+    contact['id'] = id_elem.text if id_elem is not None else ''
+
+    for link in entry.iter(LINK):
+        if link.get('rel') == 'edit':
+            contact['edit_url'] = link.get('href', '')
+            break
+
+    contact['emails'] = [
+        {
+            'address': email_elem.get('address', ''),
+            'primary': email_elem.get('primary', 'false') == 'true',
+            'rel': email_elem.get('rel', '')
+        }
+        for email_elem in entry.iterfind(EMAIL)
+    ]
+
+    contact['phones'] = [
+        {
+            'number': phone_elem.text or '',
+            'primary': phone_elem.get('primary', 'false') == 'true',
+            'rel': phone_elem.get('rel', '')
+        }
+        for phone_elem in entry.iterfind(PHONE_NUMBER)
+    ]
+
+    content_elem = entry.find(CONTENT)
+    contact['notes'] = content_elem.text if content_elem is not None else ''
+
+    # Only present in showdeleted=true feeds
+    if entry.find(DELETED) is not None:
+        contact['deleted'] = True
+
+    return contact
+
+
+def parse_batch_feed(xml_data):
+    """Parse a batch response feed into {batch_id: (code, reason, contact)}.
+
+    contact is the returned entry for inserts and updates, otherwise None.
+    Entries the server never reached (after a batch:interrupted) are absent.
+    """
+    results = {}
+    for entry in ET.fromstring(xml_data).iter(ENTRY):
+        batch_id = entry.findtext(BATCH_ID)
+        status = entry.find(BATCH_STATUS)
+        if batch_id is None or status is None:
+            continue
+        contact = None
+        if any(link.get('rel') == 'edit' for link in entry.iter(LINK)):
+            contact = contact_from_element(entry)
+        results[batch_id] = (int(status.get('code', 0)), status.get('reason', ''), contact)
+    return results
+
+
+class FeedParser:
+    """Incremental parser for one page of a contacts feed.
+
+    Feed it bytes as they arrive; each call returns the contacts whose
+    <entry> closed in that chunk. Finished elements are detached from the
+    tree, so memory stays bounded by a single entry rather than the page.
+    Feed-level values (totalResults, updated) are captured on the way.
+    parse_seconds adds up the time spent parsing, apart from waiting for data.
+    """
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=('start', 'end'))
+        self._root = None
+        self._depth = 0
+        self.entry_count = 0
+        self.total_results = None
+        self.updated = None
+        self.parse_seconds = 0.0
+
+    def feed(self, data):
+        started = time.perf_counter()
+        self._parser.feed(data)
+        contacts = self._drain()
+        self.parse_seconds += time.perf_counter() - started
+        return contacts
+
+    def close(self):
+        started = time.perf_counter()
+        self._parser.close()
+        contacts = self._drain()
+        self.parse_seconds += time.perf_counter() - started
+        return contacts
+
+    def _drain(self):
+        contacts = []
+        for event, elem in self._parser.read_events():
+            if event == 'start':
+                if self._root is None:
+                    self._root = elem
+                self._depth += 1
+                continue
+
+            self._depth -= 1
+            if self._depth != 1:
+                continue
+
+            # A direct child of <feed> just closed
+            tag = elem.tag
+            if tag == ENTRY:
+                self.entry_count += 1
+                contacts.append(contact_from_element(elem))
+            elif tag == TOTAL_RESULTS:
+                self.total_results = int(elem.text)
+            elif tag == UPDATED:
+                self.updated = elem.text
+            self._root.remove(elem)
+        return contacts
+
+
+def parse_feed(chunks):
+    """Parse an iterable of byte chunks; return (contacts, parser)"""
+    parser = FeedParser()
+    contacts = []
+    for chunk in chunks:
+        contacts.extend(parser.feed(chunk))
+    contacts.extend(parser.close())
+    return contacts, parser
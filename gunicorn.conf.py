@@ -0,0 +1,15 @@
+"""gunicorn settings: gunicorn app:app (this file is picked up from the working directory)"""
+
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 4))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 120))
+
+
+def post_worker_init(worker):
+    # Runs in each worker once app.py is imported; with PREWARM=true the first
+    # token and contact snapshot load in the background instead of on the first request
+    from app import PREWARM, prewarm
+    if PREWARM:
+        prewarm()
@@ -0,0 +1,147 @@
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from http.cookiejar import DefaultCookiePolicy
+
+from observability import UPSTREAM_RESPONSES, UPSTREAM_RETRIES
+
+logger = logging.getLogger(__name__)
+
+# Upstream statuses worth retrying: quota exhaustion and transient server errors
+RETRY_STATUSES = frozenset([429, 500, 502, 503, 504])
+# Only these methods are retried after a 5xx or a dropped connection;
+# a POST that failed server-side may already have created the contact
+IDEMPOTENT_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'])
+
+
+class ContactsAPIError(Exception):
+    """Raised by internal helpers when a feed request fails"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_retry_after(value):
+    """Return the delay in seconds requested by a Retry-After header, or None"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(retry_at.timestamp() - time.time(), 0.0)
+
+
+def backoff_delay(attempt, base, cap, retry_after=None):
+    """Full-jitter exponential backoff, never shorter than Retry-After"""
+    delay = random.uniform(0, min(cap, base * (2 ** attempt)))
+    if retry_after is not None:
+        delay = max(delay, min(retry_after, cap))
+    return delay
+
+
+class _NoCookiesPolicy(DefaultCookiePolicy):
+    """The feed is token-authenticated; refusing cookies keeps the shared session stateless"""
+
+    def set_ok(self, cookie, request):
+        return False
+
+
+class FeedSession:
+    """Pooled keep-alive HTTP session for the Shared Contacts feed.
+
+    One instance is shared by every thread in the process: the connection
+    pool is thread-safe and the session itself is never mutated after
+    construction. Retries 429/5xx responses with jittered exponential
+    backoff that honours Retry-After.
+    """
+
+    def __init__(self, pool_size=10, max_retries=4, backoff_base=0.5, backoff_max=30.0,
+                 timeout=30, gzip=True):
+        # requests costs tens of milliseconds to import; pay for it when the first session is built
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.cookies.set_policy(_NoCookiesPolicy())
+        if gzip:
+            # Google only compresses GData responses when the user agent mentions gzip
+            self.session.headers['Accept-Encoding'] = 'gzip'
+            self.session.headers['User-Agent'] = f"{requests.utils.default_user_agent()} (gzip)"
+
+        # Failures retried (for idempotent methods) like 5xx responses
+        self._transport_errors = (requests.ConnectionError, requests.Timeout)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+
+    def request(self, method, url, max_retries=None, **kwargs):
+        """Send a request, retrying transient failures"""
+        method = method.upper()
+        if max_retries is None:
+            max_retries = self.max_retries
+        kwargs.setdefault('timeout', self.timeout)
+
+        attempt = 0
+        while True:
+            with self._lock:
+                self.requests += 1
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except self._transport_errors as e:
+                UPSTREAM_RESPONSES.inc(method=method, status='error')
+                if attempt >= max_retries or method not in IDEMPOTENT_METHODS:
+                    raise
+                reason = type(e).__name__
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max)
+            else:
+                status = response.status_code
+                UPSTREAM_RESPONSES.inc(method=method, status=status)
+                if (status not in RETRY_STATUSES or attempt >= max_retries
+                        or (status != 429 and method not in IDEMPOTENT_METHODS)):
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                delay = backoff_delay(attempt, self.backoff_base, self.backoff_max, retry_after)
+                reason = status
+                response.close()
+
+            attempt += 1
+            with self._lock:
+                self.retries += 1
+            UPSTREAM_RETRIES.inc(method=method, reason=reason)
+            logger.info('Retrying feed request', extra={
+                'event': 'upstream_retry', 'method': method, 'reason': reason,
+                'attempt': attempt, 'delay_seconds': round(delay, 3)
+            })
+            time.sleep(delay)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def put(self, url, **kwargs):
+        return self.request('PUT', url, **kwargs)
+
+    def delete(self, url, **kwargs):
+        return self.request('DELETE', url, **kwargs)
+
+    def stats(self):
+        """Return request/retry counters"""
+        return {'requests': self.requests, 'retries': self.retries}
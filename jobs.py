@@ -0,0 +1,239 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """State of one background job, updated by the job function as it runs"""
+
+    def __init__(self, kind, params=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params or {}
+        self.status = 'queued'
+        self.progress = {}
+        self.partial = []
+        self.result = None
+        self.error = None
+        self.cache_key = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # JobStore the job's state is written through to, if any
+        self.store = None
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.status in ('done', 'error')
+
+    def update(self, **progress):
+        """Merge counters into the job's progress"""
+        with self._lock:
+            self.progress.update(progress)
+            if self.store:
+                self.store.save(self)
+
+    def add_partial(self, items):
+        """Publish results found so far"""
+        with self._lock:
+            if self.store and items:
+                self.store.add_partial(self.id, len(self.partial), items)
+            self.partial.extend(items)
+
+    def set_status(self, status, **fields):
+        """Move the job to `status`, setting attributes such as result or error alongside"""
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.status = status
+            if self.store:
+                self.store.save(self)
+
+    def to_dict(self, since=0):
+        """Job state; results are the final result once done, else partial results from index `since`"""
+        with self._lock:
+            data = {
+                'id': self.id,
+                'kind': self.kind,
+                'params': self.params,
+                'status': self.status,
+                'progress': dict(self.progress),
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at
+            }
+            if self.status == 'done':
+                data['result'] = self.result
+            else:
+                data['partial'] = self.partial[since:]
+                data['partial_count'] = len(self.partial)
+        return data
+
+
+class JobStore:
+    """Job state in SQLite, so every worker process can report on a job that
+    another one runs (gunicorn sends each poll to whichever worker is free).
+
+    Running jobs write their status, progress and partial results here as
+    they change; finished jobs keep their result and drop the partial ones.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with self._connect() as conn, conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, data TEXT NOT NULL)")
+            conn.execute("CREATE TABLE IF NOT EXISTS partials (job_id TEXT NOT NULL, start INTEGER NOT NULL, "
+                         "items TEXT NOT NULL, PRIMARY KEY (job_id, start))")
+
+    def _connect(self):
+        # Workers write concurrently; wait for each other's transactions rather than fail
+        return closing(sqlite3.connect(self.db_path, timeout=30))
+
+    def save(self, job):
+        """Write the job's state; called with the job's lock held"""
+        data = {
+            'kind': job.kind,
+            'params': job.params,
+            'status': job.status,
+            'progress': job.progress,
+            'result': job.result,
+            'error': job.error,
+            'created_at': job.created_at,
+            'started_at': job.started_at,
+            'finished_at': job.finished_at
+        }
+        with self._connect() as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO jobs (id, data) VALUES (?, ?)", (job.id, json.dumps(data)))
+            if job.done:
+                conn.execute("DELETE FROM partials WHERE job_id = ?", (job.id,))
+
+    def add_partial(self, job_id, start, items):
+        """Append partial results, `start` being the index of the first one"""
+        with self._connect() as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO partials (job_id, start, items) VALUES (?, ?, ?)",
+                         (job_id, start, json.dumps(items)))
+
+    def load(self, job_id):
+        """Return a read-only Job with the stored state, or None"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT data FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            partials = conn.execute("SELECT items FROM partials WHERE job_id = ? ORDER BY start",
+                                    (job_id,)).fetchall()
+        data = json.loads(row[0])
+        job = Job(data.pop('kind'), data.pop('params'))
+        job.id = job_id
+        for name, value in data.items():
+            setattr(job, name, value)
+        for (items,) in partials:
+            job.partial.extend(json.loads(items))
+        return job
+
+    def delete(self, job_id):
+        with self._connect() as conn, conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+            conn.execute("DELETE FROM partials WHERE job_id = ?", (job_id,))
+
+
+class JobManager:
+    """Runs jobs on an in-process thread pool and remembers recent ones.
+
+    Jobs submitted with a cache_key reuse an earlier queued, running or
+    finished job with the same key instead of doing the work again. With
+    `db_path` job state is also kept in a JobStore, so get() finds jobs run
+    by other worker processes sharing the file.
+    """
+
+    def __init__(self, max_workers=2, history=50, db_path=None):
+        self.history = history
+        self.store = JobStore(db_path) if db_path else None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._by_key = {}
+
+    def submit(self, kind, fn, params=None, cache_key=None):
+        """Run fn(job) in the background; return the Job"""
+        with self._lock:
+            if cache_key is not None:
+                existing = self._find(cache_key)
+                if existing:
+                    return existing
+            job = Job(kind, params)
+            job.store = self.store
+            self._jobs[job.id] = job
+            self._remember(job, cache_key)
+            self._evict()
+        if self.store:
+            with job._lock:
+                self.store.save(job)
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def find(self, cache_key, include_failed=False):
+        """Return a job stored under cache_key unless it failed"""
+        with self._lock:
+            return self._find(cache_key, include_failed)
+
+    def _find(self, cache_key, include_failed=False):
+        job = self._jobs.get(self._by_key.get(cache_key))
+        if job and (include_failed or job.status != 'error'):
+            return job
+        return None
+
+    def remember(self, job, cache_key):
+        """Store job under cache_key, e.g. once its real key is known"""
+        with self._lock:
+            self._remember(job, cache_key)
+
+    def _remember(self, job, cache_key):
+        if cache_key is not None:
+            job.cache_key = cache_key
+            self._by_key[cache_key] = job.id
+
+    def get(self, job_id):
+        """Return the job, from this process or else from the shared store"""
+        job = self._jobs.get(job_id)
+        if job is None and self.store:
+            job = self.store.load(job_id)
+        return job
+
+    def _evict(self):
+        while len(self._jobs) > self.history:
+            oldest = next((j for j in self._jobs.values() if j.done), None)
+            if oldest is None:
+                break
+            del self._jobs[oldest.id]
+            if self._by_key.get(oldest.cache_key) == oldest.id:
+                del self._by_key[oldest.cache_key]
+            if self.store:
+                self.store.delete(oldest.id)
+
+    def _run(self, job, fn):
+        job.set_status('running', started_at=time.time())
+        try:
+            result = fn(job)
+        except Exception as e:
+            logger.exception('Job failed', extra={'event': 'job_failed', 'job': job.id, 'kind': job.kind})
+            job.set_status('error', error=str(e), finished_at=time.time())
+        else:
+            job.set_status('done', result=result, finished_at=time.time())
+
+    def stats(self):
+        jobs = list(self._jobs.values())
+        return {
+            'jobs': len(jobs),
+            'running': sum(1 for j in jobs if j.status == 'running'),
+            'queued': sum(1 for j in jobs if j.status == 'queued')
+        }
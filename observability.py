@@ -0,0 +1,240 @@
+"""Process-wide metrics in the Prometheus text format, and structured logging.
+
+Metrics are registered once at import time below and updated from the hot
+paths (feed requests, page parsing, token refreshes, writes, duplicate
+scans); render() produces the /metrics exposition. No client library is
+needed for the handful of counters and histograms the app keeps.
+"""
+
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; spans a cached token lookup up to a full-directory duplicate scan
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names, values, extra=''):
+    pairs = [f'{name}="{_escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def _samples(self):
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts, sum, count]
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of the with-block, in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def _samples(self):
+        lines = []
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+UPSTREAM_RESPONSES = REGISTRY.counter(
+    'contacts_upstream_responses_total', 'Feed HTTP responses by method and status code '
+    '(status "error" for connection failures and timeouts)', ['method', 'status'])
+UPSTREAM_RETRIES = REGISTRY.counter(
+    'contacts_upstream_retries_total', 'Feed requests retried, by method and the status that caused it',
+    ['method', 'reason'])
+PAGE_FETCH_SECONDS = REGISTRY.histogram(
+    'contacts_feed_page_fetch_seconds', 'One feed page from request to last contact parsed', ['parser'])
+PARSE_SECONDS = REGISTRY.histogram(
+    'contacts_feed_parse_seconds', 'Time spent parsing the XML of one feed page', ['parser'])
+FEED_PAGES_NOT_MODIFIED = REGISTRY.counter(
+    'contacts_feed_pages_not_modified_total', 'Feed pages answered 304 and served from the page ETag cache')
+TOKEN_REFRESH_SECONDS = REGISTRY.histogram(
+    'contacts_token_refresh_seconds', 'Access token refreshes against the OAuth endpoint', ['outcome'])
+WRITE_SECONDS = REGISTRY.histogram(
+    'contacts_write_seconds', 'Feed writes by verb (create, update, delete, batch)', ['verb', 'outcome'])
+SYNC_SECONDS = REGISTRY.histogram(
+    'contacts_sync_seconds', 'Snapshot syncs against the feed', ['kind', 'outcome'])
+DUPLICATE_SCAN_SECONDS = REGISTRY.histogram(
+    'contacts_duplicate_scan_seconds', 'Duplicate scans by stage (candidates, scoring, total)', ['method', 'stage'])
+DUPLICATE_PAIRS_SCORED = REGISTRY.counter(
+    'contacts_duplicate_pairs_scored_total', 'Contact pairs scored by duplicate scans', ['method'])
+DUPLICATE_PAIRS_PER_SECOND = REGISTRY.gauge(
+    'contacts_duplicate_scan_pairs_per_second', 'Scoring throughput of the most recent duplicate scan', ['method'])
+REQUEST_SECONDS = REGISTRY.histogram(
+    'contacts_http_request_seconds', 'API requests served, by endpoint, method and status', ['endpoint', 'method', 'status'])
+DUPLICATES_REQUEST_SECONDS = REGISTRY.histogram(
+    'contacts_duplicates_request_seconds', 'GET /api/duplicates by stage (sync, find, render)', ['stage'])
+
+
+def observe_scan(report):
+    """Record a dedupe.scan() report"""
+    method = report['method']
+    DUPLICATE_SCAN_SECONDS.observe(report['candidate_seconds'], method=method, stage='candidates')
+    DUPLICATE_SCAN_SECONDS.observe(report['scoring_seconds'], method=method, stage='scoring')
+    DUPLICATE_SCAN_SECONDS.observe(report['seconds'], method=method, stage='total')
+    DUPLICATE_PAIRS_SCORED.inc(report['pairs_compared'], method=method)
+    if report['scoring_seconds'] > 0:
+        DUPLICATE_PAIRS_PER_SECOND.set(round(report['pairs_compared'] / report['scoring_seconds'], 1), method=method)
+
+
+# LogRecord attributes that aren't caller-supplied fields
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, plus any `extra` fields"""
+
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record, '%Y-%m-%dT%H:%M:%S') + f".{int(record.msecs):03d}",
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage()
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level='INFO', fmt='json'):
+    """Send the root logger to stderr as JSON lines (fmt='json') or plain text"""
+    handler = logging.StreamHandler()
+    if fmt == 'json':
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(name)s: %(message)s'))
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(level.upper() if isinstance(level, str) else level)
@@ -0,0 +1,86 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """Thread-safe token bucket whose rate adapts to upstream throttling.
+
+    acquire() blocks until a token is available. Callers report quota
+    pushback with throttle(), which halves the rate (down to min_rate), and
+    successful requests with recover(), which adds back a fraction of the
+    configured rate, so the limiter settles just under the real quota.
+    """
+
+    def __init__(self, rate, burst=None, min_rate=None, increase=None, decrease=0.5):
+        self.max_rate = float(rate)
+        self.rate = self.max_rate
+        self.burst = float(burst or max(1.0, self.max_rate))
+        self.min_rate = min_rate or self.max_rate / 16
+        self.increase = increase or self.max_rate / 10
+        self.decrease = decrease
+
+        self._lock = threading.Lock()
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self.acquired = 0
+        self.throttles = 0
+        self.wait_seconds = 0.0
+
+    def _take(self, tokens):
+        """Take `tokens` if available and return 0.0, or return the seconds until they will be"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                self.acquired += 1
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def _waited(self, seconds):
+        with self._lock:
+            self.wait_seconds += seconds
+
+    def acquire(self, tokens=1):
+        """Take `tokens`, sleeping until they are available; returns seconds waited"""
+        waited = 0.0
+        while True:
+            delay = self._take(tokens)
+            if not delay:
+                self._waited(waited)
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    async def acquire_async(self, tokens=1):
+        """acquire() for event-loop callers: waits with asyncio.sleep instead of blocking the loop"""
+        import asyncio
+        waited = 0.0
+        while True:
+            delay = self._take(tokens)
+            if not delay:
+                self._waited(waited)
+                return waited
+            await asyncio.sleep(delay)
+            waited += delay
+
+    def throttle(self):
+        """Upstream pushed back (429/503): cut the rate multiplicatively"""
+        with self._lock:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self.throttles += 1
+
+    def recover(self):
+        """A request went through: raise the rate additively, up to the configured rate"""
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def stats(self):
+        return {
+            'rate': round(self.rate, 2),
+            'max_rate': self.max_rate,
+            'acquired': self.acquired,
+            'throttles': self.throttles,
+            'wait_seconds': round(self.wait_seconds, 3)
+        }
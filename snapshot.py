@@ -0,0 +1,429 @@
+"""Compact columnar snapshot of the contact set, on disk and in memory.
+
+A snapshot file holds one zlib-compressed column per contact field plus a
+small JSON header saying where each column sits. The file is memory-mapped
+and a column is only decompressed the first time it is read, so tools that
+need a few fields never inflate the rest.
+
+Loaded contacts are ContactRecord objects: __slots__ instead of a dict per
+contact, emails and phones as slotted records too, and every rel URL and
+name interned, so 100k contacts take a fraction of the memory of the parsed
+dicts. Records answer get()/[] like the dicts parse_contact_xml() returns,
+which is all dedupe needs, and to_dict() gives back the original dict.
+
+    python -m snapshot dump contacts.snap      # crawl the live feed
+    python -m snapshot info contacts.snap
+    python -m snapshot load contacts.snap --dedupe --threshold 0.8
+"""
+
+import argparse
+import gc
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+
+MAGIC = b'CSNAP1\n'
+HEADER_LENGTH = struct.Struct('<I')
+COMPRESSION_LEVEL = 6
+
+# Field values can't contain C0 controls (XML 1.0 forbids them), so these
+# mark the cases a plain string can't express
+SEPARATOR = '\x00'
+NONE_MARKER = '\x01'
+ABSENT_MARKER = '\x02'
+
+
+class _Absent:
+    """Marks a key the parsed contact didn't have; pickles as the module singleton"""
+
+    __slots__ = ()
+
+    def __reduce__(self):
+        return '_ABSENT'
+
+    def __repr__(self):
+        return '<absent>'
+
+
+_ABSENT = _Absent()
+
+TEXT_FIELDS = ('first_name', 'last_name', 'full_name', 'id', 'edit_url', 'notes')
+# Columns with few distinct values, interned on load so repeats share one string
+INTERNED_COLUMNS = frozenset(('first_name', 'last_name'))
+# Key order of a parsed contact, so to_dict() round-trips exactly
+CONTACT_KEYS = ('first_name', 'last_name', 'full_name', 'id', 'edit_url', 'emails', 'phones', 'notes', 'deleted')
+
+
+class _Record:
+    """Read-only mapping interface over __slots__, for code written against contact dicts"""
+
+    __slots__ = ()
+    _keys = ()
+
+    def get(self, key, default=None):
+        value = getattr(self, key, _ABSENT) if key in self._keys else _ABSENT
+        return default if value is _ABSENT else value
+
+    def __getitem__(self, key):
+        value = self.get(key, _ABSENT)
+        if value is _ABSENT:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key):
+        return self.get(key, _ABSENT) is not _ABSENT
+
+    def keys(self):
+        return [key for key in self._keys if key in self]
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def __eq__(self, other):
+        if isinstance(other, _Record):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    __hash__ = None
+
+
+class EmailRecord(_Record):
+    __slots__ = ('address', 'primary', 'rel')
+    _keys = __slots__
+
+    def __init__(self, address, primary, rel):
+        self.address = address
+        self.primary = primary
+        self.rel = rel
+
+    def to_dict(self):
+        return {'address': self.address, 'primary': self.primary, 'rel': self.rel}
+
+
+class PhoneRecord(_Record):
+    __slots__ = ('number', 'primary', 'rel')
+    _keys = __slots__
+
+    def __init__(self, number, primary, rel):
+        self.number = number
+        self.primary = primary
+        self.rel = rel
+
+    def to_dict(self):
+        return {'number': self.number, 'primary': self.primary, 'rel': self.rel}
+
+
+class ContactRecord(_Record):
+    """One contact; absent fields (e.g. edit_url on an entry without one) stay absent"""
+
+    __slots__ = CONTACT_KEYS
+    _keys = CONTACT_KEYS
+
+    def __init__(self, first_name=_ABSENT, last_name=_ABSENT, full_name=_ABSENT, id=_ABSENT, edit_url=_ABSENT,
+                 emails=_ABSENT, phones=_ABSENT, notes=_ABSENT, deleted=_ABSENT):
+        self.first_name = first_name
+        self.last_name = last_name
+        self.full_name = full_name
+        self.id = id
+        self.edit_url = edit_url
+        self.emails = emails
+        self.phones = phones
+        self.notes = notes
+        self.deleted = deleted
+
+    def to_dict(self):
+        contact = {}
+        for key in CONTACT_KEYS:
+            value = getattr(self, key)
+            if value is _ABSENT:
+                continue
+            if key in ('emails', 'phones'):
+                value = [item.to_dict() for item in value]
+            contact[key] = value
+        return contact
+
+    def __repr__(self):
+        return f"ContactRecord({self.get('id')!r}, {self.get('full_name')!r})"
+
+
+def _encode_text(values):
+    parts = []
+    for value in values:
+        if value is _ABSENT:
+            parts.append(ABSENT_MARKER)
+        elif value is None:
+            parts.append(NONE_MARKER)
+        else:
+            if any(c in value for c in (SEPARATOR, NONE_MARKER, ABSENT_MARKER)):
+                raise ValueError(f"Field value contains a control character: {value!r}")
+            parts.append(value)
+    return SEPARATOR.join(parts).encode('utf-8')
+
+
+def _decode_text(data, count, intern=False):
+    if not count:
+        return []
+    values = data.decode('utf-8').split(SEPARATOR)
+    if intern:
+        values = list(map(sys.intern, values))
+    if NONE_MARKER in values or ABSENT_MARKER in values:
+        values = [_ABSENT if value == ABSENT_MARKER else None if value == NONE_MARKER else value for value in values]
+    return values
+
+
+def write_snapshot(path, contacts, meta=None):
+    """Write contacts (dicts or ContactRecords) to `path` atomically; returns the header"""
+    contacts = list(contacts)
+    rels = []
+    rel_index = {}
+
+    def rel_id(rel):
+        if rel not in rel_index:
+            rel_index[rel] = len(rels)
+            rels.append(rel)
+        return rel_index[rel]
+
+    columns = {}
+    for field in TEXT_FIELDS:
+        columns[field] = ('text', _encode_text(contact.get(field, _ABSENT) for contact in contacts))
+    columns['deleted'] = ('flags', bytes(1 if contact.get('deleted') else 0 for contact in contacts))
+
+    for kind, value_key in (('emails', 'address'), ('phones', 'number')):
+        counts = array('I')
+        values, primaries, rel_ids = [], bytearray(), array('H')
+        for contact in contacts:
+            items = contact.get(kind, _ABSENT)
+            if items is _ABSENT:
+                # A count one past any real count marks the list as absent
+                counts.append(0xFFFFFFFF)
+                continue
+            counts.append(len(items))
+            for item in items:
+                values.append(item.get(value_key, ''))
+                primaries.append(1 if item.get('primary') else 0)
+                rel_ids.append(rel_id(item.get('rel', '')))
+        columns[f"{kind}.count"] = ('uint32', counts.tobytes())
+        columns[f"{kind}.{value_key}"] = ('text', _encode_text(values))
+        columns[f"{kind}.primary"] = ('flags', bytes(primaries))
+        columns[f"{kind}.rel"] = ('uint16', rel_ids.tobytes())
+
+    blocks = []
+    layout = {}
+    offset = 0
+    for name, (kind, raw) in columns.items():
+        block = zlib.compress(raw, COMPRESSION_LEVEL)
+        layout[name] = {'kind': kind, 'offset': offset, 'length': len(block), 'raw_length': len(raw)}
+        blocks.append(block)
+        offset += len(block)
+
+    header = dict(meta or {}, count=len(contacts), created=time.time(), rels=rels, columns=layout)
+    header_bytes = json.dumps(header).encode('utf-8')
+    temp_path = path + '.tmp'
+    with open(temp_path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(HEADER_LENGTH.pack(len(header_bytes)))
+        f.write(header_bytes)
+        for block in blocks:
+            f.write(block)
+    os.replace(temp_path, path)
+    return header
+
+
+class Snapshot:
+    """A snapshot file, memory-mapped; columns are inflated on first use
+
+        with Snapshot(path) as snapshot:
+            for contact in snapshot:
+                ...
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file; let the magic check below report it
+            self._map = b''
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"Not a contact snapshot: {path}")
+        start = len(MAGIC)
+        (header_length,) = HEADER_LENGTH.unpack_from(self._map, start)
+        start += HEADER_LENGTH.size
+        self.header = json.loads(bytes(self._map[start:start + header_length]))
+        self._data_start = start + header_length
+        self._columns = {}
+        self._records = None
+        self.rels = [sys.intern(rel) for rel in self.header['rels']]
+
+    def __len__(self):
+        return self.header['count']
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def column(self, name):
+        """Decoded values of one column, inflated and cached on first use"""
+        values = self._columns.get(name)
+        if values is None:
+            spec = self.header['columns'][name]
+            start = self._data_start + spec['offset']
+            raw = zlib.decompress(self._map[start:start + spec['length']])
+            if spec['kind'] == 'text':
+                count = len(self) if '.' not in name else len(self._flat_rels(name.split('.')[0]))
+                values = _decode_text(raw, count, name in INTERNED_COLUMNS)
+            elif spec['kind'] == 'flags':
+                values = raw
+            else:
+                values = array('I' if spec['kind'] == 'uint32' else 'H')
+                values.frombytes(raw)
+            self._columns[name] = values
+        return values
+
+    def _flat_rels(self, kind):
+        return self.column(f"{kind}.rel")
+
+    def _items(self, kind, value_key, record_type):
+        """Per-contact lists of EmailRecord/PhoneRecord, or _ABSENT"""
+        counts = self.column(f"{kind}.count")
+        rel_ids = self._flat_rels(kind)
+        flat = list(map(record_type, self.column(f"{kind}.{value_key}"),
+                        map(bool, self.column(f"{kind}.primary")), map(self.rels.__getitem__, rel_ids)))
+        per_contact = []
+        position = 0
+        for count in counts:
+            if count == 0xFFFFFFFF:
+                per_contact.append(_ABSENT)
+            else:
+                per_contact.append(flat[position:position + count])
+                position += count
+        return per_contact
+
+    def records(self):
+        """Every contact as a ContactRecord, in the order they were written; built once"""
+        if self._records is None:
+            # Hundreds of thousands of small acyclic objects: collector passes
+            # while building them are pure overhead
+            collecting = gc.isenabled()
+            gc.disable()
+            try:
+                deleted = [True if flag else _ABSENT for flag in self.column('deleted')]
+                self._records = list(map(
+                    ContactRecord,
+                    self.column('first_name'), self.column('last_name'), self.column('full_name'),
+                    self.column('id'), self.column('edit_url'),
+                    self._items('emails', 'address', EmailRecord), self._items('phones', 'number', PhoneRecord),
+                    self.column('notes'), deleted
+                ))
+            finally:
+                if collecting:
+                    gc.enable()
+        return self._records
+
+    def __iter__(self):
+        return iter(self.records())
+
+    def contacts(self):
+        """Every contact as a plain dict, as parse_contact_xml() returns them"""
+        return [record.to_dict() for record in self.records()]
+
+    def stats(self):
+        columns = self.header['columns']
+        return {
+            'contacts': len(self),
+            'file_bytes': os.path.getsize(self.path),
+            'raw_bytes': sum(spec['raw_length'] for spec in columns.values()),
+            'compressed_bytes': sum(spec['length'] for spec in columns.values()),
+            'columns_loaded': sorted(self._columns),
+            'rels': len(self.rels)
+        }
+
+
+async def _crawl(args):
+    from async_client import AsyncContactsClient, load_credentials
+    async with AsyncContactsClient(args.domain, load_credentials(args), feed_url=args.feed_url,
+                                   concurrency=args.concurrency) as client:
+        contacts = []
+        async for page in client.iter_pages():
+            contacts.extend(page)
+        return contacts
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dump the contact feed to a snapshot file, or inspect and dedupe one')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    dump = commands.add_parser('dump', help='crawl the live feed into a snapshot file')
+    dump.add_argument('path')
+    dump.add_argument('--domain', default=os.getenv('WORKSPACE_DOMAIN', 'example.com'))
+    dump.add_argument('--feed-url', default=os.getenv('FEED_URL', 'https://www.google.com/m8/feeds'))
+    dump.add_argument('--credentials', default=os.getenv('SERVICE_ACCOUNT_FILE', 'credentials.json'))
+    dump.add_argument('--access-token', default=os.getenv('ACCESS_TOKEN'))
+    dump.add_argument('--concurrency', type=int, default=int(os.getenv('FEED_CONCURRENCY', 4)))
+
+    info = commands.add_parser('info', help='print the header and column sizes')
+    info.add_argument('path')
+
+    load = commands.add_parser('load', help='load a snapshot, optionally finding duplicates offline')
+    load.add_argument('path')
+    load.add_argument('--ndjson', action='store_true', help='print every contact, one JSON object per line')
+    load.add_argument('--dedupe', action='store_true', help='run duplicate detection on the snapshot')
+    load.add_argument('--threshold', type=float, default=0.8)
+    load.add_argument('--method', default='blocked', choices=['blocked', 'pairwise'])
+    load.add_argument('--workers', type=int, default=1)
+    args = parser.parse_args()
+
+    if args.command == 'dump':
+        import asyncio
+        started = time.perf_counter()
+        contacts = asyncio.run(_crawl(args))
+        crawled = time.perf_counter()
+        header = write_snapshot(args.path, contacts, {'domain': args.domain, 'feed_url': args.feed_url})
+        print(json.dumps({
+            'contacts': header['count'], 'bytes': os.path.getsize(args.path),
+            'crawl_seconds': round(crawled - started, 3), 'write_seconds': round(time.perf_counter() - crawled, 3)
+        }))
+        return
+
+    with Snapshot(args.path) as snapshot:
+        if args.command == 'info':
+            header = dict(snapshot.header, rels=len(snapshot.rels))
+            print(json.dumps(header, indent=2))
+            return
+
+        started = time.perf_counter()
+        records = snapshot.records()
+        loaded = time.perf_counter()
+        if args.ndjson:
+            for record in records:
+                sys.stdout.write(json.dumps(record.to_dict()) + '\n')
+            return
+        summary = {'contacts': len(records), 'load_seconds': round(loaded - started, 3)}
+        if args.dedupe:
+            import dedupe
+            duplicates, report = dedupe.scan(records, args.threshold, args.method, args.workers)
+            summary['duplicates'] = [
+                {'contact1': pair['contact1'].get('id'), 'contact2': pair['contact2'].get('id'),
+                 'similarity': pair['similarity']}
+                for pair in duplicates
+            ]
+            summary['report'] = report
+        print(json.dumps(summary, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,11 +1,19 @@
 // Global state
 let contacts = [];
+let contactsCursor = null;
+let contactsRequestId = 0;
+let totalContacts = 0;
 let duplicates = [];
 let currentEditContact = null;
 let csvData = [];
+let importFile = null;
 
 // API base URL
 const API_BASE = '/api';
+// Contacts fetched per page from the search endpoint
+const CONTACTS_PAGE_SIZE = 50;
+// Bytes of a CSV file read in the browser for the import preview
+const CSV_PREVIEW_BYTES = 64 * 1024;
 
 // DOM ready initialization
 document.addEventListener('DOMContentLoaded', function() {
@@ -101,7 +109,7 @@ function initializeSimilarityThreshold() {
 }
 
 // API Functions
-async function apiCall(endpoint, options = {}) {
+async function apiCall(endpoint, options = {}, showSpinner = true) {
     const url = API_BASE + endpoint;
     const defaultOptions = {
         headers: {
@@ -112,10 +120,10 @@ async function apiCall(endpoint, options = {}) {
     const config = { ...defaultOptions, ...options };
     
     try {
-        showLoading();
+        if (showSpinner) showLoading();
         const response = await fetch(url, config);
         const data = await response.json();
-        hideLoading();
+        if (showSpinner) hideLoading();
         
         if (!response.ok) {
             throw new Error(data.error || 'API request failed');
@@ -123,20 +131,53 @@ async function apiCall(endpoint, options = {}) {
         
         return data;
     } catch (error) {
-        hideLoading();
+        if (showSpinner) hideLoading();
         showNotification('Error: ' + error.message, 'error');
         throw error;
     }
 }
 
-async function loadContacts() {
+async function loadContacts(refresh = false) {
+    // Start over from the first page of the current search
+    contacts = [];
+    contactsCursor = null;
+    await loadContactPage(refresh);
+}
+
+async function loadMoreContacts() {
+    await loadContactPage(false);
+}
+
+async function loadContactPage(refresh = false) {
+    const query = document.getElementById('contact-search').value.trim();
+    const params = new URLSearchParams({ limit: CONTACTS_PAGE_SIZE });
+    if (query) params.set('q', query);
+    if (contactsCursor) params.set('cursor', contactsCursor);
+    if (refresh) params.set('refresh', 'true');
+    
+    const requestId = ++contactsRequestId;
     try {
-        const result = await apiCall('/contacts');
-        if (result.contacts) {
-            contacts = result.contacts;
+        const firstPage = contacts.length === 0;
+        const result = await apiCall(`/contacts/search?${params}`, {}, firstPage);
+        // A newer search was started while this one was in flight
+        if (requestId !== contactsRequestId) return;
+        if (result.error) {
+            throw new Error(result.error);
+        }
+        
+        contacts = contacts.concat(result.contacts);
+        if (firstPage) {
             renderContacts(contacts);
-            updateStats();
+        } else {
+            appendContacts(result.contacts);
+        }
+        contactsCursor = result.next_cursor;
+        if (!query) {
+            totalContacts = result.total;
         }
+        document.getElementById('load-more').classList.toggle('hidden', !contactsCursor);
+        document.getElementById('load-more-count').textContent = `${contacts.length} of ${result.total}`;
+        updateStats();
     } catch (error) {
         console.error('Failed to load contacts:', error);
     }
@@ -167,7 +208,12 @@ async function handleAddContact(event) {
         });
         
         if (result.success) {
-            showNotification('Contact created successfully!', 'success');
+            if (result.duplicates && result.duplicates.length) {
+                const match = result.duplicates[0].contact;
+                showNotification(`Contact created, but it looks like a duplicate of ${match.full_name || match.emails?.[0]?.address || 'an existing contact'}`, 'warning');
+            } else {
+                showNotification('Contact created successfully!', 'success');
+            }
             event.target.reset();
             loadContacts(); // Refresh the contacts list
             
@@ -245,17 +291,56 @@ async function findDuplicates() {
     const threshold = document.getElementById('similarity-threshold').value;
     
     try {
-        const result = await apiCall(`/duplicates?threshold=${threshold}`);
-        if (result.duplicates) {
-            duplicates = result.duplicates;
-            renderDuplicates(duplicates);
-            updateStats();
+        let { job } = await apiCall('/duplicates/jobs', {
+            method: 'POST',
+            body: JSON.stringify({ threshold: parseFloat(threshold) })
+        });
+        let found = [];
+        
+        // Poll the background scan, rendering matches as shards finish
+        while (job.status === 'queued' || job.status === 'running') {
+            if (job.partial && job.partial.length > 0) {
+                found = found.concat(job.partial);
+                duplicates = [...found].sort((a, b) => b.similarity - a.similarity);
+                renderDuplicates(duplicates);
+                updateStats();
+            }
+            showScanProgress(job);
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            ({ job } = await apiCall(`/duplicates/jobs/${job.id}?since=${found.length}`, {}, false));
         }
+        
+        showScanProgress(null);
+        if (job.status === 'error') {
+            showNotification('Error: ' + job.error, 'error');
+            return;
+        }
+        duplicates = job.result.duplicates;
+        renderDuplicates(duplicates);
+        updateStats();
     } catch (error) {
+        showScanProgress(null);
         console.error('Failed to find duplicates:', error);
     }
 }
 
+function showScanProgress(job) {
+    const element = document.getElementById('scan-progress');
+    if (!job) {
+        element.classList.add('hidden');
+        return;
+    }
+    const progress = job.progress || {};
+    let text = 'Waiting to start...';
+    if (progress.contacts !== undefined) {
+        text = `Scanning ${progress.contacts} contacts: ${progress.pairs_scored || 0} pairs scored, ${progress.matches || 0} matches so far`;
+    } else if (progress.pages_fetched !== undefined) {
+        text = `Fetching contacts: ${progress.pages_fetched} pages, ${progress.contacts_fetched} contacts`;
+    }
+    element.textContent = text;
+    element.classList.remove('hidden');
+}
+
 function loadDuplicatesIfNeeded() {
     if (duplicates.length === 0) {
         findDuplicates();
@@ -300,7 +385,16 @@ function renderContacts(contactsToRender) {
         return;
     }
     
-    container.innerHTML = contactsToRender.map(contact => `
+    container.innerHTML = contactsToRender.map(contactCardHtml).join('');
+}
+
+function appendContacts(batch) {
+    const container = document.getElementById('contacts-grid');
+    container.insertAdjacentHTML('beforeend', batch.map(contactCardHtml).join(''));
+}
+
+function contactCardHtml(contact) {
+    return `
         <div class="contact-card">
             <div class="contact-header">
                 <div>
@@ -336,7 +430,7 @@ function renderContacts(contactsToRender) {
                 ` : ''}
             </div>
         </div>
-    `).join('');
+    `;
 }
 
 function renderDuplicates(duplicatesToRender) {
@@ -396,26 +490,7 @@ function renderDuplicates(duplicatesToRender) {
 
 // Search and Filter
 function filterContacts() {
-    const searchTerm = document.getElementById('contact-search').value.toLowerCase();
-    
-    if (!searchTerm) {
-        renderContacts(contacts);
-        return;
-    }
-    
-    const filteredContacts = contacts.filter(contact => {
-        const name = (contact.full_name || '').toLowerCase();
-        const email = contact.emails?.[0]?.address?.toLowerCase() || '';
-        const phone = contact.phones?.[0]?.number || '';
-        const notes = (contact.notes || '').toLowerCase();
-        
-        return name.includes(searchTerm) ||
-               email.includes(searchTerm) ||
-               phone.includes(searchTerm) ||
-               notes.includes(searchTerm);
-    });
-    
-    renderContacts(filteredContacts);
+    loadContacts();
 }
 
 // Bulk Import Functions
@@ -447,51 +522,81 @@ function handleFile(file) {
         return;
     }
     
+    // Only the start of the file is read for the preview; the server parses the rest
     const reader = new FileReader();
     reader.onload = function(e) {
-        const csvText = e.target.result;
-        parseCSV(csvText);
+        if (parseCSVPreview(e.target.result)) {
+            importFile = file;
+            showImportPreview();
+        }
     };
-    reader.readAsText(file);
+    reader.readAsText(file.slice(0, CSV_PREVIEW_BYTES));
+}
+
+function parseCSVRows(text) {
+    // Quote-aware: handles "a, b", doubled quotes and line breaks inside quotes
+    const rows = [];
+    let row = [];
+    let field = '';
+    let quoted = false;
+    for (let i = 0; i < text.length; i++) {
+        const char = text[i];
+        if (quoted) {
+            if (char === '"' && text[i + 1] === '"') {
+                field += '"';
+                i++;
+            } else if (char === '"') {
+                quoted = false;
+            } else {
+                field += char;
+            }
+        } else if (char === '"') {
+            quoted = true;
+        } else if (char === ',') {
+            row.push(field);
+            field = '';
+        } else if (char === '\n' || char === '\r') {
+            if (char === '\r' && text[i + 1] === '\n') i++;
+            row.push(field);
+            rows.push(row);
+            row = [];
+            field = '';
+        } else {
+            field += char;
+        }
+    }
+    if (field || row.length > 0) {
+        row.push(field);
+        rows.push(row);
+    }
+    return rows.filter(values => values.some(value => value.trim()));
 }
 
-function parseCSV(csvText) {
-    const lines = csvText.split('\n').filter(line => line.trim());
+function parseCSVPreview(csvText) {
+    const rows = parseCSVRows(csvText.replace(/^\ufeff/, ''));
     
-    if (lines.length < 2) {
+    if (rows.length < 2) {
         showNotification('CSV file must have at least a header row and one data row', 'error');
-        return;
+        return false;
     }
     
-    const headers = lines[0].split(',').map(h => h.trim().toLowerCase());
+    const headers = rows[0].map(h => h.trim().toLowerCase());
     const requiredHeaders = ['first_name', 'last_name', 'email'];
     
     const missingHeaders = requiredHeaders.filter(req => !headers.includes(req));
     if (missingHeaders.length > 0) {
         showNotification(`Missing required columns: ${missingHeaders.join(', ')}`, 'error');
-        return;
+        return false;
     }
     
-    csvData = [];
-    for (let i = 1; i < lines.length; i++) {
-        const values = lines[i].split(',').map(v => v.trim().replace(/"/g, ''));
+    csvData = rows.slice(1, 11).map(values => {
         const record = {};
-        
         headers.forEach((header, index) => {
-            record[header] = values[index] || '';
+            record[header] = (values[index] || '').trim();
         });
-        
-        if (record.first_name || record.last_name || record.email) {
-            csvData.push(record);
-        }
-    }
-    
-    if (csvData.length === 0) {
-        showNotification('No valid contact data found in CSV', 'error');
-        return;
-    }
-    
-    showImportPreview();
+        return record;
+    });
+    return true;
 }
 
 function showImportPreview() {
@@ -508,7 +613,7 @@ function showImportPreview() {
             </tr>
         </thead>
         <tbody>
-            ${csvData.slice(0, 10).map(record => `
+            ${csvData.map(record => `
                 <tr>
                     ${headers.map(header => `<td>${record[header] || ''}</td>`).join('')}
                 </tr>
@@ -516,16 +621,14 @@ function showImportPreview() {
         </tbody>
     `;
     
-    if (csvData.length > 10) {
-        const tbody = table.querySelector('tbody');
-        tbody.innerHTML += `
-            <tr>
-                <td colspan="${headers.length}" style="text-align: center; font-style: italic; color: #666;">
-                    ... and ${csvData.length - 10} more rows
-                </td>
-            </tr>
-        `;
-    }
+    const tbody = table.querySelector('tbody');
+    tbody.innerHTML += `
+        <tr>
+            <td colspan="${headers.length}" style="text-align: center; font-style: italic; color: #666;">
+                First ${csvData.length} rows of ${importFile.name} (${Math.ceil(importFile.size / 1024)} KB)
+            </td>
+        </tr>
+    `;
 }
 
 function cancelImport() {
@@ -533,51 +636,78 @@ function cancelImport() {
     document.getElementById('import-preview').style.display = 'none';
     document.getElementById('csv-file').value = '';
     csvData = [];
+    importFile = null;
 }
 
 async function importContacts() {
-    if (csvData.length === 0) {
+    if (!importFile) {
         showNotification('No data to import', 'error');
         return;
     }
     
-    let successCount = 0;
-    let errorCount = 0;
-    
-    for (const record of csvData) {
-        try {
-            const contactData = {
-                first_name: record.first_name || '',
-                last_name: record.last_name || '',
-                email: record.email || '',
-                phone: record.phone || '',
-                notes: record.notes || '',
-                display_name: record.display_name || `${record.first_name} ${record.last_name}`.trim()
-            };
-            
-            const result = await apiCall('/contacts', {
-                method: 'POST',
-                body: JSON.stringify(contactData)
-            });
-            
-            if (result.success) {
-                successCount++;
-            } else {
-                errorCount++;
-            }
-        } catch (error) {
-            errorCount++;
-            console.error('Failed to import contact:', record, error);
+    const formData = new FormData();
+    formData.append('file', importFile);
+    
+    try {
+        showLoading();
+        const response = await fetch(API_BASE + '/import', { method: 'POST', body: formData });
+        const started = await response.json();
+        hideLoading();
+        if (!response.ok) {
+            throw new Error(started.error || 'Import failed');
+        }
+        
+        cancelImport();
+        const importId = started.import_id;
+        let { job } = started;
+        while (job && (job.status === 'queued' || job.status === 'running')) {
+            showImportProgress(job);
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            ({ job } = await apiCall(`/import/${importId}`, {}, false));
         }
+        showImportProgress(null);
+        
+        if (!job || job.status === 'error') {
+            showNotification(`Import stopped: ${job ? job.error : 'job lost'}. ` +
+                             `It can be resumed with POST /api/import/${importId}/resume`, 'error');
+            return;
+        }
+        
+        const counts = job.result.counts;
+        showNotification(
+            `Import completed: ${counts.created} contacts added, ${counts.skipped} duplicates skipped, ` +
+            `${counts.invalid + counts.failed} errors`,
+            job.result.errors === 0 ? 'success' : 'warning'
+        );
+        if (counts.failed > 0) {
+            showNotification(`${counts.failed} rows could not be written; they are sent again when the import ` +
+                             `is resumed with POST /api/import/${importId}/resume`, 'warning');
+        }
+        if (job.result.errors > 0 || counts.skipped > 0) {
+            window.open(`${API_BASE}/import/${importId}/errors`, '_blank');
+        }
+        loadContacts();
+    } catch (error) {
+        hideLoading();
+        showImportProgress(null);
+        showNotification('Error: ' + error.message, 'error');
+        console.error('Failed to import contacts:', error);
     }
-    
-    showNotification(
-        `Import completed: ${successCount} contacts added, ${errorCount} errors`,
-        errorCount === 0 ? 'success' : 'warning'
-    );
-    
-    cancelImport();
-    loadContacts();
+}
+
+function showImportProgress(job) {
+    const element = document.getElementById('import-progress');
+    if (!job) {
+        element.classList.add('hidden');
+        return;
+    }
+    const progress = job.progress || {};
+    const percent = progress.bytes_total ? Math.round(100 * progress.bytes_read / progress.bytes_total) : 0;
+    element.textContent = progress.rows !== undefined
+        ? `Importing: ${percent}% (${progress.rows} rows, ${progress.created} added, ${progress.skipped} skipped, ` +
+          `${progress.invalid + progress.failed} errors)`
+        : 'Checking existing contacts...';
+    element.classList.remove('hidden');
 }
 
 // Utility Functions
@@ -647,12 +777,12 @@ function generateContactFormHTML(contact = {}) {
 }
 
 function updateStats() {
-    document.getElementById('total-contacts').textContent = contacts.length;
+    document.getElementById('total-contacts').textContent = totalContacts;
     document.getElementById('duplicate-count').textContent = duplicates.length;
 }
 
 function refreshContacts() {
-    loadContacts();
+    loadContacts(true);
     showNotification('Contacts refreshed', 'success');
 }
 
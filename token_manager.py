@@ -0,0 +1,80 @@
+import threading
+import time
+from datetime import datetime
+
+from observability import TOKEN_REFRESH_SECONDS
+
+# Assumed lifetime when the credentials don't report an expiry
+DEFAULT_TOKEN_LIFETIME = 3600
+
+
+class TokenManager:
+    """Thread-safe cache for OAuth access tokens.
+
+    A token is reused until `refresh_margin` seconds before it expires.
+    Concurrent callers that find the token stale wait on a single refresh
+    instead of each hitting the token endpoint.
+    """
+
+    def __init__(self, credentials, refresh_margin=300):
+        self.credentials = credentials
+        self.refresh_margin = refresh_margin
+        self._lock = threading.Lock()
+        # (token, monotonic deadline) is swapped as one tuple so readers
+        # never see a token paired with another token's deadline
+        self._cached = (None, 0.0)
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.failures = 0
+
+    def get_token(self):
+        """Return a valid access token, refreshing it only when needed"""
+        # Decide hit or miss and count it under the lock, so concurrent callers
+        # neither lose counter updates nor refresh the same token twice
+        with self._lock:
+            token, deadline = self._cached
+            if token and time.monotonic() < deadline:
+                self.hits += 1
+                return token
+            self.misses += 1
+            return self._refresh()
+
+    def invalidate(self):
+        """Drop the cached token, e.g. after the API rejects it with a 401"""
+        with self._lock:
+            self._cached = (None, 0.0)
+
+    def _refresh(self):
+        # google-auth's transport pulls in requests; import it when a token is first needed
+        from google.auth.transport.requests import Request
+        started = time.perf_counter()
+        try:
+            self.credentials.refresh(Request())
+        except Exception:
+            self.failures += 1
+            TOKEN_REFRESH_SECONDS.observe(time.perf_counter() - started, outcome='error')
+            raise
+        self.refreshes += 1
+        TOKEN_REFRESH_SECONDS.observe(time.perf_counter() - started, outcome='success')
+
+        lifetime = DEFAULT_TOKEN_LIFETIME
+        expiry = getattr(self.credentials, 'expiry', None)
+        if expiry is not None:
+            # google-auth reports expiry as a naive UTC datetime
+            lifetime = (expiry - datetime.utcnow()).total_seconds()
+
+        token = self.credentials.token
+        self._cached = (token, time.monotonic() + max(lifetime - self.refresh_margin, 0))
+        return token
+
+    def stats(self):
+        """Return cache counters"""
+        token, deadline = self._cached
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'expires_in': max(round(deadline - time.monotonic()), 0) if token else 0
+        }